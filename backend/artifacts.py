@@ -0,0 +1,103 @@
+"""In-process cache of rendered team artifacts (YAML and other export formats).
+
+Artifacts are stored per team and per variant (format plus anything else the
+rendering depends on, such as the tool catalog revision), together with the
+team revision they were rendered from, so cache hits and 304s are served
+without reading the store. Each artifact carries a strong ETag derived from
+the team revision and its content so clients can revalidate with
+If-None-Match.
+
+The worker that applies an update calls ``invalidate``; other workers cannot
+see it, so a team's entry also expires ``ttl_seconds`` after its revision was
+last read from the store. That bounds how long another worker may serve an
+older revision, at the cost of one read and render per team per TTL. Entries
+are evicted least-recently-used at team granularity.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+
+class RenderedArtifact:
+    __slots__ = ("body", "media_type", "filename", "digest", "revision")
+
+    def __init__(self, body: Union[str, bytes], media_type: str, filename: str):
+        self.body = body
+        self.media_type = media_type
+        self.filename = filename
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.digest = hashlib.sha256(data).hexdigest()[:32]
+        # Team revision the artifact was rendered from (set when it is cached)
+        self.revision = 0
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.revision}-{self.digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ArtifactCache:
+    def __init__(self, max_teams: int = 1024, ttl_seconds: float = 30.0):
+        self.max_teams = max_teams
+        # 0 or less: entries only leave through invalidate and eviction (single worker)
+        self.ttl_seconds = ttl_seconds
+        # team id -> (revision, expires_at, {variant: artifact}); one revision is kept per team
+        self._teams: "OrderedDict[str, Tuple[int, float, Dict[str, RenderedArtifact]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, team_id: str, variant: str) -> Optional[RenderedArtifact]:
+        entry = self._teams.get(team_id)
+        if entry is not None and entry[1] <= time.monotonic():
+            del self._teams[team_id]
+            entry = None
+        artifact = entry[2].get(variant) if entry else None
+        if artifact is None:
+            self.misses += 1
+            return None
+        self._teams.move_to_end(team_id)
+        self.hits += 1
+        return artifact
+
+    def put(self, team_id: str, revision: int, variant: str, artifact: RenderedArtifact):
+        """Cache ``artifact`` as rendered from ``revision``, which was just read from the store"""
+        artifact.revision = revision
+        entry = self._teams.get(team_id)
+        if entry is not None and entry[0] > revision:
+            # Rendered from a read that an update has since overtaken
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+        variants = entry[2] if entry is not None and entry[0] == revision else {}
+        variants[variant] = artifact
+        self._set(team_id, (revision, expires_at, variants))
+
+    def _set(self, team_id: str, entry: Tuple[int, float, Dict[str, RenderedArtifact]]):
+        self._teams[team_id] = entry
+        self._teams.move_to_end(team_id)
+        while len(self._teams) > self.max_teams:
+            self._teams.popitem(last=False)
+
+    def invalidate(self, team_id: str, revision: Optional[int] = None):
+        """Drop every variant of a team.
+
+        Given the team's new ``revision``, renders of older revisions that are
+        still in flight are not cached afterwards.
+        """
+        if revision is None:
+            self._teams.pop(team_id, None)
+        else:
+            self._set(team_id, (revision, float("inf"), {}))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "teams": len(self._teams)}
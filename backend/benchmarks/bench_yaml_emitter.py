@@ -0,0 +1,134 @@
+"""Benchmark the streaming YAML emitter against the original string-concatenation renderer.
+
+Usage (from the repository root):
+    python backend/benchmarks/bench_yaml_emitter.py [--sizes 100 500 2000] [--repeat 5]
+
+For each crew size it reports the best-of-N wall time of:
+    legacy  - the original generate_crewai_yaml (repeated += concatenation)
+    render  - yaml_emitter.render_crewai_yaml (chunks joined once)
+    stream  - yaml_emitter.iter_crewai_yaml consumed chunk by chunk, as a
+              StreamingResponse would
+If PyYAML is installed it also checks that the emitter output parses back
+to the right number of agents and tasks. The legacy output is only valid
+YAML here because the synthetic text contains nothing that needs quoting.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yaml_emitter import iter_crewai_yaml, render_crewai_yaml  # noqa: E402
+
+
+def legacy_generate_crewai_yaml(team_data: dict, tool_mapping: dict) -> str:
+    """The renderer as it was before yaml_emitter (kept verbatim for comparison)"""
+    selected_tool_classes = [tool_mapping.get(tool_id, tool_id) for tool_id in team_data["selected_tools"]]
+
+    yaml_content = f"""# {team_data['mission']['name']} - AI Agent Team Configuration
+# Generated by AI Agent Team Configuration Wizard
+
+agents:"""
+
+    for agent in team_data["agents"]:
+        yaml_content += f"""
+  - role: {agent['role']}
+    goal: {agent['goal']}
+    backstory: {agent['backstory']}"""
+
+    yaml_content += """
+
+tasks:"""
+
+    for i, task in enumerate(team_data["tasks"]):
+        corresponding_agent = team_data["agents"][i] if i < len(team_data["agents"]) else team_data["agents"][0]
+        yaml_content += f"""
+  - description: {task['description']}
+    agent: {corresponding_agent['role']}
+    expected_output: Complete and accurate results for the task"""
+
+    yaml_content += """
+
+tools:"""
+
+    for tool_class in selected_tool_classes:
+        yaml_content += f"""
+  - {tool_class}"""
+
+    yaml_content += f"""
+
+process: {team_data['workflow_type']}
+
+# Mission: {team_data['mission']['objective']}
+# Description: {team_data['mission'].get('description', 'No description provided')}
+"""
+
+    return yaml_content
+
+
+TOOL_MAPPING = {f"tool_{i}": f"Tool{i}Class" for i in range(30)}
+
+
+def make_team(size: int) -> dict:
+    return {
+        "mission": {"name": f"Benchmark Crew {size}", "objective": "Measure YAML rendering", "description": "Synthetic team"},
+        "agents": [
+            {
+                "role": f"Specialist Analyst {i}",
+                "goal": f"Deliver a thorough analysis for workstream {i} within the agreed timeline",
+                "backstory": f"A seasoned analyst with {i % 20 + 5} years of experience across research, synthesis and reporting.",
+            }
+            for i in range(size)
+        ],
+        "tasks": [
+            {"description": f"Research, analyse and summarise findings for workstream {i} in a structured report"}
+            for i in range(size)
+        ],
+        "selected_tools": list(TOOL_MAPPING)[: min(size, 30)],
+        "workflow_type": "sequential",
+    }
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def consume_stream(team: dict) -> int:
+    total = 0
+    for chunk in iter_crewai_yaml(team, TOOL_MAPPING.get):
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        import yaml
+    except ImportError:
+        yaml = None
+
+    print(f"{'agents':>8} {'legacy ms':>10} {'render ms':>10} {'stream ms':>10} {'render/legacy':>14}")
+    for size in args.sizes:
+        team = make_team(size)
+        legacy = best_of(args.repeat, lambda: legacy_generate_crewai_yaml(team, TOOL_MAPPING))
+        render = best_of(args.repeat, lambda: render_crewai_yaml(team, TOOL_MAPPING.get))
+        stream = best_of(args.repeat, lambda: consume_stream(team))
+        print(f"{size:>8} {legacy * 1000:>10.2f} {render * 1000:>10.2f} {stream * 1000:>10.2f} {render / legacy:>13.2f}x")
+
+        if yaml is not None:
+            parsed = yaml.safe_load(render_crewai_yaml(team, TOOL_MAPPING.get))
+            assert len(parsed["agents"]) == size and len(parsed["tasks"]) == size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""In-process load test for the FastAPI backend.
+
+Usage (from the repository root):
+    python backend/benchmarks/load_test.py [--concurrency 32] [--requests 2000]
+        [--scenarios tools teams ...] [--store memory] [--llm-latency-ms 50]
+        [--llm-jitter-ms 0] [--llm-tokens-per-second 0] [--llm-failure-rate 0]
+        [--llm-malformed-rate 0]
+        [--output results.json] [--compare baseline.json]
+
+The app runs in this process behind httpx's ASGI transport, so no server,
+network or MongoDB is involved. Teams are kept in the memory store by
+default (``--store sqlite`` compares storage backends), and completions
+come from the mock LLM provider (mock_llm.py) with the latency, jitter,
+token rate, failure rate and malformed-JSON rate given on the command line.
+The provider sits behind llm_client's concurrency limit and timeouts like
+the real one. LiveKit tokens are signed locally with dummy credentials.
+
+Each scenario runs ``--requests`` requests from ``--concurrency`` workers
+(closed loop) and reports latency percentiles, throughput and event-loop
+lag. The lag is how late a 10ms timer wakes up while the scenario runs.
+Client and app share the loop here, so at saturation it is roughly one
+pass over every in-flight request; compare it between commits, and treat
+lag well above the p50 latency as a sign of one step blocking the loop.
+``--output`` writes the results as JSON (with the git commit). Pass an
+earlier file as ``--compare`` to print the change per scenario.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LAG_INTERVAL = 0.01
+
+
+def configure_environment(args):
+    """Settings the app reads at import time; must run before importing server"""
+    os.environ["TEAM_STORE"] = args.store
+    # Always a scratch file: it is deleted before each run
+    os.environ["SQLITE_PATH"] = os.path.join(tempfile.gettempdir(), "agent_teams_load_test.db")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+    os.environ.setdefault("EMERGENT_LLM_KEY", "sk-load-test")
+    os.environ.setdefault("LIVEKIT_API_KEY", "load-test-key")
+    os.environ.setdefault("LIVEKIT_API_SECRET", "load-test-secret-with-enough-entropy")
+    os.environ.setdefault("DB_NAME", "load_test")
+    os.environ["LLM_PROVIDER"] = "mock"
+    os.environ["MOCK_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["MOCK_LLM_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["MOCK_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+    os.environ["MOCK_LLM_FAILURE_RATE"] = str(args.llm_failure_rate)
+    os.environ["MOCK_LLM_MALFORMED_RATE"] = str(args.llm_malformed_rate)
+
+
+def team_payload(index: int) -> dict:
+    return {
+        "mission": {"name": f"Load Test Team {index}", "objective": "Benchmark the API", "description": "Synthetic"},
+        "tasks": [
+            {"id": f"task-{index}-{i}", "title": f"Task {i}", "description": f"Do part {i} of the work", "order": i}
+            for i in range(4)
+        ],
+        "agents": [
+            {"task_id": f"task-{index}-{i}", "role": f"Specialist {i}", "goal": f"Finish part {i}", "backstory": "Synthetic agent"}
+            for i in range(4)
+        ],
+        "selected_tools": ["serper_search", "file_read"],
+        "workflow_type": "hierarchical" if index % 2 else "sequential",
+    }
+
+
+class Scenario:
+    def __init__(self, name: str, send: Callable[..., Awaitable]):
+        self.name = name
+        self.send = send
+
+
+def build_scenarios(team_ids: List[str]) -> Dict[str, Scenario]:
+    counter = itertools.count()
+
+    async def tools(client):
+        return await client.get("/api/tools")
+
+    async def list_teams(client):
+        return await client.get("/api/teams", params={"limit": 20})
+
+    async def create_team(client):
+        return await client.post("/api/teams", json=team_payload(next(counter)))
+
+    async def generate_yaml(client):
+        return await client.post("/api/generate-yaml", json={"team_id": random.choice(team_ids)})
+
+    async def generate_team(client):
+        # Unique missions so every request misses the generation cache and reaches the LLM
+        n = next(counter)
+        return await client.post("/api/generate-intelligent-team", json={
+            "mission_name": f"Load test mission {n}",
+            "mission_objective": f"Exercise team generation under load ({n})",
+        })
+
+    async def team_pipeline(client):
+        return await client.post("/api/team-pipeline", json={"team": team_payload(next(counter))})
+
+    async def livekit_token(client):
+        n = next(counter)
+        return await client.post("/api/livekit-token", json={"room_name": f"room-{n}", "participant_name": f"user-{n}"})
+
+    return {scenario.name: scenario for scenario in [
+        Scenario("tools", tools),
+        Scenario("teams", list_teams),
+        Scenario("create-team", create_team),
+        Scenario("generate-yaml", generate_yaml),
+        Scenario("generate-intelligent-team", generate_team),
+        Scenario("team-pipeline", team_pipeline),
+        Scenario("livekit-token", livekit_token),
+    ]}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3) if values else 0.0,
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+    }
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+
+async def run_scenario(client, scenario: Scenario, total: int, concurrency: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await scenario.send(client)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            # In-process requests that never wait on I/O would otherwise run
+            # back to back without yielding; a real socket always yields here
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            try:
+                response = await scenario.send(client)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not status.startswith("2"):
+                errors += 1
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_counts": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "loop_lag_ms": summarize(lag),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_results(results: Dict[str, dict]):
+    print(f"{'scenario':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'lag p99':>9} {'errors':>7}")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<28} {result['throughput_rps']:>9.1f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+            f"{latency['p99']:>9.2f} {result['loop_lag_ms']['p99']:>9.2f} {result['errors']:>7}"
+        )
+
+
+def print_comparison(results: Dict[str, dict], baseline: dict):
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    print(f"{'scenario':<28} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            print(f"{name:<28} {'(new)':>9}")
+            continue
+
+        def change(now: float, then: float) -> str:
+            return f"{(now - then) / then * 100:+.1f}%" if then else "n/a"
+
+        print(
+            f"{name:<28} {change(result['throughput_rps'], before['throughput_rps']):>9} "
+            + " ".join(f"{change(result['latency_ms'][q], before['latency_ms'][q]):>9}" for q in ("p50", "p95", "p99"))
+        )
+
+
+async def main_async(args):
+    configure_environment(args)
+    # Failures are counted per scenario; per-request error logs would drown the report
+    logging.disable(logging.ERROR)
+
+    import httpx
+    import server
+
+    for suffix in ("", "-wal", "-shm"):
+        if args.store == "sqlite" and os.path.exists(os.environ["SQLITE_PATH"] + suffix):
+            os.remove(os.environ["SQLITE_PATH"] + suffix)
+    # ASGITransport does not run startup hooks
+    await server.connect_team_store()
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+        team_ids = []
+        for index in range(args.seed_teams):
+            response = await client.post("/api/teams", json=team_payload(-index - 1))
+            team_ids.append(response.json()["team_id"])
+        scenarios = build_scenarios(team_ids)
+
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency, args.warmup)
+    await server.team_store.close()
+
+    print_results(results)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "config": {
+            "store": args.store,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed_teams": args.seed_teams,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "llm_failure_rate": args.llm_failure_rate,
+            "llm_malformed_rate": args.llm_malformed_rate,
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+SCENARIOS = ["tools", "teams", "create-team", "generate-yaml", "generate-intelligent-team", "team-pipeline", "livekit-token"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--seed-teams", type=int, default=200, help="teams saved before the run")
+    parser.add_argument("--store", choices=["memory", "sqlite", "mongo"], default="memory")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="mock LLM first-token delay")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="0 returns the whole response at once")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="fraction of JSON answers to corrupt")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Pluggable export formats for saved agent teams.
+
+Each exporter turns a team document into one ``RenderedArtifact``. Register
+a new format with the ``exporter`` decorator; the API picks it up by name
+(``GET /api/teams/{team_id}/export/{format}``) and the artifact cache keys
+on that name, so every format is rendered at most once per team.
+
+Formats:
+    crewai-yaml  - the combined single-file CrewAI YAML
+    agents-yaml  - CrewAI project ``config/agents.yaml``
+    tasks-yaml   - CrewAI project ``config/tasks.yaml``
+    json         - canonical JSON of the team (sorted keys, compact)
+    crew-py      - runnable ``crew.py`` scaffold using the CrewBase decorators
+    main-py      - ``main.py`` entrypoint for the scaffold
+    bundle       - zip of a ready-to-run project containing all of the above
+"""
+import io
+import json
+import keyword
+import re
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from artifacts import RenderedArtifact
+from yaml_emitter import quote_scalar, render_crewai_yaml, yaml_filename
+
+ToolClass = Callable[[str], str]
+
+
+class Exporter:
+    def __init__(self, name: str, description: str, render: Callable[[dict, ToolClass], RenderedArtifact]):
+        self.name = name
+        self.description = description
+        self.render = render
+
+
+EXPORTERS: Dict[str, Exporter] = {}
+
+
+def exporter(name: str, description: str):
+    """Register ``fn(team, tool_class) -> RenderedArtifact`` as an export format"""
+    def register(fn):
+        EXPORTERS[name] = Exporter(name, description, fn)
+        return fn
+    return register
+
+
+def get_exporter(name: str) -> Optional[Exporter]:
+    return EXPORTERS.get(name)
+
+
+def _identifier(text: str, taken: set, suffix: str = "") -> str:
+    """Unique snake_case Python identifier derived from free text"""
+    base = re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_") or "item"
+    if base[0].isdigit() or keyword.iskeyword(base):
+        base = f"_{base}"
+    base += suffix
+    name, n = base, 2
+    while name in taken:
+        name = f"{base}_{n}"
+        n += 1
+    taken.add(name)
+    return name
+
+
+def _class_name(mission_name: str) -> str:
+    words = re.findall(r"[A-Za-z0-9]+", mission_name)
+    name = "".join(word[:1].upper() + word[1:] for word in words) or "Team"
+    if name[0].isdigit():
+        name = f"Team{name}"
+    return f"{name}Crew"
+
+
+def _plan(team: dict) -> Tuple[List[Tuple[str, dict]], List[Tuple[str, dict, Optional[str]]]]:
+    """Assign config keys to agents and tasks and pair each task with its agent.
+
+    Tasks are paired with the agent that references their id, falling back to
+    the agent at the same position and then to the first agent, mirroring the
+    combined YAML.
+    """
+    # Names used by the crew.py scaffold itself (and CrewBase) cannot be config keys
+    taken = {"agent", "task", "crew", "agents", "tasks", "agents_config", "tasks_config", "tools", "_tools"}
+    agents = [(_identifier(agent["role"], taken), agent) for agent in team["agents"]]
+    by_task_id = {agent.get("task_id"): key for key, agent in agents}
+
+    tasks = []
+    for i, task in enumerate(team["tasks"]):
+        key = _identifier(task.get("title") or f"task {i + 1}", taken, "_task")
+        agent_key = by_task_id.get(task.get("id"))
+        if agent_key is None and agents:
+            agent_key = agents[i][0] if i < len(agents) else agents[0][0]
+        tasks.append((key, task, agent_key))
+    return agents, tasks
+
+
+def _project_stem(team: dict) -> str:
+    return yaml_filename(team["mission"]["name"])[: -len("_crew.yaml")]
+
+
+@exporter("crewai-yaml", "Single-file CrewAI YAML configuration")
+def render_combined_yaml(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(render_crewai_yaml(team, tool_class), "application/x-yaml", yaml_filename(team["mission"]["name"]))
+
+
+def _agents_yaml(team: dict) -> str:
+    agents, _ = _plan(team)
+    chunks = []
+    for key, agent in agents:
+        chunks.append(
+            f"{key}:\n"
+            f"  role: {quote_scalar(agent['role'])}\n"
+            f"  goal: {quote_scalar(agent['goal'])}\n"
+            f"  backstory: {quote_scalar(agent['backstory'])}\n"
+        )
+    return "\n".join(chunks) if chunks else "{}\n"
+
+
+def _tasks_yaml(team: dict) -> str:
+    _, tasks = _plan(team)
+    chunks = []
+    for key, task, agent_key in tasks:
+        chunk = (
+            f"{key}:\n"
+            f"  description: {quote_scalar(task['description'])}\n"
+            f"  expected_output: Complete and accurate results for the task\n"
+        )
+        if agent_key:
+            chunk += f"  agent: {agent_key}\n"
+        chunks.append(chunk)
+    return "\n".join(chunks) if chunks else "{}\n"
+
+
+@exporter("agents-yaml", "CrewAI project config/agents.yaml")
+def render_agents_yaml(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(_agents_yaml(team), "application/x-yaml", "agents.yaml")
+
+
+@exporter("tasks-yaml", "CrewAI project config/tasks.yaml")
+def render_tasks_yaml(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(_tasks_yaml(team), "application/x-yaml", "tasks.yaml")
+
+
+def _canonical_json(team: dict) -> str:
+    return json.dumps(jsonable_encoder(team), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+@exporter("json", "Canonical JSON of the team")
+def render_json(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(_canonical_json(team), "application/json", f"{_project_stem(team)}_team.json")
+
+
+# Catalog class names that are not the importable crewai_tools class
+CREWAI_TOOL_IMPORTS = {"DALL-ETool": "DallETool", "FileWriteTool": "FileWriterTool"}
+
+# Classes crewai_tools actually exports; any other selected tool is listed in a
+# comment instead, so the scaffold never fails with ImportError
+CREWAI_TOOLS = frozenset({
+    "CSVSearchTool",
+    "DOCXSearchTool",
+    "DallETool",
+    "DirectoryReadTool",
+    "EXASearchTool",
+    "FileReadTool",
+    "FileWriterTool",
+    "FirecrawlSearchTool",
+    "GithubSearchTool",
+    "JSONSearchTool",
+    "MySQLSearchTool",
+    "NL2SQLTool",
+    "PDFSearchTool",
+    "ScrapeWebsiteTool",
+    "SeleniumScrapingTool",
+    "SerperDevTool",
+    "VisionTool",
+    "WebsiteSearchTool",
+    "YoutubeChannelSearchTool",
+    "YoutubeVideoSearchTool",
+})
+
+
+def _crew_py(team: dict, tool_class: ToolClass) -> str:
+    agents, tasks = _plan(team)
+    class_name = _class_name(team["mission"]["name"])
+
+    tool_classes = []
+    unsupported = []
+    for tool_id in team["selected_tools"]:
+        name = tool_class(tool_id)
+        name = CREWAI_TOOL_IMPORTS.get(name, name)
+        if name not in CREWAI_TOOLS:
+            if name not in unsupported:
+                unsupported.append(name)
+        elif name not in tool_classes:
+            tool_classes.append(name)
+
+    lines = [
+        f"# {' '.join(str(team['mission']['name']).split())} - generated by AI Agent Team Configuration Wizard",
+        f"# Mission: {' '.join(str(team['mission']['objective']).split())}",
+        "from crewai import Agent, Crew, Process, Task",
+        "from crewai.project import CrewBase, agent, crew, task",
+    ]
+    if tool_classes:
+        lines.append(f"from crewai_tools import {', '.join(tool_classes)}")
+    if unsupported:
+        lines.append(f"# Selected tools without a crewai_tools class, not imported: {', '.join(unsupported)}")
+    lines += [
+        "",
+        "",
+        "@CrewBase",
+        f"class {class_name}:",
+        '    agents_config = "config/agents.yaml"',
+        '    tasks_config = "config/tasks.yaml"',
+    ]
+    if tool_classes:
+        lines += [
+            "",
+            "    def _tools(self):",
+            f"        return [{', '.join(f'{name}()' for name in tool_classes)}]",
+        ]
+    for key, _ in agents:
+        tools_arg = ", tools=self._tools()" if tool_classes else ""
+        lines += [
+            "",
+            "    @agent",
+            f"    def {key}(self) -> Agent:",
+            f'        return Agent(config=self.agents_config["{key}"]{tools_arg}, verbose=True)',
+        ]
+    for key, _, _ in tasks:
+        lines += [
+            "",
+            "    @task",
+            f"    def {key}(self) -> Task:",
+            f'        return Task(config=self.tasks_config["{key}"])',
+        ]
+
+    hierarchical = team["workflow_type"] == "hierarchical"
+    lines += [
+        "",
+        "    @crew",
+        "    def crew(self) -> Crew:",
+        "        return Crew(",
+        "            agents=self.agents,",
+        "            tasks=self.tasks,",
+        f"            process=Process.{'hierarchical' if hierarchical else 'sequential'},",
+    ]
+    if hierarchical:
+        lines.append('            manager_llm="gpt-4o-mini",')
+    lines += [
+        "            verbose=True,",
+        "        )",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def _main_py(team: dict) -> str:
+    class_name = _class_name(team["mission"]["name"])
+    return (
+        f"from crew import {class_name}\n"
+        "\n"
+        "\n"
+        "def run():\n"
+        f"    result = {class_name}().crew().kickoff()\n"
+        "    print(result)\n"
+        "\n"
+        "\n"
+        'if __name__ == "__main__":\n'
+        "    run()\n"
+    )
+
+
+@exporter("crew-py", "Runnable crew.py scaffold (CrewBase)")
+def render_crew_py(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(_crew_py(team, tool_class), "text/x-python", "crew.py")
+
+
+@exporter("main-py", "main.py entrypoint for the crew.py scaffold")
+def render_main_py(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    return RenderedArtifact(_main_py(team), "text/x-python", "main.py")
+
+
+@exporter("bundle", "Zip of a CrewAI project with every format above")
+def render_bundle(team: dict, tool_class: ToolClass) -> RenderedArtifact:
+    stem = _project_stem(team)
+    files = [
+        (f"{stem}/config/agents.yaml", _agents_yaml(team)),
+        (f"{stem}/config/tasks.yaml", _tasks_yaml(team)),
+        (f"{stem}/crew.py", _crew_py(team, tool_class)),
+        (f"{stem}/main.py", _main_py(team)),
+        (f"{stem}/team.json", _canonical_json(team)),
+        (f"{stem}/{yaml_filename(team['mission']['name'])}", render_crewai_yaml(team, tool_class)),
+    ]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, content in files:
+            # Fixed timestamps keep the archive (and its ETag) deterministic
+            info = zipfile.ZipInfo(path, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, content)
+    return RenderedArtifact(buffer.getvalue(), "application/zip", f"{stem}_crew.zip")
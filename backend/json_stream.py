@@ -0,0 +1,120 @@
+"""Incremental parsing of a JSON object that arrives in chunks.
+
+Used to surface parts of a streamed LLM response before the completion
+finishes. The parser expects a single top-level object and reports:
+
+    ("item", key, value)   - each element of a top-level array as soon as the
+                             element is complete, e.g. every entry of "tasks"
+    ("field", key, value)  - every top-level member once its value is complete
+
+An element or member that is complete but not valid JSON is reported as
+("invalid_item", key, text) or ("invalid_field", key, text) and parsing goes
+on, so one malformed element does not lose the rest of the stream.
+
+Anything before the opening ``{`` (such as a markdown fence) is skipped, and
+trailing commas inside values are tolerated.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+from llm_json import strip_trailing_commas
+
+Event = Tuple[str, str, Any]
+
+_WHITESPACE = " \t\r\n"
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_trailing_commas(text))
+
+
+def _event(kind: str, key: str, text: str) -> Event:
+    try:
+        return kind, key, _loads(text)
+    except json.JSONDecodeError:
+        return f"invalid_{kind}", key, text
+
+
+class IncrementalJSONParser:
+    """Character scanner that tracks nesting and string state across chunks"""
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Event]:
+        """Consume a chunk of text and return the events it completed"""
+        events: List[Event] = []
+        if self.done:
+            return events
+        self._buf += chunk
+        buf = self._buf
+        stack = self._stack
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(stack) == 1 and self._expect_key:
+                        self._key = json.loads(buf[self._string_start:i + 1])
+                        self._expect_key = False
+                continue
+
+            if not stack:
+                if c == "{":
+                    stack.append(c)
+                    self._expect_key = True
+                continue
+
+            depth = len(stack)
+            if depth == 1 and not self._expect_key and self._value_start is None and c not in _WHITESPACE and c != ":":
+                self._value_start = i
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                if depth == 2 and stack[1] == "[":
+                    self._item_start = i
+                stack.append(c)
+            elif c in "}]":
+                stack.pop()
+                depth = len(stack)
+                if depth == 2 and stack[1] == "[" and self._item_start is not None:
+                    events.append(_event("item", self._key, buf[self._item_start:i + 1]))
+                    self._item_start = None
+                elif depth == 0:
+                    self._finish_field(i, events)
+                    self.done = True
+                    self._pos = i + 1
+                    return events
+            elif c == "," and depth == 1:
+                self._finish_field(i, events)
+                self._expect_key = True
+
+        self._pos = len(buf)
+        return events
+
+    def _finish_field(self, end: int, events: List[Event]):
+        if self._key is not None and self._value_start is not None:
+            events.append(_event("field", self._key, self._buf[self._value_start:end]))
+        self._key = None
+        self._value_start = None
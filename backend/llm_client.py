@@ -0,0 +1,517 @@
+"""Shared async LLM client layer.
+
+Every chat completion made by the API server and the voice agent goes through
+this module so that no handler ever blocks the event loop on a synchronous
+OpenAI call. Clients are pooled per API key, the number of in-flight
+completions is bounded by a semaphore and each call carries a timeout.
+
+API keys are never written to the global ``openai.api_key``. Each key gets its
+own ``AsyncOpenAI`` instance (and keep-alive connection pool) held in an LRU
+registry keyed by a SHA-256 fingerprint of the key, so concurrent requests
+with different user keys run in parallel without racing each other.
+
+The completion itself is made by a provider: ``OpenAIProvider`` by default,
+or the offline ``mock_llm.MockLLMProvider`` with ``LLM_PROVIDER=mock`` (see
+that module for its settings). Concurrency limits and timeouts apply to
+both, so the mock measures everything except the model.
+
+Transient failures (429, 5xx, connection errors) are retried with jittered
+exponential backoff that honours Retry-After, calls are paced by a token
+bucket per API key, and a circuit breaker per provider fails fast while the
+provider is down (see llm_resilience). The OpenAI SDK's own retries are
+turned off so this is the only retry layer. When a call is not made or
+retries run out, ``LLMUnavailableError`` carries a ``retry_after`` hint.
+
+Configuration (read lazily so values loaded from ``.env`` are honoured):
+    LLM_PROVIDER            - ``openai`` (default) or ``mock``
+    LLM_MAX_CONCURRENCY     - max simultaneous completions per process (default 16)
+    LLM_TIMEOUT_SECONDS     - per-call timeout in seconds (default 60)
+    LLM_CLIENT_CACHE_SIZE   - max number of pooled per-key clients (default 64)
+    LLM_CLIENT_IDLE_SECONDS - evict clients unused for this long (default 600)
+    LLM_MAX_RETRIES         - retries of a transient failure (default 2)
+    LLM_RETRY_BASE_SECONDS  - backoff before the first retry, doubling after (default 0.5)
+    LLM_RETRY_MAX_SECONDS   - cap on the backoff (default 8)
+    LLM_RETRY_AFTER_MAX_SECONDS - longer Retry-After values are not waited for (default 30)
+    LLM_RATE_LIMIT_PER_SECOND   - calls per second per API key; 0 disables (default 0)
+    LLM_RATE_LIMIT_BURST        - bucket size (default twice the rate)
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS - queue at most this long for a token (default 5)
+    LLM_BREAKER_FAILURE_THRESHOLD   - consecutive outages that open the circuit (default 5)
+    LLM_BREAKER_RECOVERY_SECONDS    - how long it stays open before a probe (default 30)
+"""
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import APITimeoutError, AsyncOpenAI, DefaultAsyncHttpxClient
+
+from llm_resilience import CircuitBreaker, RateLimiter, RetryPolicy, is_outage, is_transient, retry_after_seconds, status_code
+from metrics import (
+    LLM_CALL_DURATION,
+    LLM_CIRCUIT_STATE,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_WAIT,
+    LLM_RATE_LIMIT_WAIT,
+    LLM_REJECTED,
+    LLM_RETRIES,
+    LLM_TOKENS,
+)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a completion does not finish within its timeout"""
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the provider is not called (open circuit, key over its rate
+    limit) or keeps failing transiently; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _max_concurrency() -> int:
+    return int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+
+
+def _default_timeout() -> float:
+    return float(os.environ.get("LLM_TIMEOUT_SECONDS", "60"))
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_max_concurrency())
+    return _semaphore
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable, non-reversible identifier for an API key"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class _ClientEntry:
+    __slots__ = ("client", "last_used", "leases", "retired")
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.leases = 0
+        self.retired = False
+
+
+class ClientRegistry:
+    """LRU of AsyncOpenAI clients keyed by API key fingerprint.
+
+    Clients are evicted when the registry is full or when they have been idle
+    for longer than ``idle_seconds``. An evicted client that is still serving
+    a call is closed once its last lease is released.
+    """
+
+    def __init__(self, max_size: int, idle_seconds: float):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[str, _ClientEntry]" = OrderedDict()
+        self._closing: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=_max_concurrency(),
+                max_keepalive_connections=_max_concurrency(),
+                keepalive_expiry=self.idle_seconds,
+            ),
+        )
+        # Retries happen in chat_completion, where they share the breaker and backoff
+        return AsyncOpenAI(api_key=api_key, timeout=_default_timeout(), http_client=http_client, max_retries=0)
+
+    def _retire(self, entry: _ClientEntry):
+        entry.retired = True
+        if entry.leases == 0:
+            self._closing.append(asyncio.ensure_future(entry.client.close()))
+
+    def _evict(self, now: float):
+        for fingerprint, entry in list(self._entries.items()):
+            if now - entry.last_used > self.idle_seconds and entry.leases == 0:
+                del self._entries[fingerprint]
+                self._retire(entry)
+        while len(self._entries) > self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            self._retire(entry)
+        self._closing = [task for task in self._closing if not task.done()]
+
+    def _checkout(self, api_key: str) -> _ClientEntry:
+        fingerprint = key_fingerprint(api_key)
+        now = time.monotonic()
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = _ClientEntry(self._create_client(api_key))
+            self._entries[fingerprint] = entry
+        else:
+            self._entries.move_to_end(fingerprint)
+        entry.last_used = now
+        self._evict(now)
+        return entry
+
+    def get(self, api_key: str) -> AsyncOpenAI:
+        """Return the pooled client for an API key without holding a lease"""
+        return self._checkout(api_key).client
+
+    @asynccontextmanager
+    async def lease(self, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        """Borrow the client for an API key for the duration of a call"""
+        entry = self._checkout(api_key)
+        entry.leases += 1
+        try:
+            yield entry.client
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.leases == 0:
+                self._closing.append(asyncio.ensure_future(entry.client.close()))
+
+    async def aclose(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            await entry.client.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+            self._closing.clear()
+
+
+_registry: Optional[ClientRegistry] = None
+
+
+def get_registry() -> ClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry(
+            max_size=int(os.environ.get("LLM_CLIENT_CACHE_SIZE", "64")),
+            idle_seconds=float(os.environ.get("LLM_CLIENT_IDLE_SECONDS", "600")),
+        )
+    return _registry
+
+
+def get_client(api_key: str) -> AsyncOpenAI:
+    """Return the pooled AsyncOpenAI client for an API key"""
+    return get_registry().get(api_key)
+
+
+def record_usage(provider: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, "completion").inc(completion_tokens)
+
+
+def _format_kwargs(response_format: Optional[dict]) -> dict:
+    # Omitted rather than sent as null when not requested
+    return {"response_format": response_format} if response_format else {}
+
+
+class OpenAIProvider:
+    """Completions from the OpenAI API through the pooled per-key clients"""
+
+    name = "openai"
+
+    async def complete(self, api_key, messages, model, temperature, max_tokens, timeout, response_format=None) -> str:
+        async with get_registry().lease(api_key) as client:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                **_format_kwargs(response_format),
+            )
+        if response.usage is not None:
+            record_usage(self.name, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    async def stream(self, api_key, messages, model, temperature, max_tokens, timeout, response_format=None) -> AsyncIterator[str]:
+        async with get_registry().lease(api_key) as client:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                # The last chunk then carries token usage (and no choices)
+                stream_options={"include_usage": True},
+                timeout=timeout,
+                **_format_kwargs(response_format),
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        record_usage(self.name, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Release the connection if the consumer stops early
+                await stream.close()
+
+    async def aclose(self):
+        if _registry is not None:
+            await _registry.aclose()
+
+
+_provider = None
+
+
+def get_provider():
+    """The provider selected by LLM_PROVIDER, created on first use"""
+    global _provider
+    if _provider is None:
+        name = os.environ.get("LLM_PROVIDER", "openai").lower()
+        if name == "openai":
+            _provider = OpenAIProvider()
+        elif name == "mock":
+            from mock_llm import MockLLMProvider
+            _provider = MockLLMProvider.from_env()
+        else:
+            raise ValueError(f"Unknown LLM_PROVIDER {name!r}; expected openai or mock")
+    return _provider
+
+
+def set_provider(provider):
+    """Replace the provider (benchmarks and tests)"""
+    global _provider
+    _provider = provider
+
+
+_retry_policy: Optional[RetryPolicy] = None
+_rate_limiter: Optional[RateLimiter] = None
+_breakers: Dict[str, CircuitBreaker] = {}
+
+_CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+def get_retry_policy() -> RetryPolicy:
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy(
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+            base_delay=float(os.environ.get("LLM_RETRY_BASE_SECONDS", "0.5")),
+            max_delay=float(os.environ.get("LLM_RETRY_MAX_SECONDS", "8")),
+            max_retry_after=float(os.environ.get("LLM_RETRY_AFTER_MAX_SECONDS", "30")),
+        )
+    return _retry_policy
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        rate = float(os.environ.get("LLM_RATE_LIMIT_PER_SECOND", "0"))
+        _rate_limiter = RateLimiter(
+            rate=rate,
+            burst=float(os.environ.get("LLM_RATE_LIMIT_BURST", str(rate * 2))),
+            max_wait=float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "5")),
+        )
+    return _rate_limiter
+
+
+def get_circuit_breaker(provider_name: str) -> CircuitBreaker:
+    breaker = _breakers.get(provider_name)
+    if breaker is None:
+        gauge = LLM_CIRCUIT_STATE.labels(provider_name)
+        gauge.set(0)
+        breaker = _breakers[provider_name] = CircuitBreaker(
+            failure_threshold=int(os.environ.get("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+            recovery_seconds=float(os.environ.get("LLM_BREAKER_RECOVERY_SECONDS", "30")),
+            on_state_change=lambda state: gauge.set(_CIRCUIT_STATE_VALUES[state]),
+        )
+    return breaker
+
+
+async def _admit(provider_name: str, api_key: str):
+    """Wait for a rate-limit token; raise LLMUnavailableError instead of calling a broken provider"""
+    retry_after = get_circuit_breaker(provider_name).check()
+    if retry_after is not None:
+        LLM_REJECTED.labels(provider_name, "circuit_open").inc()
+        raise LLMUnavailableError("LLM provider circuit is open", retry_after)
+    limiter = get_rate_limiter()
+    if not limiter.enabled:
+        return
+    wait = limiter.reserve(key_fingerprint(api_key))
+    if wait is None:
+        LLM_REJECTED.labels(provider_name, "rate_limited").inc()
+        raise LLMUnavailableError("API key is over its LLM rate limit", limiter.max_wait)
+    LLM_RATE_LIMIT_WAIT.labels(provider_name).observe(wait)
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+def _record_result(provider_name: str, error: Optional[BaseException]):
+    breaker = get_circuit_breaker(provider_name)
+    if error is not None and (isinstance(error, LLMTimeoutError) or is_outage(error)):
+        breaker.record_failure()
+    else:
+        # Includes 4xx: the provider answered, so it is up
+        breaker.record_success()
+
+
+def _retry_delay(provider_name: str, error: Exception, attempt: int) -> Optional[float]:
+    """Backoff before retrying ``error``; None to re-raise it as is.
+
+    Raises LLMUnavailableError once a transient failure has used up its
+    retries (or the circuit opened meanwhile), so callers can tell the
+    client when to come back instead of a bare 500.
+    """
+    _record_result(provider_name, error)
+    if not is_transient(error):
+        return None
+    reason = str(status_code(error) or "connection")
+    delay = get_retry_policy().delay(attempt, error)
+    if delay is None or get_circuit_breaker(provider_name).state != CircuitBreaker.CLOSED:
+        raise LLMUnavailableError(f"LLM provider failed ({reason}): {str(error)}", retry_after_seconds(error)) from error
+    LLM_RETRIES.labels(provider_name, reason).inc()
+    return delay
+
+
+async def _complete_once(provider, api_key, messages, model, temperature, max_tokens, timeout, response_format) -> str:
+    queued = time.perf_counter()
+    async with _get_semaphore():
+        started = time.perf_counter()
+        LLM_QUEUE_WAIT.labels(provider.name).observe(started - queued)
+        LLM_IN_FLIGHT.inc()
+        outcome = "error"
+        try:
+            text = await asyncio.wait_for(
+                provider.complete(api_key, messages, model, temperature, max_tokens, timeout, response_format),
+                timeout=timeout,
+            )
+            outcome = "ok"
+            return text
+        except (asyncio.TimeoutError, APITimeoutError):
+            outcome = "timeout"
+            raise LLMTimeoutError(f"LLM call timed out after {timeout}s")
+        finally:
+            LLM_IN_FLIGHT.dec()
+            LLM_CALL_DURATION.labels(provider.name, "complete", outcome).observe(time.perf_counter() - started)
+
+
+async def chat_completion(
+    api_key: str,
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+    response_format: Optional[dict] = None,
+) -> str:
+    """Run a chat completion and return the text of the first choice.
+
+    ``response_format`` is passed through to the API (JSON mode or a JSON
+    schema for structured output, see llm_json.response_format). ``timeout``
+    applies to each attempt; backoff between retries does not hold a
+    concurrency slot.
+    """
+    timeout = timeout if timeout is not None else _default_timeout()
+    provider = get_provider()
+
+    for attempt in itertools.count():
+        await _admit(provider.name, api_key)
+        try:
+            text = await _complete_once(provider, api_key, messages, model, temperature, max_tokens, timeout, response_format)
+        except Exception as e:
+            delay = _retry_delay(provider.name, e, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        _record_result(provider.name, None)
+        return text
+
+
+async def _stream_once(provider, api_key, messages, model, temperature, max_tokens, timeout, response_format) -> AsyncIterator[str]:
+    queued = time.perf_counter()
+    async with _get_semaphore():
+        started = time.perf_counter()
+        LLM_QUEUE_WAIT.labels(provider.name).observe(started - queued)
+        LLM_IN_FLIGHT.inc()
+        outcome = "error"
+        deltas = provider.stream(api_key, messages, model, temperature, max_tokens, timeout, response_format)
+        try:
+            while True:
+                try:
+                    delta = await asyncio.wait_for(deltas.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                yield delta
+            outcome = "ok"
+        except (asyncio.TimeoutError, APITimeoutError):
+            outcome = "timeout"
+            raise LLMTimeoutError(f"LLM stream stalled for more than {timeout}s")
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        finally:
+            # Lets the provider release its connection if the consumer stops early
+            await deltas.aclose()
+            LLM_IN_FLIGHT.dec()
+            LLM_CALL_DURATION.labels(provider.name, "stream", outcome).observe(time.perf_counter() - started)
+
+
+async def stream_chat_completion(
+    api_key: str,
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+    response_format: Optional[dict] = None,
+) -> AsyncIterator[str]:
+    """Stream a chat completion, yielding text deltas as they arrive.
+
+    ``timeout`` bounds the wait for each chunk rather than the whole stream,
+    so long completions are fine as long as tokens keep flowing. A failed
+    attempt is only retried if it had not yielded anything yet.
+    """
+    timeout = timeout if timeout is not None else _default_timeout()
+    provider = get_provider()
+
+    for attempt in itertools.count():
+        await _admit(provider.name, api_key)
+        deltas = _stream_once(provider, api_key, messages, model, temperature, max_tokens, timeout, response_format)
+        yielded = False
+        try:
+            async for delta in deltas:
+                yielded = True
+                yield delta
+        except Exception as e:
+            if yielded:
+                _record_result(provider.name, e)
+                raise
+            delay = _retry_delay(provider.name, e, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        finally:
+            await deltas.aclose()
+        _record_result(provider.name, None)
+        return
+
+
+async def aclose():
+    """Close the provider and all pooled clients (call on application shutdown)"""
+    if _provider is not None:
+        await _provider.aclose()
+    if _registry is not None:
+        await _registry.aclose()
@@ -0,0 +1,288 @@
+"""Tolerant parsing of JSON objects returned by the LLM.
+
+Model output is turned into a validated Pydantic model in stages, each only
+tried when the previous one fails:
+
+    1. take the outermost ``{...}`` (dropping markdown fences, preamble and
+       trailing chatter) and ``json.loads`` it
+    2. repair it locally: remove trailing commas and, if the output was cut
+       off, drop the unfinished member or element and close what is open
+    3. validate against the schema, dropping list entries that do not
+       validate (typically the last one of a truncated response) rather than
+       rejecting the whole object
+
+All of this is local and free. Only when no object can be recovered does the
+caller need another model call, and ``repair_messages`` builds a short
+"fix this JSON" request for that instead of regenerating from scratch.
+
+The same schemas are sent to the model as its ``response_format`` so that,
+with structured output enabled (env LLM_RESPONSE_FORMAT, default
+``json_schema``), the repair stages are rarely needed at all.
+"""
+import copy
+import json
+import os
+import typing
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+class LLMJSONError(ValueError):
+    """No object matching the schema could be recovered from the output"""
+
+
+# Schemas of the JSON the prompts in prompts.py ask for
+
+class TaskSpec(BaseModel):
+    title: str
+    description: str
+    order: int
+
+
+class AgentSpec(BaseModel):
+    task_index: int = 0
+    role: str
+    goal: str
+    backstory: str
+
+
+class TeamConfig(BaseModel):
+    tasks: List[TaskSpec]
+    agents: List[AgentSpec]
+    recommended_tools: List[str] = []
+    workflow_type: Literal["sequential", "hierarchical"] = "sequential"
+    explanation: str = ""
+
+
+class PersonaConfig(BaseModel):
+    goal: str
+    backstory: str
+
+
+def strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        # Drop the opening fence line (``` or ```json) and a closing fence if present
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        end = text.rfind("```")
+        if end != -1:
+            text = text[:end]
+    return text.strip()
+
+
+def extract_json_object(text: str) -> str:
+    """The outermost JSON object in ``text``.
+
+    Text before the first ``{`` and after its matching ``}`` is dropped. If the
+    object never closes (truncated output) everything from the ``{`` on is
+    returned for ``repair_json``.
+    """
+    text = strip_code_fences(text)
+    start = text.find("{")
+    if start == -1:
+        raise LLMJSONError("No JSON object in response")
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket (outside strings)"""
+    out = []
+    in_string = False
+    escaped = False
+    for c in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "}]":
+            # Remove a comma (and whitespace) directly before a closing bracket
+            j = len(out) - 1
+            while j >= 0 and out[j] in " \t\r\n":
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+        out.append(c)
+    return "".join(out)
+
+
+def repair_json(text: str) -> str:
+    """Best-effort fix of a JSON object that is truncated or has trailing commas.
+
+    The text is cut back to the last point where every open container held
+    only complete members (after an opening bracket, before a comma, or after
+    a closing bracket), and the open containers are closed in order. A
+    member whose value was cut off is dropped rather than guessed.
+    """
+    stack: List[str] = []
+    cut = 0
+    cut_stack: List[str] = []
+    in_string = False
+    escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            cut, cut_stack = i + 1, list(stack)
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            cut, cut_stack = i + 1, list(stack)
+            if not stack:
+                break
+        elif c == ",":
+            cut, cut_stack = i, list(stack)
+
+    if stack or in_string:
+        text = text[:cut].rstrip().rstrip(",") + "".join(reversed(cut_stack))
+    return strip_trailing_commas(text)
+
+
+def loads_tolerant(text: str) -> Tuple[Any, bool]:
+    """Parse the JSON object in ``text``; returns (data, repaired)"""
+    candidate = extract_json_object(text)
+    try:
+        return json.loads(candidate), False
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(candidate)), True
+    except json.JSONDecodeError as e:
+        raise LLMJSONError(f"Invalid JSON: {str(e)}")
+
+
+def _list_item_model(annotation) -> Optional[Type[BaseModel]]:
+    """``Item`` for a ``List[Item]`` field whose items are models"""
+    if typing.get_origin(annotation) in (list, List):
+        args = typing.get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+
+def drop_invalid_items(data: dict, schema: Type[BaseModel]) -> Tuple[dict, int]:
+    """Remove entries of model-typed list fields that fail validation"""
+    dropped = 0
+    for name, field in schema.model_fields.items():
+        item_model = _list_item_model(field.annotation)
+        if item_model is None or not isinstance(data.get(name), list):
+            continue
+        valid = []
+        for item in data[name]:
+            try:
+                item_model.model_validate(item)
+                valid.append(item)
+            except ValidationError:
+                dropped += 1
+        data[name] = valid
+    return data, dropped
+
+
+def parse_llm_json(text: str, schema: Type[BaseModel]) -> Tuple[BaseModel, bool]:
+    """Validated ``schema`` instance from model output; returns (model, repaired).
+
+    ``repaired`` is true if anything had to be fixed or dropped on the way.
+    Raises LLMJSONError when nothing usable can be recovered.
+    """
+    data, repaired = loads_tolerant(text)
+    if not isinstance(data, dict):
+        raise LLMJSONError("Response JSON is not an object")
+    try:
+        return schema.model_validate(data), repaired
+    except ValidationError:
+        pass
+    data, _ = drop_invalid_items(data, schema)
+    try:
+        return schema.model_validate(data), True
+    except ValidationError as e:
+        raise LLMJSONError(f"Response does not match {schema.__name__}: {str(e)}")
+
+
+def _strict(node):
+    """OpenAI strict mode: every object closed and every property required"""
+    if isinstance(node, dict):
+        node.pop("default", None)
+        if node.get("type") == "object" and "properties" in node:
+            node["additionalProperties"] = False
+            node["required"] = list(node["properties"])
+        for value in node.values():
+            _strict(value)
+    elif isinstance(node, list):
+        for value in node:
+            _strict(value)
+    return node
+
+
+_response_formats: Dict[str, dict] = {}
+
+
+def response_format(schema: Type[BaseModel], name: str) -> Optional[dict]:
+    """``response_format`` for a chat completion returning ``schema``.
+
+    Env LLM_RESPONSE_FORMAT selects ``json_schema`` (structured output, the
+    default), ``json_object`` (JSON mode) or ``none``.
+    """
+    mode = os.environ.get("LLM_RESPONSE_FORMAT", "json_schema").lower()
+    if mode == "none":
+        return None
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if name not in _response_formats:
+        _response_formats[name] = {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": _strict(copy.deepcopy(schema.model_json_schema()))},
+        }
+    return _response_formats[name]
+
+
+REPAIR_SYSTEM_PROMPT = "You repair malformed JSON. Reply with only the corrected JSON object. Keep the original content and complete anything that was cut off; add no commentary."
+
+
+def repair_messages(text: str, schema: Type[BaseModel], error: Exception) -> List[Dict[str, str]]:
+    """A short request to turn unusable output into valid JSON for ``schema``.
+
+    Much cheaper than regenerating: no mission, catalog or instructions are
+    resent, and the model only has to reformat what it already wrote.
+    """
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"This output should be a JSON object matching {schema.__name__} but could not be used: {str(error)[:500]}\n\n"
+            f"JSON schema:\n{json.dumps(schema.model_json_schema(), separators=(',', ':'))}\n\n"
+            f"Output to repair:\n{text}"
+        )},
+    ]
@@ -0,0 +1,216 @@
+"""Retry, rate limiting and circuit breaking for upstream LLM calls.
+
+The pieces are independent and hold no I/O of their own; llm_client wires
+them around every completion:
+
+    RetryPolicy     - jittered exponential backoff that honours Retry-After
+    RateLimiter     - a token bucket per API key, so one busy key queues
+                      briefly instead of hammering the provider into 429s
+    CircuitBreaker  - stops calling a provider that keeps failing and lets a
+                      single probe through after a cool-down
+
+Only transient failures are retried: 429, 5xx and connection errors. The
+breaker counts outages (5xx, connection errors and timeouts) but not 429s,
+which are usually about one key's quota rather than the provider's health.
+"""
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (OpenAI APIStatusError, MockLLMError)"""
+    code = getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_connection_error(error: BaseException) -> bool:
+    # openai.APIConnectionError without importing the SDK here
+    return type(error).__name__ in ("APIConnectionError", "ConnectError", "ReadError", "RemoteProtocolError")
+
+
+def is_transient(error: BaseException) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code in TRANSIENT_STATUS_CODES
+    return is_connection_error(error)
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether a failure says something about the provider rather than the request"""
+    code = status_code(error)
+    if code is not None:
+        return code >= 500
+    return is_connection_error(error)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the provider via Retry-After(-ms), if any"""
+    explicit = getattr(error, "retry_after", None)
+    if isinstance(explicit, (int, float)):
+        return float(explicit)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0, max_retry_after: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retrying after failed ``attempt`` (0-based), or None to give up.
+
+        Full jitter (uniform between 0 and the exponential cap) spreads out
+        clients that failed together. A Retry-After from the provider is a
+        lower bound; one longer than ``max_retry_after`` is not waited for.
+        """
+        if attempt >= self.max_retries or not is_transient(error):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now: float, max_wait: float) -> Optional[float]:
+        """Take a token, returning how long to wait for it, or None if that exceeds ``max_wait``.
+
+        Tokens may go negative: each caller reserves the next free slot, so
+        waiting callers are served in order without re-checking.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+
+class RateLimiter:
+    """Token buckets keyed by API key fingerprint, least recently used evicted first"""
+
+    def __init__(self, rate: float, burst: float, max_wait: float, max_keys: int = 1024):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_wait = max_wait
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def reserve(self, key: str) -> Optional[float]:
+        """Seconds to wait before calling with ``key``, or None if the key is over its limit"""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.reserve(now, self.max_wait)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed.
+
+    After ``failure_threshold`` outages in a row the circuit opens and calls
+    are rejected for ``recovery_seconds``. Then one probe call is let through
+    (half-open); its success closes the circuit and its failure reopens it.
+    A probe that never reports back (cancelled) is replaced after another
+    ``recovery_seconds``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        on_state_change: Optional[Callable[[str], None]] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            if self.on_state_change is not None:
+                self.on_state_change(state)
+
+    def check(self) -> Optional[float]:
+        """None if a call may go ahead, otherwise seconds until the next probe"""
+        if self.state == self.CLOSED:
+            return None
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.recovery_seconds - now
+            if remaining > 0:
+                return remaining
+            self._set_state(self.HALF_OPEN)
+        if self._probe_started is not None and now - self._probe_started < self.recovery_seconds:
+            return self._probe_started + self.recovery_seconds - now
+        self._probe_started = now
+        return None
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_started = None
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_started = None
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
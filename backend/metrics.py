@@ -0,0 +1,256 @@
+"""Prometheus metrics without a client library.
+
+Counters, gauges and histograms are kept in plain dicts keyed by label
+values and rendered in the Prometheus text exposition format (0.0.4) by
+``GET /metrics``. Recording is a dict lookup plus an add (histograms also
+bisect their bucket list), cheap enough for every request and every LLM or
+storage call. Everything runs on the event loop, so there is no locking.
+
+``CallbackMetric`` reads values from existing stats at scrape time (the
+generation and artifact caches keep their own counters). ``MetricsMiddleware``
+is a plain ASGI middleware that times every HTTP request by route template.
+"""
+import bisect
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request-scale latencies; LLM calls use LLM_BUCKETS
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, names, values, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """``(suffix, label names, label values, value)`` for every sample line"""
+
+
+class _LabeledMetric(Metric):
+    """A metric recorded in-process, one child series per label values"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self._children: Dict[Tuple[str, ...], object] = {}
+        super().__init__(name, help, labelnames, registry)
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh series for one set of label values"""
+
+    def labels(self, *values):
+        """The series for these label values (positional, in labelnames order)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for values, child in self._children.items():
+            yield "", self.labelnames, values, child.value
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_LabeledMetric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_LabeledMetric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; counts are per bucket, summed when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_LabeledMetric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for values, series in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                yield "_bucket", names, values + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, values, series.sum
+            yield "_count", self.labelnames, values, series.count
+
+
+class CallbackMetric(Metric):
+    """A metric whose series are read from ``fn`` at scrape time.
+
+    ``fn`` returns ``(label_values, value)`` pairs.
+    """
+
+    def __init__(self, name: str, help: str, type: str, labelnames: Sequence[str], fn: Callable[[], Iterable[Tuple[Sequence[str], float]]], registry: Registry = REGISTRY):
+        self.type = type
+        self.fn = fn
+        super().__init__(name, help, labelnames, registry)
+
+    def samples(self):
+        for values, value in self.fn():
+            yield "", self.labelnames, tuple(values), value
+
+
+# HTTP
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency, including streamed bodies", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+# LLM
+LLM_CALL_DURATION = Histogram("llm_call_duration_seconds", "LLM call latency (whole stream for streaming calls)", ("provider", "operation", "outcome"), buckets=LLM_BUCKETS)
+LLM_QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Time waiting for an LLM concurrency slot", ("provider",))
+LLM_IN_FLIGHT = Gauge("llm_calls_in_flight", "LLM calls currently holding a concurrency slot")
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by LLM calls", ("provider", "kind"))
+LLM_RETRIES = Counter("llm_retries_total", "LLM calls retried after a transient failure, by status (or connection)", ("provider", "reason"))
+LLM_REJECTED = Counter("llm_rejected_total", "LLM calls not made: circuit_open or rate_limited", ("provider", "reason"))
+LLM_CIRCUIT_STATE = Gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)", ("provider",))
+LLM_RATE_LIMIT_WAIT = Histogram("llm_rate_limit_wait_seconds", "Time waiting for a per-key LLM rate-limit token", ("provider",))
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Responses served from a heuristic because the LLM was unavailable", ("kind",))
+JSON_PARSE_FAILURES = Counter("llm_json_parse_failures_total", "LLM responses that were not the expected JSON", ("kind",))
+JSON_REPAIRS = Counter("llm_json_repairs_total", "LLM JSON responses recovered by repair (method local or llm)", ("kind", "method"))
+
+# Our own work between the LLM and the response
+TEAM_BUILD_DURATION = Histogram("team_build_duration_seconds", "Building team response models from parsed LLM JSON")
+
+# Storage
+STORE_OPERATION_DURATION = Histogram("team_store_operation_duration_seconds", "Team store operation latency", ("backend", "operation"))
+
+
+class MetricsMiddleware:
+    """Count and time HTTP requests, labelled by route template (not raw path)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
@@ -0,0 +1,64 @@
+"""MongoDB index bootstrap and migration hook.
+
+Migrations run once each at application startup, in list order. Applied
+migration ids are recorded in the ``schema_migrations`` collection so a
+restart only runs what is new. To add an index, append an
+``index_migration(...)`` entry to ``MIGRATIONS``; any other one-off change
+can be added as a ``Migration`` with its own ``apply`` coroutine.
+Never edit or reorder entries that have already shipped.
+"""
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Sequence, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    def __init__(self, migration_id: str, apply: Callable[[object], Awaitable[None]]):
+        self.id = migration_id
+        self.apply = apply
+
+
+def index_migration(migration_id: str, collection: str, keys: Sequence[Tuple[str, int]], **options) -> Migration:
+    """Migration that creates one index on ``collection``"""
+    async def apply(db):
+        await db[collection].create_index(list(keys), **options)
+    return Migration(migration_id, apply)
+
+
+MIGRATIONS: List[Migration] = [
+    index_migration("0001_agent_teams_id_unique", "agent_teams", [("id", ASCENDING)], unique=True, name="id_unique"),
+    index_migration("0002_agent_teams_created_at", "agent_teams", [("created_at", DESCENDING)], name="created_at"),
+    index_migration("0003_agent_teams_mission_name", "agent_teams", [("mission.name", ASCENDING)], name="mission_name"),
+    # Keyset pagination for GET /api/teams (sort order and filtered variant)
+    index_migration("0004_agent_teams_listing", "agent_teams", [("created_at", DESCENDING), ("id", DESCENDING)], name="listing"),
+    index_migration("0005_agent_teams_workflow_listing", "agent_teams", [("workflow_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="workflow_listing"),
+    index_migration("0006_agent_teams_tools_listing", "agent_teams", [("selected_tools", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="tools_listing"),
+    # Revision history for PATCH /api/teams/{id}; one entry per team revision
+    index_migration("0007_team_revisions_team_revision", "team_revisions", [("team_id", ASCENDING), ("revision", DESCENDING)], unique=True, name="team_revision"),
+]
+
+
+async def apply_migrations(db, migrations: Sequence[Migration] = MIGRATIONS) -> List[str]:
+    """Apply pending migrations in order and return the ids that ran.
+
+    A failing migration is logged and stops the run, so later migrations
+    never run on top of a missing earlier one; it is retried on next startup.
+    """
+    applied = {doc["_id"] async for doc in db.schema_migrations.find({}, {"_id": 1})}
+    ran = []
+    for migration in migrations:
+        if migration.id in applied:
+            continue
+        try:
+            await migration.apply(db)
+        except Exception as e:
+            logger.error(f"Migration {migration.id} failed: {str(e)}")
+            break
+        await db.schema_migrations.insert_one({"_id": migration.id, "applied_at": datetime.utcnow()})
+        logger.info(f"Applied migration {migration.id}")
+        ran.append(migration.id)
+    return ran
@@ -0,0 +1,116 @@
+"""Keyword classification of what the user tells the voice agent.
+
+Weighted keyword categories come from a JSON file (mission_keywords.json
+next to this module, or env VOICE_KEYWORDS_FILE):
+
+    missions    - one category per mission name; the best-scoring mission
+                  names the team request (ties go to the one listed first)
+    readiness   - categories that must each reach their threshold, together
+                  with ``min_user_turns``, before a team is generated
+
+Keywords match whole words only, so "content" does not match "discontent".
+A trailing ``*`` matches any word with that prefix ("optimi*" matches
+optimize and optimization) and a keyword may span several words ("social
+media").
+
+Keywords are compiled once into lookup tables keyed by word. An utterance is
+split into words with a single regex and each word, and each run of words up
+to the longest keyword phrase, is looked up, so classifying costs time
+proportional to the utterance rather than to the number of keywords.
+"""
+import json
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+DEFAULT_KEYWORDS_FILE = Path(__file__).parent / "mission_keywords.json"
+
+
+def _normalize(keyword: str) -> str:
+    return " ".join(WORD_RE.findall(keyword.lower()))
+
+
+class KeywordMatcher:
+    """Whole-word matcher for a fixed set of keywords, each weighted per category"""
+
+    def __init__(self, categories: Dict[str, Dict[str, float]]):
+        # keyword -> [(category, weight)]; keys keep the trailing * of prefix keywords
+        self.weights: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+        self._exact: Dict[str, str] = {}
+        self._prefixes: Dict[str, str] = {}
+        self._max_words = 1
+        for category, keywords in categories.items():
+            for keyword, weight in keywords.items():
+                is_prefix = keyword.endswith("*")
+                phrase = _normalize(keyword.rstrip("*"))
+                if not phrase:
+                    raise ValueError(f"Empty keyword in category {category!r}")
+                key = phrase + "*" if is_prefix else phrase
+                (self._prefixes if is_prefix else self._exact)[phrase] = key
+                self.weights[key].append((category, float(weight)))
+                self._max_words = max(self._max_words, phrase.count(" ") + 1)
+        self._prefix_lengths = sorted({len(p) for p in self._prefixes})
+
+    def match(self, text: str) -> Set[str]:
+        """Keywords occurring in ``text``"""
+        words = WORD_RE.findall(text.lower())
+        found = set()
+        for i in range(len(words)):
+            candidate = ""
+            for word in words[i:i + self._max_words]:
+                candidate = f"{candidate} {word}" if candidate else word
+                key = self._exact.get(candidate)
+                if key is not None:
+                    found.add(key)
+                for length in self._prefix_lengths:
+                    if length > len(candidate):
+                        break
+                    key = self._prefixes.get(candidate[:length])
+                    if key is not None:
+                        found.add(key)
+        return found
+
+
+class MissionClassifier:
+    def __init__(self, config: dict):
+        missions = config.get("missions") or {}
+        readiness = config.get("readiness") or {}
+        if not missions:
+            raise ValueError("Keyword file defines no missions")
+        self.default_mission = config.get("default_mission", "Business Growth Project")
+        self.min_user_turns = int(config.get("min_user_turns", 2))
+        self.missions = list(missions)
+        self.thresholds = {name: float(spec.get("threshold", 1)) for name, spec in readiness.items()}
+        categories = dict(missions)
+        categories.update({name: spec.get("keywords") or {} for name, spec in readiness.items()})
+        self.matcher = KeywordMatcher(categories)
+
+    def match(self, text: str) -> Set[str]:
+        return self.matcher.match(text)
+
+    def add_scores(self, scores: Dict[str, float], keywords: Set[str]):
+        """Add the weights of newly matched ``keywords`` to per-category ``scores``"""
+        for keyword in keywords:
+            for category, weight in self.matcher.weights[keyword]:
+                scores[category] = scores.get(category, 0.0) + weight
+
+    def mission_name(self, scores: Dict[str, float]) -> str:
+        best, best_score = self.default_mission, 0.0
+        for name in self.missions:
+            if scores.get(name, 0.0) > best_score:
+                best, best_score = name, scores[name]
+        return best
+
+    def readiness(self, scores: Dict[str, float]) -> Dict[str, bool]:
+        """Whether each readiness category has reached its threshold"""
+        return {name: scores.get(name, 0.0) >= threshold for name, threshold in self.thresholds.items()}
+
+
+def load_mission_classifier(path: Optional[str] = None) -> MissionClassifier:
+    path = path or os.environ.get("VOICE_KEYWORDS_FILE") or DEFAULT_KEYWORDS_FILE
+    with open(path, encoding="utf-8") as f:
+        return MissionClassifier(json.load(f))
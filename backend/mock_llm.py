@@ -0,0 +1,239 @@
+"""Offline stand-in for the OpenAI chat API.
+
+``MockLLMProvider`` answers the prompts this project sends (team generation,
+persona generation and the voice agent's conversation turns) with JSON or
+text of the right shape, after a configurable delay. It is selected with
+``LLM_PROVIDER=mock`` and configured from the environment:
+
+    MOCK_LLM_RESPONSES          - ``canned`` (fixed answers, default) or ``random``
+    MOCK_LLM_LATENCY_MS         - delay before the first token (default 300)
+    MOCK_LLM_JITTER_MS          - +/- uniform jitter on that delay (default 100)
+    MOCK_LLM_TOKENS_PER_SECOND  - generation speed; 0 returns everything at
+                                  once after the first-token delay (default 80)
+    MOCK_LLM_FAILURE_RATE       - fraction of calls failing with a 503 (default 0)
+    MOCK_LLM_MALFORMED_RATE     - fraction of JSON answers that come back fenced,
+                                  wrapped in chatter, with trailing commas or
+                                  truncated, to exercise llm_json (default 0)
+    MOCK_LLM_SEED               - RNG seed (default 0)
+
+Runs are deterministic for a given seed: response bodies depend only on the
+seed and the prompt, and latency/failure draws come from one seeded RNG in
+call order. Tokens are approximated as 4-character chunks.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from typing import AsyncIterator, Dict, List, Optional
+
+from llm_json import REPAIR_SYSTEM_PROMPT, extract_json_object, repair_json
+from metrics import LLM_TOKENS
+from prompts import PERSONA_SYSTEM_PROMPT, TEAM_SYSTEM_PROMPT
+
+CHARS_PER_TOKEN = 4
+
+CANNED_TEAM = {
+    "tasks": [
+        {"title": "Research the landscape", "description": "Collect data on the market, competitors and audience for the mission", "order": 1},
+        {"title": "Plan the approach", "description": "Turn the research into a prioritised plan with measurable milestones", "order": 2},
+        {"title": "Produce the deliverable", "description": "Write the final report: findings, recommendations and next steps", "order": 3},
+    ],
+    "agents": [
+        {"task_index": 0, "role": "Market Research Analyst", "goal": "Gather accurate, current data that grounds every later decision.", "backstory": "Analyst with ten years in competitive intelligence. Known for finding the numbers others miss."},
+        {"task_index": 1, "role": "Strategy Planner", "goal": "Build a realistic plan that turns research into action.", "backstory": "Former management consultant who has planned launches for dozens of startups."},
+        {"task_index": 2, "role": "Report Writer", "goal": "Deliver a clear, persuasive report for decision makers.", "backstory": "Business journalist turned analyst who writes for executive audiences."},
+    ],
+    "recommended_tools": ["serper_search", "website_search", "file_read"],
+    "workflow_type": "sequential",
+    "explanation": "Research feeds planning, which feeds the final report, so the tasks run in order.",
+}
+
+CANNED_PERSONA = {
+    "goal": "Complete the assigned task thoroughly and hand over results the next agent can act on.",
+    "backstory": "A seasoned specialist with years of hands-on experience in this role. Trusted for reliable, well-documented work.",
+}
+
+CANNED_REPLY = "That sounds like a great project. Who are the main customers you want to reach?"
+
+_TOPICS = ["market", "audience", "content", "pricing", "operations", "analytics", "outreach", "product", "support", "growth"]
+_ACTIONS = ["Research", "Analyse", "Plan", "Design", "Draft", "Review", "Optimise", "Launch"]
+_SPECIALTIES = ["Analyst", "Strategist", "Specialist", "Planner", "Writer", "Coordinator", "Engineer"]
+_QUESTIONS = [
+    "Who are the main customers you want to reach?",
+    "What would success look like for you in three months?",
+    "What is the biggest obstacle you are facing right now?",
+    "Which parts of this take up most of your time today?",
+]
+_TOOL_ID = re.compile(r"\(ID: ([^)]+)\)")
+_MALFORMATIONS = ["fenced", "chatter", "trailing_comma", "truncated"]
+
+
+class MockLLMError(Exception):
+    """A simulated provider failure (HTTP 503)"""
+
+    status_code = 503
+
+
+class MockLLMProvider:
+    name = "mock"
+
+    def __init__(
+        self,
+        responses: str = "canned",
+        latency_ms: float = 300,
+        jitter_ms: float = 100,
+        tokens_per_second: float = 80,
+        failure_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        if responses not in ("canned", "random"):
+            raise ValueError(f"Unknown mock response mode {responses!r}")
+        self.responses = responses
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "MockLLMProvider":
+        return cls(
+            responses=os.environ.get("MOCK_LLM_RESPONSES", "canned"),
+            latency_ms=float(os.environ.get("MOCK_LLM_LATENCY_MS", "300")),
+            jitter_ms=float(os.environ.get("MOCK_LLM_JITTER_MS", "100")),
+            tokens_per_second=float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", "80")),
+            failure_rate=float(os.environ.get("MOCK_LLM_FAILURE_RATE", "0")),
+            malformed_rate=float(os.environ.get("MOCK_LLM_MALFORMED_RATE", "0")),
+            seed=int(os.environ.get("MOCK_LLM_SEED", "0")),
+        )
+
+    def response_for(self, messages: List[Dict[str, str]]) -> str:
+        """The full text the mock answers ``messages`` with"""
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        prompt = messages[-1]["content"] if messages else ""
+        rng = random.Random(f"{self.seed}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}")
+        if system == TEAM_SYSTEM_PROMPT:
+            return json.dumps(self._team(prompt, rng), indent=2)
+        if system == PERSONA_SYSTEM_PROMPT:
+            return json.dumps(self._persona(prompt, rng), indent=2)
+        if system == REPAIR_SYSTEM_PROMPT:
+            return self._repair(prompt)
+        return self._reply(prompt, rng)
+
+    def _team(self, prompt: str, rng: random.Random) -> dict:
+        if self.responses == "canned":
+            return CANNED_TEAM
+        size = rng.randint(3, 5)
+        topics = rng.sample(_TOPICS, size)
+        tasks = []
+        agents = []
+        for i, topic in enumerate(topics):
+            action = rng.choice(_ACTIONS)
+            role = f"{topic.title()} {rng.choice(_SPECIALTIES)}"
+            tasks.append({
+                "title": f"{action} {topic}",
+                "description": f"{action} the {topic} work for the mission and document the results",
+                "order": i + 1,
+            })
+            agents.append({
+                "task_index": i,
+                "role": role,
+                "goal": f"Own the {topic} workstream and deliver measurable results.",
+                "backstory": f"{rng.randint(4, 20)} years of experience as a {role.lower()}. Trusted to deliver under pressure.",
+            })
+        tool_ids = _TOOL_ID.findall(prompt) or CANNED_TEAM["recommended_tools"]
+        return {
+            "tasks": tasks,
+            "agents": agents,
+            "recommended_tools": rng.sample(tool_ids, min(len(tool_ids), rng.randint(3, 6))),
+            "workflow_type": rng.choice(["sequential", "hierarchical"]),
+            "explanation": f"{size} focused workstreams, one specialist each.",
+        }
+
+    def _repair(self, prompt: str) -> str:
+        # Keep what survives of the broken output and complete the rest
+        canned = CANNED_TEAM if "TeamConfig" in prompt else CANNED_PERSONA
+        broken = prompt.split("Output to repair:\n", 1)[-1]
+        try:
+            recovered = json.loads(repair_json(extract_json_object(broken)))
+        except ValueError:
+            recovered = {}
+        return json.dumps({**canned, **recovered})
+
+    def _persona(self, prompt: str, rng: random.Random) -> dict:
+        if self.responses == "canned":
+            return CANNED_PERSONA
+        role = re.search(r"^Role: (.*)$", prompt, re.MULTILINE)
+        role = role.group(1).strip() if role else "specialist"
+        return {
+            "goal": f"Deliver the {role} work to a standard the rest of the team can build on.",
+            "backstory": f"A {role} with {rng.randint(4, 20)} years of experience. Known for clear communication and reliable results.",
+        }
+
+    def _reply(self, prompt: str, rng: random.Random) -> str:
+        text = CANNED_REPLY if self.responses == "canned" else f"Thanks, that helps. {rng.choice(_QUESTIONS)}"
+        # The voice agent asks for READY_TO_GENERATE once it has enough context
+        if "READY_TO_GENERATE" in prompt and prompt.count("User:") >= 2:
+            text = "I have a good picture of what you need now.\nREADY_TO_GENERATE"
+        return text
+
+    def _malform(self, text: str) -> str:
+        kind = self._rng.choice(_MALFORMATIONS)
+        if kind == "fenced":
+            return f"```json\n{text}\n```"
+        if kind == "chatter":
+            return f"Here is the configuration you asked for:\n{text}\nLet me know if you want changes."
+        if kind == "trailing_comma":
+            return text.replace("\n  ]", ",\n  ]")
+        return text[:int(len(text) * self._rng.uniform(0.3, 0.95))]
+
+    def _draw(self) -> float:
+        """First-token delay for one call; raises for a simulated failure"""
+        self.calls += 1
+        delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        if self._rng.random() < self.failure_rate:
+            raise MockLLMError("Mock LLM provider unavailable")
+        return delay
+
+    def _chunks(self, messages, max_tokens: Optional[int]) -> List[str]:
+        text = self.response_for(messages)
+        # Only drawn when enabled, so runs without it keep their sequence
+        if self.malformed_rate and text.startswith("{") and self._rng.random() < self.malformed_rate:
+            text = self._malform(text)
+        chunks = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+        if max_tokens:
+            chunks = chunks[:max_tokens]
+        # Same token estimate as the chunking, so usage metrics look like the real thing
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        LLM_TOKENS.labels(self.name, "prompt").inc(prompt_chars // CHARS_PER_TOKEN)
+        LLM_TOKENS.labels(self.name, "completion").inc(len(chunks))
+        return chunks
+
+    async def complete(self, api_key: str, messages, model, temperature, max_tokens, timeout, response_format=None) -> str:
+        delay = self._draw()
+        chunks = self._chunks(messages, max_tokens)
+        if self.tokens_per_second > 0:
+            delay += len(chunks) / self.tokens_per_second
+        await asyncio.sleep(delay)
+        return "".join(chunks)
+
+    async def stream(self, api_key: str, messages, model, temperature, max_tokens, timeout, response_format=None) -> AsyncIterator[str]:
+        delay = self._draw()
+        chunks = self._chunks(messages, max_tokens)
+        await asyncio.sleep(delay)
+        if self.tokens_per_second <= 0:
+            yield "".join(chunks)
+            return
+        interval = 1 / self.tokens_per_second
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(interval)
+
+    async def aclose(self):
+        pass
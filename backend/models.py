@@ -0,0 +1,171 @@
+"""Pydantic models for the API: stored team documents, requests and responses."""
+import uuid
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Mission(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    objective: str
+    description: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Task(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    title: str
+    description: str
+    order: int
+
+
+class Agent(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    task_id: str
+    role: str
+    goal: str
+    backstory: str
+
+
+class Tool(BaseModel):
+    id: str
+    name: str
+    description: str
+    class_name: str
+
+
+class AgentTeam(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    mission: Mission
+    tasks: List[Task]
+    agents: List[Agent]
+    selected_tools: List[str]  # List of tool IDs
+    workflow_type: Literal["sequential", "hierarchical"]
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped by every PATCH; documents saved before revisions existed count as 0
+    revision: int = 0
+
+
+# Request/Response Models
+class MissionCreate(BaseModel):
+    name: str
+    objective: str
+    description: Optional[str] = None
+
+
+class TaskCreate(BaseModel):
+    title: str
+    description: str
+
+
+class GeneratePersonaRequest(BaseModel):
+    role: str
+    task_description: str
+    use_emergent_key: bool = True
+    openai_api_key: Optional[str] = None
+
+
+class PersonaResponse(BaseModel):
+    goal: str
+    backstory: str
+
+
+class GeneratePersonasRequest(BaseModel):
+    items: List[GeneratePersonaRequest]
+    # Use the heuristic persona for items whose AI generation fails
+    fallback_on_error: bool = True
+
+
+class PersonaBatchResult(BaseModel):
+    index: int
+    persona: Optional[PersonaResponse] = None
+    fallback: bool = False
+    error: Optional[str] = None
+
+
+class GeneratePersonasResponse(BaseModel):
+    results: List[PersonaBatchResult]
+
+
+class CreateTeamRequest(BaseModel):
+    mission: Mission
+    tasks: List[Task]
+    agents: List[Agent]
+    selected_tools: List[str]
+    workflow_type: Literal["sequential", "hierarchical"]
+
+
+class MissionPatch(BaseModel):
+    name: Optional[str] = None
+    objective: Optional[str] = None
+    description: Optional[str] = None
+
+
+class TaskPatch(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    order: Optional[int] = None
+
+
+class AgentPatch(BaseModel):
+    id: str
+    task_id: Optional[str] = None
+    role: Optional[str] = None
+    goal: Optional[str] = None
+    backstory: Optional[str] = None
+
+
+class UpdateTeamRequest(BaseModel):
+    # Revision the client last read; the update is rejected if the team has moved on
+    revision: int
+    mission: Optional[MissionPatch] = None
+    tasks: Optional[List[TaskPatch]] = None
+    agents: Optional[List[AgentPatch]] = None
+    selected_tools: Optional[List[str]] = None
+    workflow_type: Optional[Literal["sequential", "hierarchical"]] = None
+
+
+class IntelligentTeamRequest(BaseModel):
+    mission_name: str
+    mission_objective: str
+    mission_description: Optional[str] = None
+    use_emergent_key: bool = True
+    openai_api_key: Optional[str] = None
+
+
+class IntelligentTeamResponse(BaseModel):
+    mission: Mission
+    tasks: List[Task]
+    agents: List[Agent]
+    recommended_tools: List[str]
+    workflow_type: Literal["sequential", "hierarchical"]
+    explanation: str
+
+
+class YAMLGenerateRequest(BaseModel):
+    team_id: str
+
+
+class TeamPipelineRequest(BaseModel):
+    # Exactly one of: a finished team to save, or a mission to generate one from
+    team: Optional[CreateTeamRequest] = None
+    generate: Optional[IntelligentTeamRequest] = None
+    # "async" returns before the team is written; it becomes readable shortly after
+    durability: Literal["sync", "async"] = "sync"
+
+
+class TeamPipelineResponse(BaseModel):
+    success: bool = True
+    team_id: str
+    yaml: str
+    filename: str
+    persisted: bool
+    team: Optional[AgentTeam] = None  # Only for generated teams; callers sending a team already have it
+
+
+class LiveKitTokenRequest(BaseModel):
+    room_name: str
+    participant_name: str
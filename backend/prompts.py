@@ -0,0 +1,161 @@
+"""Prompt templates and the indexed CrewAI tool catalog.
+
+The static parts of each prompt (instructions, JSON schema example and the
+rendered tool list) are built once and reused for every request; only the
+mission or persona details are formatted per call. Each template exposes a
+short ``version`` hash of its static text so caches can key on it and are
+invalidated automatically when a prompt or the tool catalog changes.
+"""
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+TEAM_SYSTEM_PROMPT = "You are an expert at creating comprehensive AI agent teams for CrewAI framework. Analyze missions and create complete team configurations with tasks, agents, tools, and workflows."
+
+TEAM_MISSION_TEMPLATE = """Analyze this mission and generate a complete AI agent team configuration:
+
+MISSION DETAILS:
+- Name: {name}
+- Objective: {objective}
+- Description: {description}"""
+
+# Rendered once per catalog revision; {tools_info} is substituted with str.replace
+TEAM_INSTRUCTIONS_TEMPLATE = """
+
+AVAILABLE CREWAI TOOLS:
+{tools_info}
+
+Generate a comprehensive JSON response with this EXACT structure:
+{
+  "tasks": [
+    {
+      "title": "Task Name",
+      "description": "Detailed task description",
+      "order": 1
+    }
+  ],
+  "agents": [
+    {
+      "task_index": 0,
+      "role": "Expert Role Name",
+      "goal": "Specific, actionable goal statement (1-2 sentences)",
+      "backstory": "Compelling professional backstory establishing expertise (2-3 sentences)"
+    }
+  ],
+  "recommended_tools": ["tool_id_1", "tool_id_2"],
+  "workflow_type": "sequential" or "hierarchical",
+  "explanation": "Brief explanation of why this team structure was chosen"
+}
+
+REQUIREMENTS:
+1. Generate 3-5 logical sequential tasks that build toward the mission objective
+2. Create one specialized agent per task with relevant expertise
+3. Recommend 3-8 appropriate tools from the available list based on task requirements
+4. Choose workflow type: "sequential" for step-by-step tasks, "hierarchical" for complex coordination
+5. Ensure tasks are specific, measurable, and achievable
+6. Make agent roles specific and expert-level (e.g., "Digital Marketing Strategist" not just "Marketer")
+7. Agent goals should be task-specific and actionable
+8. Agent backstories should establish credibility and relevant experience
+
+Respond with ONLY the JSON, no additional text or formatting."""
+
+PERSONA_SYSTEM_PROMPT = "You are an expert at creating detailed AI agent personas for multi-agent systems. Generate compelling, professional agent goals and backstories."
+
+PERSONA_TEMPLATE = """Create a detailed persona for an AI agent with the following specifications:
+
+Role: {role}
+Task: {task_description}
+
+Please generate EXACTLY in this JSON format:
+{{
+  "goal": "A clear, action-oriented goal statement for this agent (1-2 sentences)",
+  "backstory": "A compelling professional backstory that explains the agent's expertise and experience (2-3 sentences)"
+}}
+
+The goal should be specific to the task and role. The backstory should establish credibility and expertise.
+Respond with ONLY the JSON, no additional text."""
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+class ToolCatalog:
+    """The available tools with id and class-name indexes.
+
+    ``update`` re-renders the indexes and prompt text only when the catalog
+    content actually changes; ``fingerprint`` identifies the current revision.
+    """
+
+    def __init__(self, tools: List[dict]):
+        self.fingerprint = ""
+        self.update(tools)
+
+    def update(self, tools: List[dict]) -> bool:
+        fingerprint = _digest(json.dumps(tools, sort_keys=True))
+        if fingerprint == self.fingerprint:
+            return False
+
+        self.tools = list(tools)
+        self.by_id: Dict[str, dict] = {tool["id"]: tool for tool in self.tools}
+        self.by_class_name: Dict[str, dict] = {tool["class_name"]: tool for tool in self.tools}
+        self.valid_ids = frozenset(self.by_id)
+        self.tools_info = "\n".join(
+            f"- {tool['name']} (ID: {tool['id']}): {tool['description']} (Class: {tool['class_name']}, Category: {tool['category']})"
+            for tool in self.tools
+        )
+        self.fingerprint = fingerprint
+        return True
+
+    def get(self, tool_id: str) -> Optional[dict]:
+        return self.by_id.get(tool_id)
+
+    def class_name(self, tool_id: str) -> str:
+        """CrewAI class for a tool id, or the id itself for unknown tools"""
+        tool = self.by_id.get(tool_id)
+        return tool["class_name"] if tool else tool_id
+
+
+class TeamPrompt:
+    """Team generation prompt with its static tail pre-rendered from the catalog"""
+
+    def __init__(self, catalog: ToolCatalog):
+        self.catalog = catalog
+        self._rendered_for = None
+        self._render()
+
+    def _render(self):
+        if self._rendered_for == self.catalog.fingerprint:
+            return
+        self._instructions = TEAM_INSTRUCTIONS_TEMPLATE.replace("{tools_info}", self.catalog.tools_info)
+        self._version = _digest(TEAM_SYSTEM_PROMPT, TEAM_MISSION_TEMPLATE, self._instructions)
+        self._rendered_for = self.catalog.fingerprint
+
+    @property
+    def version(self) -> str:
+        """Hash of the static prompt text, including the rendered tool catalog"""
+        self._render()
+        return self._version
+
+    def messages(self, name: str, objective: str, description: Optional[str]) -> List[Dict[str, str]]:
+        self._render()
+        prompt = TEAM_MISSION_TEMPLATE.format(
+            name=name,
+            objective=objective,
+            description=description or "No additional context provided",
+        ) + self._instructions
+        return [
+            {"role": "system", "content": TEAM_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+
+PERSONA_PROMPT_VERSION = _digest(PERSONA_SYSTEM_PROMPT, PERSONA_TEMPLATE)
+
+
+def persona_messages(role: str, task_description: str) -> List[Dict[str, str]]:
+    prompt = PERSONA_TEMPLATE.format(role=role, task_description=task_description)
+    return [
+        {"role": "system", "content": PERSONA_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
@@ -0,0 +1,160 @@
+"""Content-addressed cache for generated LLM output.
+
+Two tiers are supported:
+    * an in-process LRU (always on) that serves repeats in microseconds
+    * an optional MongoDB collection with a TTL index that survives restarts
+      and is shared between workers
+
+Values must be JSON-serialisable dicts. Keys are SHA-256 digests of the
+normalised request fields that determine the generated content.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Collapse whitespace and case so trivially different inputs share a key"""
+    if not value:
+        return ""
+    return " ".join(value.split()).casefold()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Hash an ordered tuple of JSON-serialisable parts into a cache key"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_cache_control(header: Optional[str]) -> Tuple[bool, bool]:
+    """Return (may_read, may_store) for a request Cache-Control header.
+
+    ``no-cache`` forces a fresh generation but still stores the result;
+    ``no-store`` bypasses the cache entirely.
+    """
+    if not header:
+        return True, True
+    directives = {part.strip().lower() for part in header.split(",")}
+    if "no-store" in directives:
+        return False, False
+    if "no-cache" in directives:
+        return False, True
+    return True, True
+
+
+class LRUCache:
+    """Bounded in-memory LRU with per-entry expiry"""
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class MongoCacheTier:
+    """Cache entries stored in a MongoDB collection expired by a TTL index"""
+
+    def __init__(self, collection, ttl_seconds: float):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"value": 1},
+        )
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Dict):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)}},
+            upsert=True,
+        )
+
+
+class TieredCache:
+    """LRU in front of an optional shared MongoDB tier, with hit/miss counters"""
+
+    def __init__(self, name: str, memory: LRUCache, mongo: Optional[MongoCacheTier] = None):
+        self.name = name
+        self.memory = memory
+        self.mongo = mongo
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.mongo is not None:
+            try:
+                value = await self.mongo.get(key)
+            except Exception as e:
+                logger.warning(f"{self.name} cache: MongoDB read failed: {str(e)}")
+                value = None
+            if value is not None:
+                self.mongo_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict):
+        self.memory.set(key, value)
+        if self.mongo is not None:
+            try:
+                await self.mongo.set(key, value)
+            except Exception as e:
+                logger.warning(f"{self.name} cache: MongoDB write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.mongo_hits
+        lookups = hits + self.misses
+        return {
+            "name": self.name,
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "mongo_enabled": self.mongo is not None,
+        }
@@ -1,25 +1,116 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import asyncio
+import base64
 import logging
+import math
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Literal
-import uuid
+from pydantic import ValidationError
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Literal, Set
 from datetime import datetime
-import openai
+import llm_client
+from llm_client import LLMTimeoutError, LLMUnavailableError, key_fingerprint
+import llm_json
+from llm_json import LLMJSONError, PersonaConfig, parse_llm_json
+from models import (
+    AgentTeam,
+    CreateTeamRequest,
+    GeneratePersonaRequest,
+    GeneratePersonasRequest,
+    GeneratePersonasResponse,
+    IntelligentTeamRequest,
+    IntelligentTeamResponse,
+    LiveKitTokenRequest,
+    PersonaBatchResult,
+    PersonaResponse,
+    TeamPipelineRequest,
+    TeamPipelineResponse,
+    UpdateTeamRequest,
+    YAMLGenerateRequest,
+)
+import team_service
+from team_service import (
+    TeamBuilder,
+    TeamGenerationError,
+    build_team_response,
+    cached_team_parts,
+    generation_flights,
+    resolve_team_config,
+    streamed_team_parts,
+    team_cache,
+    team_cache_key,
+)
+from tools import AVAILABLE_TOOLS, tool_catalog
+from team_store import MeteredTeamStore, MotorTeamStore, create_team_store
+import metrics
+from metrics import JSON_PARSE_FAILURES, JSON_REPAIRS, LLM_FALLBACKS, CallbackMetric, MetricsMiddleware
+from artifacts import ArtifactCache, RenderedArtifact, etag_matches
+from exporters import EXPORTERS, get_exporter
+from yaml_emitter import iter_crewai_yaml, render_crewai_yaml, yaml_filename
+from prompts import PERSONA_PROMPT_VERSION, persona_messages
+from response_cache import MongoCacheTier, make_cache_key, normalize_text, parse_cache_control
 from livekit import api
-import time
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Team storage, chosen by TEAM_STORE (mongo, memory or sqlite); connects on startup
+team_store = MeteredTeamStore(create_team_store())
+
+# Read projections for teams; excluding _id avoids ObjectId serialization issues
+TEAM_PROJECTION = {"_id": 0}
+YAML_PROJECTION = {
+    "_id": 0,
+    "mission.name": 1,
+    "mission.objective": 1,
+    "mission.description": 1,
+    "tasks.description": 1,
+    "agents.role": 1,
+    "agents.goal": 1,
+    "agents.backstory": 1,
+    "selected_tools": 1,
+    "workflow_type": 1,
+    "revision": 1,
+}
+
+# Fields callers may select in team listings (always newest first)
+TEAM_LISTING_FIELDS = {"mission", "tasks", "agents", "selected_tools", "workflow_type"}
+
+# Documents per insert_many call for /api/teams/bulk
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', '500'))
+# Longest accepted NDJSON line (one team) for /api/teams/bulk
+BULK_IMPORT_MAX_LINE_BYTES = int(os.environ.get('BULK_IMPORT_MAX_LINE_BYTES', str(1024 * 1024)))
+
+# Rendered artifacts (YAML downloads) served without a store read; a PATCH handled
+# by another worker shows up here within ARTIFACT_CACHE_TTL_SECONDS
+artifact_cache = ArtifactCache(
+    max_teams=int(os.environ.get('ARTIFACT_CACHE_TEAMS', '1024')),
+    ttl_seconds=float(os.environ.get('ARTIFACT_CACHE_TTL_SECONDS', '30')),
+)
+# Above this many agents+tasks, YAML downloads are streamed instead of cached
+YAML_STREAM_THRESHOLD = int(os.environ.get('YAML_STREAM_THRESHOLD', '2000'))
+# Chunk size for streaming binary artifacts such as zip bundles
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+# Combined YAML only needs these fields; other export formats read the whole team
+EXPORT_PROJECTIONS = {"crewai-yaml": YAML_PROJECTION}
+
+# Persona generation settings (team generation lives in team_service.py)
+PERSONA_MODEL = "gpt-4o-mini"
+
+# MongoDB tier for the team generation cache, attached on startup when teams are stored in MongoDB
+team_cache_mongo_ttl = float(os.environ.get('TEAM_CACHE_MONGO_TTL_SECONDS', '0'))
+
+# Team inserts still running for /api/team-pipeline calls with durability="async";
+# awaited on shutdown so accepted teams are not lost
+pending_team_writes: Set[asyncio.Task] = set()
+
+# Bounds concurrent persona generations issued by /api/generate-personas
+persona_batch_semaphore = asyncio.Semaphore(int(os.environ.get('PERSONA_BATCH_CONCURRENCY', '4')))
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -27,143 +118,17 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Data Models for the 6-step wizard
-
-class Mission(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    objective: str
-    description: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-class Task(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    title: str
-    description: str
-    order: int
-
-class Agent(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    task_id: str
-    role: str
-    goal: str
-    backstory: str
-
-class Tool(BaseModel):
-    id: str
-    name: str
-    description: str
-    class_name: str
-
-class AgentTeam(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    mission: Mission
-    tasks: List[Task]
-    agents: List[Agent]
-    selected_tools: List[str]  # List of tool IDs
-    workflow_type: Literal["sequential", "hierarchical"]
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-# Request/Response Models
-class MissionCreate(BaseModel):
-    name: str
-    objective: str
-    description: Optional[str] = None
-
-class TaskCreate(BaseModel):
-    title: str
-    description: str
-
-class GeneratePersonaRequest(BaseModel):
-    role: str
-    task_description: str
-    use_emergent_key: bool = True
-    openai_api_key: Optional[str] = None
-
-class PersonaResponse(BaseModel):
-    goal: str
-    backstory: str
-
-class CreateTeamRequest(BaseModel):
-    mission: Mission
-    tasks: List[Task]
-    agents: List[Agent]
-    selected_tools: List[str]
-    workflow_type: Literal["sequential", "hierarchical"]
-
-class IntelligentTeamRequest(BaseModel):
-    mission_name: str
-    mission_objective: str
-    mission_description: Optional[str] = None
-    use_emergent_key: bool = True
-    openai_api_key: Optional[str] = None
-
-class IntelligentTeamResponse(BaseModel):
-    mission: Mission
-    tasks: List[Task]
-    agents: List[Agent]
-    recommended_tools: List[str]
-    workflow_type: Literal["sequential", "hierarchical"]
-    explanation: str
-
-class YAMLGenerateRequest(BaseModel):
-    team_id: str
-
-class LiveKitTokenRequest(BaseModel):
-    room_name: str
-    participant_name: str
-
-# Comprehensive CrewAI tools catalog
-AVAILABLE_TOOLS = [
-    # Search & Research
-    {"id": "serper_search", "name": "Google Search", "description": "Perform web searches and retrieve search results", "class_name": "SerperDevTool", "category": "Search & Research"},
-    {"id": "website_search", "name": "Website Search", "description": "Search website content, optimized for web data extraction", "class_name": "WebsiteSearchTool", "category": "Search & Research"},
-    {"id": "exa_search", "name": "EXA Search", "description": "Perform exhaustive searches across various data sources", "class_name": "EXASearchTool", "category": "Search & Research"},
-    {"id": "github_search", "name": "GitHub Search", "description": "Search within GitHub repositories for code and documentation", "class_name": "GithubSearchTool", "category": "Search & Research"},
-    {"id": "youtube_channel_search", "name": "YouTube Channel Search", "description": "Search within YouTube channels for video content analysis", "class_name": "YoutubeChannelSearchTool", "category": "Search & Research"},
-    {"id": "youtube_video_search", "name": "YouTube Video Search", "description": "Search within YouTube videos for data extraction", "class_name": "YoutubeVideoSearchTool", "category": "Search & Research"},
-    
-    # File & Document Management
-    {"id": "file_read", "name": "File Reader", "description": "Read content from various file types, including text and markdown", "class_name": "FileReadTool", "category": "File & Document"},
-    {"id": "file_write", "name": "File Writer", "description": "Write content to files, create new documents, and save processed data", "class_name": "FileWriteTool", "category": "File & Document"},
-    {"id": "pdf_search", "name": "PDF Search", "description": "Search and extract text from PDF documents efficiently", "class_name": "PDFSearchTool", "category": "File & Document"},
-    {"id": "docx_search", "name": "Word Document Search", "description": "Search through Microsoft Word documents and extract relevant content", "class_name": "DOCXSearchTool", "category": "File & Document"},
-    {"id": "json_search", "name": "JSON Search", "description": "Parse and search through JSON files with advanced query capabilities", "class_name": "JSONSearchTool", "category": "File & Document"},
-    {"id": "csv_search", "name": "CSV Search", "description": "Process and search through CSV files, extracting specific rows and columns", "class_name": "CSVSearchTool", "category": "File & Document"},
-    {"id": "directory_read", "name": "Directory Reader", "description": "Read and list directory contents, file structures, and metadata", "class_name": "DirectoryReadTool", "category": "File & Document"},
-    
-    # Web Scraping & Browsing
-    {"id": "scrape_website", "name": "Website Scraper", "description": "Facilitates scraping entire websites for comprehensive data collection", "class_name": "ScrapeWebsiteTool", "category": "Web Scraping"},
-    {"id": "selenium_scraping", "name": "Selenium Scraper", "description": "Allows for precise extraction of content from web pages using CSS selectors", "class_name": "SeleniumScrapingTool", "category": "Web Scraping"},
-    {"id": "firecrawl_search", "name": "Firecrawl Search", "description": "Search webpages using Firecrawl and return the results", "class_name": "FirecrawlSearchTool", "category": "Web Scraping"},
-    
-    # Database & Data
-    {"id": "pg_search", "name": "PostgreSQL Search", "description": "Optimized for searching within PostgreSQL databases", "class_name": "PGSearchTool", "category": "Database & Data"},
-    {"id": "mysql_search", "name": "MySQL Search", "description": "Interact with MySQL databases for data retrieval", "class_name": "MySQLSearchTool", "category": "Database & Data"},
-    {"id": "nl2sql", "name": "Natural Language to SQL", "description": "Convert natural language queries into SQL commands", "class_name": "NL2SQLTool", "category": "Database & Data"},
-    
-    # AI & Machine Learning
-    {"id": "dalle_tool", "name": "DALL-E Image Generator", "description": "Generate images using the DALL-E API", "class_name": "DALL-ETool", "category": "AI & ML"},
-    {"id": "vision_tool", "name": "Vision Tool", "description": "Process vision tasks and analyze images", "class_name": "VisionTool", "category": "AI & ML"},
-    {"id": "code_interpreter", "name": "Code Interpreter", "description": "Interpret and execute Python code", "class_name": "CodeInterpreterTool", "category": "AI & ML"},
-    
-    # Communication & Collaboration
-    {"id": "gmail_tool", "name": "Gmail", "description": "Manage emails and drafts", "class_name": "GmailTool", "category": "Communication"},
-    {"id": "slack_tool", "name": "Slack", "description": "Send workspace notifications and alerts", "class_name": "SlackTool", "category": "Communication"},
-    
-    # Project Management
-    {"id": "jira_tool", "name": "Jira", "description": "Issue tracking and project management", "class_name": "JiraTool", "category": "Project Management"},
-    {"id": "github_tool", "name": "GitHub", "description": "Repository and issue management", "class_name": "GitHubTool", "category": "Project Management"},
-    {"id": "notion_tool", "name": "Notion", "description": "Page and database management", "class_name": "NotionTool", "category": "Project Management"},
-    
-    # Business & Finance
-    {"id": "stripe_tool", "name": "Stripe", "description": "Payment processing and customer management", "class_name": "StripeTool", "category": "Business & Finance"},
-    {"id": "salesforce_tool", "name": "Salesforce", "description": "CRM account and opportunity management", "class_name": "SalesforceTool", "category": "Business & Finance"},
-    
-    # Productivity & Storage
-    {"id": "google_sheets", "name": "Google Sheets", "description": "Spreadsheet data synchronization", "class_name": "GoogleSheetsTool", "category": "Productivity"},
-    {"id": "google_calendar", "name": "Google Calendar", "description": "Event and schedule management", "class_name": "GoogleCalendarTool", "category": "Productivity"},
-]
+
+def resolve_api_key(use_emergent_key: bool, openai_api_key: Optional[str]) -> str:
+    """Pick the OpenAI API key for a request (see team_service.resolve_api_key)"""
+    try:
+        return team_service.resolve_api_key(use_emergent_key, openai_api_key)
+    except TeamGenerationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def retry_after_header(e: LLMUnavailableError) -> Dict[str, str]:
+    """Retry-After for a 503, so clients back off instead of retrying at once"""
+    return {"Retry-After": str(max(1, math.ceil(e.retry_after or 0)))}
 
 # API Endpoints
 
@@ -177,205 +142,254 @@ async def get_available_tools():
     return {"tools": AVAILABLE_TOOLS}
 
 @api_router.post("/generate-intelligent-team", response_model=IntelligentTeamResponse)
-async def generate_intelligent_team(request: IntelligentTeamRequest):
-    """Generate complete AI team configuration from mission statement"""
+async def generate_intelligent_team(
+    request: IntelligentTeamRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
+    """Generate complete AI team configuration from mission statement.
+
+    Parsed configurations are cached by request content; send
+    ``Cache-Control: no-cache`` to force a fresh generation or ``no-store``
+    to bypass the cache entirely.
+    """
     try:
-        # Use OpenAI API key from environment or provided key
-        if request.use_emergent_key or not request.openai_api_key:
-            api_key = os.environ.get('OPENAI_API_KEY')
-            if not api_key:
-                raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-        else:
-            api_key = request.openai_api_key
-        
-        # Initialize OpenAI client
-        openai.api_key = api_key
-        
-        # Create comprehensive prompt for intelligent team generation
-        tools_info = "\n".join([f"- {tool['name']}: {tool['description']} (Class: {tool['class_name']}, Category: {tool['category']})" for tool in AVAILABLE_TOOLS])
-        
-        prompt = f"""Analyze this mission and generate a complete AI agent team configuration:
-
-MISSION DETAILS:
-- Name: {request.mission_name}
-- Objective: {request.mission_objective}
-- Description: {request.mission_description or "No additional context provided"}
-
-AVAILABLE CREWAI TOOLS:
-{tools_info}
-
-Generate a comprehensive JSON response with this EXACT structure:
-{{
-  "tasks": [
-    {{
-      "title": "Task Name",
-      "description": "Detailed task description",
-      "order": 1
-    }}
-  ],
-  "agents": [
-    {{
-      "task_index": 0,
-      "role": "Expert Role Name",
-      "goal": "Specific, actionable goal statement (1-2 sentences)",
-      "backstory": "Compelling professional backstory establishing expertise (2-3 sentences)"
-    }}
-  ],
-  "recommended_tools": ["tool_id_1", "tool_id_2"],
-  "workflow_type": "sequential" or "hierarchical",
-  "explanation": "Brief explanation of why this team structure was chosen"
-}}
-
-REQUIREMENTS:
-1. Generate 3-5 logical sequential tasks that build toward the mission objective
-2. Create one specialized agent per task with relevant expertise
-3. Recommend 3-8 appropriate tools from the available list based on task requirements
-4. Choose workflow type: "sequential" for step-by-step tasks, "hierarchical" for complex coordination
-5. Ensure tasks are specific, measurable, and achievable
-6. Make agent roles specific and expert-level (e.g., "Digital Marketing Strategist" not just "Marketer")
-7. Agent goals should be task-specific and actionable
-8. Agent backstories should establish credibility and relevant experience
-
-Respond with ONLY the JSON, no additional text or formatting."""
-        
-        # Call OpenAI API
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert at creating comprehensive AI agent teams for CrewAI framework. Analyze missions and create complete team configurations with tasks, agents, tools, and workflows."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        response_text = response.choices[0].message.content
-        
-        # Parse the JSON response
-        import json
-        try:
-            team_config = json.loads(response_text.strip())
-            
-            # Create mission object
-            mission = Mission(
-                name=request.mission_name,
-                objective=request.mission_objective,
-                description=request.mission_description
-            )
-            
-            # Create tasks
-            tasks = []
-            for i, task_data in enumerate(team_config["tasks"]):
-                task = Task(
-                    title=task_data["title"],
-                    description=task_data["description"],
-                    order=task_data.get("order", i + 1)
-                )
-                tasks.append(task)
-            
-            # Create agents
-            agents = []
-            for agent_data in team_config["agents"]:
-                task_index = agent_data.get("task_index", 0)
-                if task_index < len(tasks):
-                    agent = Agent(
-                        task_id=tasks[task_index].id,
-                        role=agent_data["role"],
-                        goal=agent_data["goal"],
-                        backstory=agent_data["backstory"]
-                    )
-                    agents.append(agent)
-            
-            # Validate recommended tools
-            valid_tool_ids = {tool["id"] for tool in AVAILABLE_TOOLS}
-            recommended_tools = [
-                tool_id for tool_id in team_config["recommended_tools"] 
-                if tool_id in valid_tool_ids
-            ]
-            
-            return IntelligentTeamResponse(
-                mission=mission,
-                tasks=tasks,
-                agents=agents,
-                recommended_tools=recommended_tools,
-                workflow_type=team_config["workflow_type"],
-                explanation=team_config["explanation"]
-            )
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {str(e)}, Response: {response_text}")
-            raise HTTPException(status_code=500, detail="Failed to parse AI response")
+        may_read, may_store = parse_cache_control(cache_control)
+        team_config, cache_hit = await resolve_team_config(request, may_read, may_store)
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+        return build_team_response(request, team_config)
             
     except HTTPException:
         raise
+    except LLMTimeoutError as e:
+        logger.error(f"Timed out generating intelligent team: {str(e)}")
+        raise HTTPException(status_code=504, detail="AI service timed out")
+    except LLMUnavailableError as e:
+        logger.warning(f"AI service unavailable generating intelligent team: {str(e)}")
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable", headers=retry_after_header(e))
+    except TeamGenerationError as e:
+        logger.error(f"Team generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating intelligent team: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate intelligent team")
 
-@api_router.post("/generate-persona", response_model=PersonaResponse)
-async def generate_persona(request: GeneratePersonaRequest):
-    """Generate AI persona (goal + backstory) from role and task description"""
+def ndjson_line(event: dict) -> str:
+    return json.dumps(jsonable_encoder(event)) + "\n"
+
+async def stream_team_events(
+    request: IntelligentTeamRequest,
+    api_key: Optional[str],
+    cached_config: Optional[dict],
+    cache_key: str,
+    may_store: bool,
+) -> AsyncIterator[str]:
+    """Yield NDJSON events for a team as its parts become available"""
+    builder = TeamBuilder(request)
+    yield ndjson_line({"type": "mission", "mission": builder.mission})
+    
     try:
-        # Use OpenAI API key from environment or provided key
-        if request.use_emergent_key or not request.openai_api_key:
-            api_key = os.environ.get('OPENAI_API_KEY')
-            if not api_key:
-                raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+        if cached_config is not None:
+            parts = cached_team_parts(cached_config)
         else:
-            api_key = request.openai_api_key
+            parts = streamed_team_parts(request, api_key)
         
-        # Initialize OpenAI client
-        openai.api_key = api_key
+        team_config = {}
+        async for kind, key, value in parts:
+            if kind == "item" and key == "tasks":
+                yield ndjson_line({"type": "task", "task": builder.add_task(value)})
+            elif kind == "item" and key == "agents":
+                agent = builder.add_agent(value)
+                if agent is not None:
+                    yield ndjson_line({"type": "agent", "agent": agent})
+            elif kind == "field":
+                team_config[key] = value
+                if key == "recommended_tools":
+                    yield ndjson_line({"type": "tools", "recommended_tools": builder.valid_tools(value)})
+                elif key in ("workflow_type", "explanation"):
+                    yield ndjson_line({"type": key, key: value})
         
-        # Create prompt for persona generation
-        prompt = f"""Create a detailed persona for an AI agent with the following specifications:
+        known_agent_ids = {agent.id for agent in builder.agents}
+        team = builder.finish(
+            team_config["recommended_tools"],
+            team_config["workflow_type"],
+            team_config["explanation"]
+        )
+        # Agents that arrived before their task are only placed now
+        for agent in team.agents:
+            if agent.id not in known_agent_ids:
+                yield ndjson_line({"type": "agent", "agent": agent})
+        
+        if cached_config is None and may_store:
+            await team_cache.set(cache_key, team_config)
+        
+        yield ndjson_line({"type": "complete", "team": team})
+        
+    except LLMTimeoutError as e:
+        logger.error(f"Timed out streaming intelligent team: {str(e)}")
+        yield ndjson_line({"type": "error", "status_code": 504, "detail": "AI service timed out"})
+    except LLMUnavailableError as e:
+        logger.warning(f"AI service unavailable streaming intelligent team: {str(e)}")
+        yield ndjson_line({
+            "type": "error",
+            "status_code": 503,
+            "detail": "AI service temporarily unavailable",
+            "retry_after": int(retry_after_header(e)["Retry-After"])
+        })
+    except TeamGenerationError as e:
+        logger.error(f"Team generation failed while streaming: {str(e)}")
+        yield ndjson_line({"type": "error", "status_code": 500, "detail": str(e)})
+    except Exception as e:
+        logger.error(f"Error streaming intelligent team: {str(e)}")
+        yield ndjson_line({"type": "error", "status_code": 500, "detail": "Failed to generate intelligent team"})
+
+@api_router.post("/generate-intelligent-team/stream")
+async def generate_intelligent_team_stream(
+    request: IntelligentTeamRequest,
+    cache_control: Optional[str] = Header(None),
+):
+    """Stream team generation as NDJSON (one JSON event per line).
+
+    Events arrive in the order ``mission``, ``task``/``agent`` (each as soon
+    as the model has finished writing it), ``tools``, ``workflow_type``,
+    ``explanation`` and finally ``complete`` with the full team. Failures
+    after the stream has started are reported as an ``error`` event.
+    """
+    may_read, may_store = parse_cache_control(cache_control)
+    cache_key = team_cache_key(request)
+    # Before the cache lookup, as in resolve_team_config
+    api_key = resolve_api_key(request.use_emergent_key, request.openai_api_key)
+    
+    cached_config = await team_cache.get(cache_key) if may_read else None
+    
+    return StreamingResponse(
+        stream_team_events(request, api_key, cached_config, cache_key, may_store),
+        media_type="application/x-ndjson",
+        headers={"X-Cache": "HIT" if cached_config is not None else "MISS"}
+    )
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the generation and artifact caches and request coalescing"""
+    return {
+        "caches": [team_cache.stats()],
+        "artifacts": artifact_cache.stats(),
+        "single_flight": generation_flights.stats()
+    }
 
-Role: {request.role}
-Task: {request.task_description}
+def persona_flight_key(request: GeneratePersonaRequest, api_key: str) -> str:
+    """Key under which identical in-flight persona requests are coalesced.
+    
+    Includes the API key fingerprint: a request must only join a call made
+    with its own credentials."""
+    return make_cache_key(
+        PERSONA_PROMPT_VERSION,
+        PERSONA_MODEL,
+        normalize_text(request.role),
+        normalize_text(request.task_description),
+    ) + key_fingerprint(api_key)
 
-Please generate EXACTLY in this JSON format:
-{{
-  "goal": "A clear, action-oriented goal statement for this agent (1-2 sentences)",
-  "backstory": "A compelling professional backstory that explains the agent's expertise and experience (2-3 sentences)"
-}}
+def fallback_persona(role: str) -> PersonaResponse:
+    """Heuristic persona used when the AI response cannot be parsed"""
+    goal = f"Execute {role.lower()} responsibilities with expertise and attention to detail."
+    backstory = f"A seasoned {role.lower()} with extensive experience in handling complex challenges and delivering high-quality results."
+    return PersonaResponse(goal=goal, backstory=backstory)
 
-The goal should be specific to the task and role. The backstory should establish credibility and expertise.
-Respond with ONLY the JSON, no additional text."""
-        
-        # Call OpenAI API
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert at creating detailed AI agent personas for multi-agent systems. Generate compelling, professional agent goals and backstories."},
-                {"role": "user", "content": prompt}
-            ],
+async def request_persona(request: GeneratePersonaRequest, api_key: str) -> PersonaResponse:
+    """Ask the LLM for a persona, falling back to a heuristic one on bad JSON
+    or while the AI service is unavailable"""
+    # Call OpenAI API
+    try:
+        response_text = await llm_client.chat_completion(
+            api_key,
+            messages=persona_messages(request.role, request.task_description),
+            model=PERSONA_MODEL,
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            response_format=llm_json.response_format(PersonaConfig, "persona")
         )
+    except LLMUnavailableError as e:
+        logger.warning(f"Using fallback persona, AI service unavailable: {str(e)}")
+        LLM_FALLBACKS.labels("persona").inc()
+        return fallback_persona(request.role)
+    
+    # Parse the JSON response
+    try:
+        persona, repaired = parse_llm_json(response_text, PersonaConfig)
+        if repaired:
+            JSON_REPAIRS.labels("persona", "local").inc()
+        return PersonaResponse(goal=persona.goal, backstory=persona.backstory)
+    except LLMJSONError:
+        # A persona is cheap to fake; not worth a second call
+        JSON_PARSE_FAILURES.labels("persona").inc()
+        return fallback_persona(request.role)
+
+@api_router.post("/generate-persona", response_model=PersonaResponse)
+async def generate_persona(request: GeneratePersonaRequest):
+    """Generate AI persona (goal + backstory) from role and task description"""
+    try:
+        api_key = resolve_api_key(request.use_emergent_key, request.openai_api_key)
         
-        response_text = response.choices[0].message.content
-        
-        # Parse the JSON response
-        import json
-        try:
-            persona_data = json.loads(response_text.strip())
-            return PersonaResponse(
-                goal=persona_data["goal"],
-                backstory=persona_data["backstory"]
-            )
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            goal = f"Execute {request.role.lower()} responsibilities with expertise and attention to detail."
-            backstory = f"A seasoned {request.role.lower()} with extensive experience in handling complex challenges and delivering high-quality results."
-            
-            return PersonaResponse(goal=goal, backstory=backstory)
+        return await generation_flights.do(
+            persona_flight_key(request, api_key),
+            lambda: request_persona(request, api_key)
+        )
             
     except HTTPException:
         raise
+    except LLMTimeoutError as e:
+        logger.error(f"Timed out generating persona: {str(e)}")
+        raise HTTPException(status_code=504, detail="AI service timed out")
     except Exception as e:
         logger.error(f"Error generating persona: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate persona")
 
+async def request_persona_in_batch(request: GeneratePersonaRequest, api_key: str) -> PersonaResponse:
+    """request_persona holding a PERSONA_BATCH_CONCURRENCY slot.
+
+    Run inside the flight, so items that join an identical in-flight call
+    wait for it without taking a slot.
+    """
+    async with persona_batch_semaphore:
+        return await request_persona(request, api_key)
+
+async def generate_persona_item(index: int, item: GeneratePersonaRequest, fallback_on_error: bool) -> PersonaBatchResult:
+    """Generate one persona of a batch, reporting failures instead of raising"""
+    try:
+        api_key = resolve_api_key(item.use_emergent_key, item.openai_api_key)
+        persona = await generation_flights.do(
+            persona_flight_key(item, api_key),
+            lambda: request_persona_in_batch(item, api_key)
+        )
+        return PersonaBatchResult(index=index, persona=persona)
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            error = e.detail
+        elif isinstance(e, LLMTimeoutError):
+            error = "AI service timed out"
+        else:
+            logger.error(f"Error generating persona {index} in batch: {str(e)}")
+            error = "Failed to generate persona"
+        if fallback_on_error:
+            return PersonaBatchResult(index=index, persona=fallback_persona(item.role), fallback=True, error=error)
+        return PersonaBatchResult(index=index, error=error)
+
+@api_router.post("/generate-personas", response_model=GeneratePersonasResponse)
+async def generate_personas(request: GeneratePersonasRequest):
+    """Generate personas for several agents at once.
+
+    Items run concurrently (bounded by PERSONA_BATCH_CONCURRENCY generations
+    across all batches; identical items share one) and results come back in
+    request order. A failing item does not
+    fail the batch: it carries an ``error`` and, unless ``fallback_on_error``
+    is false, the heuristic persona.
+    """
+    results = await asyncio.gather(*[
+        generate_persona_item(index, item, request.fallback_on_error)
+        for index, item in enumerate(request.items)
+    ])
+    return GeneratePersonasResponse(results=results)
+
 @api_router.post("/teams", response_model=dict)
 async def create_team(request: CreateTeamRequest):
     """Save a complete agent team configuration"""
@@ -390,7 +404,7 @@ async def create_team(request: CreateTeamRequest):
         
         # Save to database
         team_dict = team.dict()
-        result = await db.agent_teams.insert_one(team_dict)
+        await team_store.insert_team(team_dict)
         
         return {"success": True, "team_id": team.id}
         
@@ -398,18 +412,191 @@ async def create_team(request: CreateTeamRequest):
         logger.error(f"Error creating team: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create team: {str(e)}")
 
+async def iter_request_lines(request: Request, max_line_bytes: int) -> AsyncIterator[bytes]:
+    """Yield lines of a request body as they arrive, without buffering it all.
+
+    Only each new chunk is split; a line spanning chunks is joined once it
+    ends. A line longer than ``max_line_bytes`` is rejected with 413.
+    """
+    pending: List[bytes] = []
+    pending_size = 0
+    async for chunk in request.stream():
+        *lines, rest = chunk.split(b"\n")
+        if lines and pending:
+            lines[0] = b"".join(pending) + lines[0]
+            pending, pending_size = [], 0
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise HTTPException(status_code=413, detail=f"NDJSON line longer than {max_line_bytes} bytes")
+            yield line
+        if rest:
+            pending.append(rest)
+            pending_size += len(rest)
+            if pending_size > max_line_bytes:
+                raise HTTPException(status_code=413, detail=f"NDJSON line longer than {max_line_bytes} bytes")
+    if pending:
+        yield b"".join(pending)
+
+def parse_bulk_team(line: bytes) -> dict:
+    """Validate one NDJSON line and return the document to insert.
+
+    Lines are validated as CreateTeamRequest; an ``id``, ``created_at`` and
+    ``revision`` present in the line (as written by /api/teams/export) are
+    preserved so exports can be restored as-is, and clients holding a
+    revision can keep patching against it.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object")
+    team_request = CreateTeamRequest.model_validate(data)
+    preserved = {key: data[key] for key in ("id", "created_at", "revision") if data.get(key) is not None}
+    return AgentTeam(**team_request.dict(), **preserved).dict()
+
+def bulk_line_error(e: Exception) -> str:
+    """Short error for a failed line: the first validation error, or the first line of the message"""
+    if isinstance(e, ValidationError):
+        error = e.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        return f"{location}: {error['msg']}" if location else error["msg"]
+    return (str(e).splitlines() or [type(e).__name__])[0]
+
+async def insert_team_batch(batch: List[tuple], results: List[dict]):
+    """Insert (line_number, document) pairs unordered, recording per-line outcomes"""
+    failed = await team_store.insert_teams([document for _, document in batch])
+    for index, (line_number, document) in enumerate(batch):
+        if index in failed:
+            results.append({"line": line_number, "success": False, "error": (failed[index].splitlines() or ["Write failed"])[0]})
+        else:
+            results.append({"line": line_number, "success": True, "team_id": document["id"]})
+
+@api_router.post("/teams/bulk")
+async def bulk_import_teams(request: Request):
+    """Import teams from an NDJSON body (one team per line).
+
+    Lines are validated individually and written in unordered batches of
+    BULK_IMPORT_BATCH_SIZE, so one bad line never blocks the
+    rest. The response lists the outcome of every non-empty line. A line
+    over BULK_IMPORT_MAX_LINE_BYTES aborts the import with 413; batches
+    already written by then are kept.
+    """
+    try:
+        results = []
+        batch = []
+        line_number = 0
+        async for line in iter_request_lines(request, BULK_IMPORT_MAX_LINE_BYTES):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, parse_bulk_team(line)))
+            except (ValueError, ValidationError) as e:
+                results.append({"line": line_number, "success": False, "error": bulk_line_error(e)})
+                continue
+            if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+                await insert_team_batch(batch, results)
+                batch = []
+        if batch:
+            await insert_team_batch(batch, results)
+        
+        results.sort(key=lambda result: result["line"])
+        inserted = sum(1 for result in results if result["success"])
+        return {"inserted": inserted, "failed": len(results) - inserted, "results": results}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error importing teams: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to import teams: {str(e)}")
+
+async def stream_team_export(workflow_type: Optional[str]) -> AsyncIterator[str]:
+    async for team in team_store.iter_teams(workflow_type=workflow_type, projection=TEAM_PROJECTION, batch_size=500):
+        yield json.dumps(jsonable_encoder(team)) + "\n"
+
+@api_router.get("/teams/export")
+async def export_teams(workflow_type: Optional[Literal["sequential", "hierarchical"]] = None):
+    """Stream all teams as NDJSON, newest first, straight from the store cursor"""
+    return StreamingResponse(
+        stream_team_export(workflow_type),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="agent_teams.ndjson"'}
+    )
+
+def encode_team_cursor(team: dict) -> str:
+    """Opaque keyset cursor pointing just after ``team`` in listing order"""
+    created_at = team["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps({"created_at": created_at, "id": team["id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_team_cursor(cursor: str) -> tuple:
+    """(created_at, id) position of the last team on the previous page"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(position["created_at"]), position["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def stream_team_listing(filters: dict, projection: dict, limit: int) -> AsyncIterator[str]:
+    """Stream a JSON page of teams straight from the store cursor"""
+    teams = team_store.iter_teams(**filters, limit=limit + 1, projection=projection, batch_size=min(limit + 1, 100))
+    
+    yield '{"teams":['
+    count = 0
+    last_team = None
+    has_more = False
+    async for team in teams:
+        # A (limit + 1)-th document means there is another page
+        if count == limit:
+            has_more = True
+            break
+        yield ("," if count else "") + json.dumps(jsonable_encoder(team))
+        last_team = team
+        count += 1
+    
+    next_cursor = encode_team_cursor(last_team) if has_more else None
+    yield '],"next_cursor":' + json.dumps(next_cursor) + '}'
+
+@api_router.get("/teams")
+async def list_teams(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    workflow_type: Optional[Literal["sequential", "hierarchical"]] = None,
+    tools: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None,
+):
+    """List teams newest first with keyset (cursor) pagination.
+
+    Filter with ``workflow_type`` and repeated ``tools`` parameters (teams
+    must use all given tools). ``fields`` is a comma-separated subset of
+    mission, tasks, agents, selected_tools and workflow_type; id and
+    created_at are always included. Pass ``next_cursor`` from a response as
+    ``cursor`` to fetch the following page.
+    """
+    filters = {
+        "workflow_type": workflow_type,
+        "tools": tools,
+        "after": decode_team_cursor(cursor) if cursor else None,
+    }
+    
+    projection = TEAM_PROJECTION
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - TEAM_LISTING_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection = {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in requested}}
+    
+    return StreamingResponse(stream_team_listing(filters, projection, limit), media_type="application/json")
+
 @api_router.get("/teams/{team_id}")
 async def get_team(team_id: str):
     """Get a specific team by ID"""
     try:
-        team = await db.agent_teams.find_one({"id": team_id})
+        team = await team_store.get_team(team_id, TEAM_PROJECTION)
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
-        # Remove MongoDB ObjectId to avoid serialization issues
-        if "_id" in team:
-            del team["_id"]
-        
         return team
         
     except HTTPException:
@@ -418,23 +605,180 @@ async def get_team(team_id: str):
         logger.error(f"Error retrieving team: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve team")
 
-@api_router.post("/generate-yaml")
-async def generate_yaml(request: YAMLGenerateRequest):
-    """Generate CrewAI-compatible YAML configuration"""
+def team_patch_projection(patch: dict) -> dict:
+    """Read only the fields a patch touches (plus ids to locate tasks and agents)"""
+    projection = {"_id": 0, "revision": 1}
+    for key in patch.get("mission", {}):
+        projection[f"mission.{key}"] = 1
+    for field in ("tasks", "agents"):
+        if field in patch:
+            projection[f"{field}.id"] = 1
+            for entry in patch[field]:
+                projection.update({f"{field}.{key}": 1 for key in entry})
+    if any("task_id" in entry for entry in patch.get("agents", [])):
+        # Agents may only be moved to tasks the team has
+        projection["tasks.id"] = 1
+    for field in ("selected_tools", "workflow_type"):
+        if field in patch:
+            projection[field] = 1
+    return projection
+
+def build_team_patch(team: dict, patch: dict) -> tuple:
+    """``$set`` fields and compact diff for the parts of ``patch`` that differ from ``team``.
+
+    Tasks and agents are matched by id and updated in place by array
+    position; the caller's revision check guarantees positions are current.
+    Diff paths use ids rather than positions so they stay meaningful.
+    """
+    updates = {}
+    changes = []
+    
+    def set_field(path: str, diff_path: list, old, new):
+        if new is None and diff_path != ["mission", "description"]:
+            raise HTTPException(status_code=422, detail=f"{'.'.join(diff_path)} cannot be null")
+        if old != new:
+            updates[path] = new
+            changes.append({"path": diff_path, "old": old, "new": new})
+    
+    for key, value in patch.get("mission", {}).items():
+        set_field(f"mission.{key}", ["mission", key], team.get("mission", {}).get(key), value)
+    task_ids = {task.get("id") for task in team.get("tasks", [])}
+    for entry in patch.get("agents", []):
+        if entry.get("task_id") is not None and entry["task_id"] not in task_ids:
+            raise HTTPException(status_code=422, detail=f"Unknown task id: {entry['task_id']}")
+    for field in ("tasks", "agents"):
+        positions = {entry.get("id"): index for index, entry in enumerate(team.get(field, []))}
+        for entry in patch.get(field, []):
+            entry_id = entry.pop("id")
+            if entry_id not in positions:
+                raise HTTPException(status_code=422, detail=f"Unknown {field[:-1]} id: {entry_id}")
+            index = positions[entry_id]
+            for key, value in entry.items():
+                set_field(f"{field}.{index}.{key}", [field, entry_id, key], team[field][index].get(key), value)
+    for field in ("selected_tools", "workflow_type"):
+        if field in patch:
+            set_field(field, [field], team.get(field), patch[field])
+    return updates, changes
+
+@api_router.patch("/teams/{team_id}")
+async def update_team(team_id: str, request: UpdateTeamRequest):
+    """Apply field-level changes to a saved team.
+
+    Only the fields present in the body are changed, with a single ``$set``
+    (tasks and agents are addressed by id). ``revision`` must be the team's
+    current revision, otherwise nothing is written and 409 is returned with
+    the current revision. Each effective change bumps the revision and is
+    recorded as a compact diff in ``team_revisions``; a patch that changes
+    nothing writes nothing. The history entry is written after the update,
+    so if that write fails the update still succeeds, without its diff.
+    """
     try:
-        # Get team data
-        team = await db.agent_teams.find_one({"id": request.team_id})
+        patch = request.dict(exclude_unset=True)
+        expected = patch.pop("revision")
+        for field in ("mission", "tasks", "agents"):
+            if patch.get(field) is None:
+                patch.pop(field, None)
+        
+        team = await team_store.get_team(team_id, team_patch_projection(patch))
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
+        current = team.get("revision", 0)
+        if current != expected:
+            raise HTTPException(status_code=409, detail={"message": "Team was modified", "revision": current})
+        
+        updates, changes = build_team_patch(team, patch)
+        if not changes:
+            return {"success": True, "team_id": team_id, "revision": current, "changes": []}
         
-        # Remove MongoDB ObjectId to avoid serialization issues
-        if "_id" in team:
-            del team["_id"]
+        revision = current + 1
+        if not await team_store.update_team(team_id, current, {**updates, "revision": revision}):
+            # Another update committed between our read and write
+            latest = await team_store.get_team(team_id, {"_id": 0, "revision": 1})
+            raise HTTPException(status_code=409, detail={"message": "Team was modified", "revision": (latest or {}).get("revision", 0)})
         
-        # Generate YAML content
-        yaml_content = generate_crewai_yaml(team)
+        artifact_cache.invalidate(team_id, revision)
+        try:
+            await team_store.add_revision({
+                "team_id": team_id,
+                "revision": revision,
+                "changes": changes,
+                "created_at": datetime.utcnow(),
+            })
+        except Exception as e:
+            # The update is already committed; report it rather than a 500 the
+            # client would retry into a 409. Only the history entry is missing.
+            logger.error(f"Error recording revision {revision} of team {team_id}: {str(e)}")
+        return {"success": True, "team_id": team_id, "revision": revision, "changes": changes}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating team: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update team")
+
+@api_router.get("/teams/{team_id}/revisions")
+async def list_team_revisions(team_id: str, limit: int = Query(50, ge=1, le=500)):
+    """Change history of a team, newest revision first"""
+    try:
+        revisions = await team_store.list_revisions(team_id, limit)
+        return {"revisions": jsonable_encoder(revisions)}
+        
+    except Exception as e:
+        logger.error(f"Error retrieving team revisions: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve team revisions")
+
+def artifact_variant(fmt: str) -> str:
+    # Tool class names come from the catalog, so its revision is part of the artifact key
+    return f"{fmt}@{tool_catalog.fingerprint}"
+
+async def fetch_team_for_export(team_id: str, fmt: str) -> dict:
+    team = await team_store.get_team(team_id, EXPORT_PROJECTIONS.get(fmt, TEAM_PROJECTION))
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return team
+
+def render_team_artifact(team_id: str, fmt: str, team: dict) -> RenderedArtifact:
+    """Render one export format for a team and store it in the artifact cache"""
+    artifact = get_exporter(fmt).render(team, tool_catalog.class_name)
+    artifact_cache.put(team_id, team.get("revision", 0), artifact_variant(fmt), artifact)
+    return artifact
+
+async def get_team_artifact(team_id: str, fmt: str) -> RenderedArtifact:
+    """Rendered export for a team, from the artifact cache (without a store read) when possible"""
+    artifact = artifact_cache.get(team_id, artifact_variant(fmt))
+    if artifact is None:
+        artifact = render_team_artifact(team_id, fmt, await fetch_team_for_export(team_id, fmt))
+    return artifact
+
+def iter_artifact_chunks(body: bytes) -> Iterator[bytes]:
+    view = memoryview(body)
+    for start in range(0, len(view), ARTIFACT_CHUNK_SIZE):
+        yield bytes(view[start:start + ARTIFACT_CHUNK_SIZE])
+
+def artifact_response(artifact: RenderedArtifact, if_none_match: Optional[str]) -> Response:
+    """File download for an artifact with ETag revalidation; binary bodies are streamed in chunks"""
+    headers = {"ETag": artifact.etag}
+    if etag_matches(if_none_match, artifact.etag):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{artifact.filename}"'
+    if isinstance(artifact.body, bytes):
+        return StreamingResponse(iter_artifact_chunks(artifact.body), media_type=artifact.media_type, headers=headers)
+    return Response(artifact.body, media_type=artifact.media_type, headers=headers)
+
+@api_router.post("/generate-yaml")
+async def generate_yaml(request: YAMLGenerateRequest, if_none_match: Optional[str] = Header(None)):
+    """Generate CrewAI-compatible YAML configuration.
+
+    The rendered YAML is cached per team revision and served with an ETag;
+    a matching If-None-Match gets 304 Not Modified.
+    """
+    try:
+        artifact = await get_team_artifact(request.team_id, "crewai-yaml")
+        headers = {"ETag": artifact.etag}
+        if etag_matches(if_none_match, artifact.etag):
+            return Response(status_code=304, headers=headers)
         
-        return {"yaml": yaml_content, "filename": f"{team['mission']['name'].replace(' ', '_').lower()}_crew.yaml"}
+        return JSONResponse({"yaml": artifact.body, "filename": artifact.filename}, headers=headers)
         
     except HTTPException:
         raise
@@ -442,6 +786,139 @@ async def generate_yaml(request: YAMLGenerateRequest):
         logger.error(f"Error generating YAML: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate YAML")
 
+async def write_team_in_background(team_dict: dict):
+    try:
+        await team_store.insert_team(team_dict)
+    except Exception as e:
+        # The caller already has its YAML; drop the render so the unsaved team is not served
+        logger.error(f"Error saving team {team_dict['id']} in background: {str(e)}")
+        artifact_cache.invalidate(team_dict["id"])
+
+def save_team_in_background(team_dict: dict):
+    task = asyncio.ensure_future(write_team_in_background(team_dict))
+    pending_team_writes.add(task)
+    task.add_done_callback(pending_team_writes.discard)
+
+@api_router.post("/team-pipeline", response_model=TeamPipelineResponse)
+async def run_team_pipeline(
+    request: TeamPipelineRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
+    """Generate (or accept) a team, save it and return its CrewAI YAML in one call.
+
+    Replaces /generate-intelligent-team + /teams + /generate-yaml. The YAML
+    is rendered from the team in hand rather than re-read from the store,
+    and is left in the artifact cache for later downloads. With
+    ``durability: "async"`` the response does not wait for the write
+    (``persisted`` is false); a failed background write is only logged.
+    Cache-Control applies to generation as for /generate-intelligent-team.
+    """
+    if (request.team is None) == (request.generate is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of team or generate")
+    try:
+        if request.generate is not None:
+            may_read, may_store = parse_cache_control(cache_control)
+            team_config, cache_hit = await resolve_team_config(request.generate, may_read, may_store)
+            response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+            generated = build_team_response(request.generate, team_config)
+            team = AgentTeam(
+                mission=generated.mission,
+                tasks=generated.tasks,
+                agents=generated.agents,
+                selected_tools=generated.recommended_tools,
+                workflow_type=generated.workflow_type
+            )
+        else:
+            team = AgentTeam(**request.team.dict())
+        
+        team_dict = team.dict()
+        if request.durability == "sync":
+            await team_store.insert_team(team_dict)
+        artifact = render_team_artifact(team.id, "crewai-yaml", team_dict)
+        if request.durability == "async":
+            save_team_in_background(team_dict)
+        
+        response.headers["ETag"] = artifact.etag
+        return TeamPipelineResponse(
+            team_id=team.id,
+            yaml=artifact.body,
+            filename=artifact.filename,
+            persisted=request.durability == "sync",
+            team=team if request.generate is not None else None
+        )
+        
+    except HTTPException:
+        raise
+    except LLMTimeoutError as e:
+        logger.error(f"Timed out generating team for pipeline: {str(e)}")
+        raise HTTPException(status_code=504, detail="AI service timed out")
+    except LLMUnavailableError as e:
+        logger.warning(f"AI service unavailable generating team for pipeline: {str(e)}")
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable", headers=retry_after_header(e))
+    except TeamGenerationError as e:
+        logger.error(f"Team generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running team pipeline: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to create team")
+
+@api_router.get("/teams/{team_id}/yaml")
+async def download_yaml(team_id: str, if_none_match: Optional[str] = Header(None)):
+    """Download the CrewAI YAML for a team as a file.
+
+    Cached renders are served with an ETag (304 on a matching If-None-Match).
+    Crews larger than YAML_STREAM_THRESHOLD agents+tasks are streamed
+    straight from the emitter instead of being rendered into the cache.
+    """
+    try:
+        artifact = artifact_cache.get(team_id, artifact_variant("crewai-yaml"))
+        if artifact is None:
+            team = await fetch_team_for_export(team_id, "crewai-yaml")
+            if len(team["agents"]) + len(team["tasks"]) > YAML_STREAM_THRESHOLD:
+                return StreamingResponse(
+                    iter_crewai_yaml(team, tool_catalog.class_name),
+                    media_type="application/x-yaml",
+                    headers={"Content-Disposition": f'attachment; filename="{yaml_filename(team["mission"]["name"])}"'}
+                )
+            artifact = render_team_artifact(team_id, "crewai-yaml", team)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating YAML download: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate YAML")
+    
+    return artifact_response(artifact, if_none_match)
+
+@api_router.get("/export-formats")
+async def list_export_formats():
+    """Export formats available for saved teams"""
+    return {"formats": [{"name": exp.name, "description": exp.description} for exp in EXPORTERS.values()]}
+
+@api_router.get("/teams/{team_id}/export/{fmt}")
+async def export_team(team_id: str, fmt: str, if_none_match: Optional[str] = Header(None)):
+    """Download a team in any registered export format (see /api/export-formats).
+
+    Each format is rendered once per team and then served from the artifact
+    cache with an ETag.
+    """
+    if get_exporter(fmt) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export format: {fmt}")
+    try:
+        artifact = await get_team_artifact(team_id, fmt)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting team as {fmt}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to export team")
+    
+    return artifact_response(artifact, if_none_match)
+
+@api_router.get("/teams/{team_id}/bundle.zip")
+async def download_team_bundle(team_id: str, if_none_match: Optional[str] = Header(None)):
+    """Zip of a ready-to-run CrewAI project (config YAML, crew.py, main.py, JSON)"""
+    return await export_team(team_id, "bundle", if_none_match)
+
 @api_router.post("/livekit-token")
 async def generate_livekit_token(request: LiveKitTokenRequest):
     """Generate LiveKit access token for voice session"""
@@ -480,53 +957,43 @@ async def generate_livekit_token(request: LiveKitTokenRequest):
 
 def generate_crewai_yaml(team_data: dict) -> str:
     """Generate CrewAI-compatible YAML configuration"""
-    
-    # Map selected tool IDs to class names
-    tool_mapping = {tool["id"]: tool["class_name"] for tool in AVAILABLE_TOOLS}
-    selected_tool_classes = [tool_mapping.get(tool_id, tool_id) for tool_id in team_data["selected_tools"]]
-    
-    yaml_content = f"""# {team_data['mission']['name']} - AI Agent Team Configuration
-# Generated by AI Agent Team Configuration Wizard
+    return render_crewai_yaml(team_data, tool_catalog.class_name)
 
-agents:"""
-    
-    # Add agents
-    for agent in team_data["agents"]:
-        yaml_content += f"""
-  - role: {agent['role']}
-    goal: {agent['goal']}
-    backstory: {agent['backstory']}"""
-    
-    yaml_content += f"""
+def cache_lookup_samples():
+    stats = team_cache.stats()
+    yield (stats["name"], "memory_hit"), stats["memory_hits"]
+    yield (stats["name"], "mongo_hit"), stats["mongo_hits"]
+    yield (stats["name"], "miss"), stats["misses"]
+    artifacts = artifact_cache.stats()
+    yield ("artifacts", "hit"), artifacts["hits"]
+    yield ("artifacts", "miss"), artifacts["misses"]
 
-tasks:"""
-    
-    # Add tasks
-    for i, task in enumerate(team_data["tasks"]):
-        corresponding_agent = team_data["agents"][i] if i < len(team_data["agents"]) else team_data["agents"][0]
-        yaml_content += f"""
-  - description: {task['description']}
-    agent: {corresponding_agent['role']}
-    expected_output: Complete and accurate results for the task"""
-    
-    yaml_content += f"""
+def cache_hit_ratio_samples():
+    stats = team_cache.stats()
+    yield (stats["name"],), stats["hit_rate"]
+    artifacts = artifact_cache.stats()
+    lookups = artifacts["hits"] + artifacts["misses"]
+    yield ("artifacts",), artifacts["hits"] / lookups if lookups else 0.0
 
-tools:"""
-    
-    # Add tools
-    for tool_class in selected_tool_classes:
-        yaml_content += f"""
-  - {tool_class}"""
-    
-    yaml_content += f"""
+CallbackMetric("cache_lookups_total", "Generation and artifact cache lookups by result", "counter", ("cache", "result"), cache_lookup_samples)
+CallbackMetric("cache_hit_ratio", "Hit ratio of each cache since startup", "gauge", ("cache",), cache_hit_ratio_samples)
+CallbackMetric("cache_entries", "Entries held by each in-process cache", "gauge", ("cache",), lambda: [
+    ((team_cache.name,), team_cache.stats()["memory_entries"]),
+    (("artifacts",), artifact_cache.stats()["teams"]),
+])
+CallbackMetric("single_flight_calls_total", "Team and persona generations started vs. joined an identical in-flight one", "counter", ("result",), lambda: [
+    (("started",), generation_flights.stats()["started"]),
+    (("coalesced",), generation_flights.stats()["coalesced"]),
+])
 
-process: {team_data['workflow_type']}
+CallbackMetric("team_writes_pending", "Background team writes from /api/team-pipeline not yet finished", "gauge", (), lambda: [
+    ((), len(pending_team_writes)),
+])
 
-# Mission: {team_data['mission']['objective']}
-# Description: {team_data['mission'].get('description', 'No description provided')}
-"""
-    
-    return yaml_content
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics (text exposition format)"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -539,6 +1006,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -546,6 +1016,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def connect_team_store():
+    # Fail startup rather than serve 500s on every request
+    try:
+        await team_store.connect()
+        await team_store.migrate()
+        logger.info(f"Team store: {team_store.name}")
+    except Exception as e:
+        logger.error(f"Error connecting {team_store.name} team store: {str(e)}")
+        raise
+
+@app.on_event("startup")
+async def ensure_cache_indexes():
+    # The shared generation cache tier lives in MongoDB, next to the teams
+    if team_cache_mongo_ttl > 0 and isinstance(team_store.inner, MotorTeamStore):
+        team_cache.mongo = MongoCacheTier(team_store.inner.db.generation_cache, team_cache_mongo_ttl)
+        await team_cache.mongo.ensure_indexes()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if pending_team_writes:
+        await asyncio.gather(*pending_team_writes, return_exceptions=True)
+    await team_store.close()
+
+@app.on_event("shutdown")
+async def shutdown_llm_clients():
+    await llm_client.aclose()
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""Team generation, usable without the HTTP API.
+
+Everything between a mission statement and a validated team lives here: the
+prompt, the LLM call with JSON repair, the generation cache, coalescing of
+identical in-flight requests and assembly of the response models. The API
+server's endpoints and the voice agent both call it, so the voice worker
+generates teams in-process instead of POSTing to its own deployment.
+
+Failures the caller should report are raised as ``TeamGenerationError``
+(message suitable for the client); LLM timeouts and outages surface as
+llm_client's ``LLMTimeoutError`` and ``LLMUnavailableError``.
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pydantic import TypeAdapter, ValidationError
+
+import llm_client
+import llm_json
+from json_stream import IncrementalJSONParser
+from llm_json import AgentSpec, LLMJSONError, TaskSpec, TeamConfig, parse_llm_json
+from metrics import JSON_PARSE_FAILURES, JSON_REPAIRS, TEAM_BUILD_DURATION
+from models import Agent, IntelligentTeamRequest, IntelligentTeamResponse, Mission, Task
+from prompts import TeamPrompt
+from response_cache import LRUCache, TieredCache, make_cache_key, normalize_text
+from tools import tool_catalog
+
+
+# Settings below are read at import time, possibly before the server loads .env
+load_dotenv(Path(__file__).parent / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+class TeamGenerationError(Exception):
+    """Team generation failed; the message is safe to show to the client"""
+
+
+def resolve_api_key(use_emergent_key: bool, openai_api_key: Optional[str]) -> str:
+    """Pick the OpenAI API key for a request (environment key or user-provided key).
+
+    The key is passed explicitly to llm_client rather than assigned to the
+    global openai.api_key, so concurrent requests never share credentials.
+    """
+    if use_emergent_key or not openai_api_key:
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise TeamGenerationError("OpenAI API key not configured")
+        return api_key
+    return openai_api_key
+
+
+# Generation settings (prompt versions come from prompts.py and change with the prompt text)
+TEAM_MODEL = "gpt-4o-mini"
+TEAM_TEMPERATURE = 0.7
+team_prompt = TeamPrompt(tool_catalog)
+
+# Cache for parsed team configurations (the server attaches a MongoDB tier on
+# startup when TEAM_CACHE_MONGO_TTL_SECONDS is set)
+team_cache = TieredCache(
+    "intelligent_team",
+    LRUCache(
+        max_size=int(os.environ.get('TEAM_CACHE_SIZE', '512')),
+        ttl_seconds=float(os.environ.get('TEAM_CACHE_TTL_SECONDS', '3600')),
+    ),
+    None,
+)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight task.
+
+    The first caller starts the work as a standalone task; callers arriving
+    before it finishes await the same task. The task is shielded so a
+    disconnecting client never cancels the work for the others, and the key
+    is released as soon as the task completes so later calls start fresh.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "started": self.started, "coalesced": self.coalesced}
+
+
+generation_flights = SingleFlight()
+
+
+def team_cache_key(request: IntelligentTeamRequest) -> str:
+    """Content address of a team generation request (ignores API key choice)"""
+    return make_cache_key(
+        team_prompt.version,
+        TEAM_MODEL,
+        TEAM_TEMPERATURE,
+        normalize_text(request.mission_name),
+        normalize_text(request.mission_objective),
+        normalize_text(request.mission_description),
+    )
+
+
+def build_team_messages(request: IntelligentTeamRequest) -> List[Dict[str, str]]:
+    """Chat messages asking the LLM for a complete team configuration"""
+    return team_prompt.messages(request.mission_name, request.mission_objective, request.mission_description)
+
+
+async def request_team_config(request: IntelligentTeamRequest, api_key: str) -> dict:
+    """Ask the LLM for a team configuration and return the parsed JSON"""
+    # Call OpenAI API
+    response_text = await llm_client.chat_completion(
+        api_key,
+        messages=build_team_messages(request),
+        model=TEAM_MODEL,
+        temperature=TEAM_TEMPERATURE,
+        max_tokens=2000,
+        response_format=llm_json.response_format(TeamConfig, "team_config")
+    )
+
+    # Parse the JSON response
+    try:
+        team_config, repaired = parse_llm_json(response_text, TeamConfig)
+        if repaired:
+            JSON_REPAIRS.labels("team", "local").inc()
+        return team_config.dict()
+    except LLMJSONError as e:
+        logger.warning(f"Repairing team JSON with the LLM: {str(e)}")
+        error = e
+
+    # Ask for a fix of the existing output rather than a new team
+    repaired_text = await llm_client.chat_completion(
+        api_key,
+        messages=llm_json.repair_messages(response_text, TeamConfig, error),
+        model=TEAM_MODEL,
+        temperature=0,
+        max_tokens=2000,
+        response_format=llm_json.response_format(TeamConfig, "team_config")
+    )
+    try:
+        team_config, _ = parse_llm_json(repaired_text, TeamConfig)
+        JSON_REPAIRS.labels("team", "llm").inc()
+        return team_config.dict()
+    except LLMJSONError as e:
+        JSON_PARSE_FAILURES.labels("team").inc()
+        logger.error(f"JSON parsing error: {str(e)}, Response: {response_text}")
+        raise TeamGenerationError("Failed to parse AI response")
+
+
+class TeamBuilder:
+    """Assembles response models from (possibly streamed) team configuration parts.
+
+    Tasks and agents can be added one at a time as they are parsed. An agent
+    whose task has not arrived yet is held back until finish(); agents that
+    still reference a missing task are dropped.
+    """
+
+    def __init__(self, request: IntelligentTeamRequest):
+        # Create mission object
+        self.mission = Mission(
+            name=request.mission_name,
+            objective=request.mission_objective,
+            description=request.mission_description
+        )
+        self.tasks: List[Task] = []
+        self.agents: List[Agent] = []
+        self._pending_agents: List[dict] = []
+
+    def add_task(self, task_data: dict) -> Task:
+        task = Task(
+            title=task_data["title"],
+            description=task_data["description"],
+            order=task_data.get("order", len(self.tasks) + 1)
+        )
+        self.tasks.append(task)
+        return task
+
+    def add_agent(self, agent_data: dict) -> Optional[Agent]:
+        task_index = agent_data.get("task_index", 0)
+        if task_index >= len(self.tasks):
+            self._pending_agents.append(agent_data)
+            return None
+        agent = Agent(
+            task_id=self.tasks[task_index].id,
+            role=agent_data["role"],
+            goal=agent_data["goal"],
+            backstory=agent_data["backstory"]
+        )
+        self.agents.append(agent)
+        return agent
+
+    @staticmethod
+    def valid_tools(tool_ids: List[str]) -> List[str]:
+        return [tool_id for tool_id in tool_ids if tool_id in tool_catalog.valid_ids]
+
+    def finish(self, recommended_tools: List[str], workflow_type: str, explanation: str) -> IntelligentTeamResponse:
+        pending, self._pending_agents = self._pending_agents, []
+        for agent_data in pending:
+            if agent_data.get("task_index", 0) < len(self.tasks):
+                self.add_agent(agent_data)
+
+        return IntelligentTeamResponse(
+            mission=self.mission,
+            tasks=self.tasks,
+            agents=self.agents,
+            recommended_tools=self.valid_tools(recommended_tools),
+            workflow_type=workflow_type,
+            explanation=explanation
+        )
+
+
+def build_team_response(request: IntelligentTeamRequest, team_config: dict) -> IntelligentTeamResponse:
+    """Turn a parsed team configuration into response models with fresh IDs"""
+    started = time.perf_counter()
+    builder = TeamBuilder(request)
+    for task_data in team_config["tasks"]:
+        builder.add_task(task_data)
+    for agent_data in team_config["agents"]:
+        builder.add_agent(agent_data)
+    team = builder.finish(
+        team_config["recommended_tools"],
+        team_config["workflow_type"],
+        team_config["explanation"]
+    )
+    TEAM_BUILD_DURATION.observe(time.perf_counter() - started)
+    return team
+
+
+async def resolve_team_config(request: IntelligentTeamRequest, may_read: bool, may_store: bool) -> Tuple[dict, bool]:
+    """Team configuration for a request from the cache or the LLM; returns (config, cache_hit).
+
+    Credentials are resolved before the cache is consulted, so a deployment
+    without a key does not serve cached teams either. A user-supplied key
+    is not verified with the provider on a hit: that would cost the call the
+    cache saves, and nothing is billed to the key.
+    """
+    api_key = resolve_api_key(request.use_emergent_key, request.openai_api_key)
+    cache_key = team_cache_key(request)
+
+    team_config = await team_cache.get(cache_key) if may_read else None
+    if team_config is not None:
+        return team_config, True
+
+    async def generate() -> dict:
+        team_config = await request_team_config(request, api_key)
+        # Validate before caching so only usable configurations are stored
+        build_team_response(request, team_config)
+        if may_store:
+            await team_cache.set(cache_key, team_config)
+        return team_config
+
+    # Identical requests with the same API key arriving while this one is in
+    # flight share its result; other keys must not be billed or fail for it
+    flight_key = cache_key + llm_client.key_fingerprint(api_key)
+    return await generation_flights.do(flight_key, generate), False
+
+
+# Validators for the streamed parts of a TeamConfig
+_ITEM_SPECS = {"tasks": TaskSpec, "agents": AgentSpec}
+_FIELD_ADAPTERS = {
+    name: TypeAdapter(field.annotation)
+    for name, field in TeamConfig.model_fields.items()
+    if name not in _ITEM_SPECS
+}
+
+
+def _field_or_default(key: str, value: Any) -> Any:
+    try:
+        return _FIELD_ADAPTERS[key].validate_python(value)
+    except ValidationError:
+        logger.warning(f"Using default for invalid streamed team field {key}: {str(value)[:200]}")
+        return TeamConfig.model_fields[key].get_default()
+
+
+async def streamed_team_parts(request: IntelligentTeamRequest, api_key: str) -> AsyncIterator[tuple]:
+    """Parser events for a team configuration streamed from the LLM.
+
+    Parts are validated as they arrive, as the non-streaming path validates
+    the whole TeamConfig: tasks and agents that are malformed or do not match
+    their schema are dropped, and fields that are invalid or never sent take the
+    TeamConfig default. The ``tasks`` and ``agents`` fields carry only the
+    valid items. Raises TeamGenerationError if no usable team remains.
+    """
+    parser = IncrementalJSONParser()
+    chunks = []
+    valid_items: Dict[str, List[dict]] = {key: [] for key in _ITEM_SPECS}
+    fields_seen = set()
+    dropped = 0
+    async for delta in llm_client.stream_chat_completion(
+        api_key,
+        build_team_messages(request),
+        model=TEAM_MODEL,
+        temperature=TEAM_TEMPERATURE,
+        max_tokens=2000,
+        response_format=llm_json.response_format(TeamConfig, "team_config")
+    ):
+        chunks.append(delta)
+        for kind, key, value in parser.feed(delta):
+            if kind == "invalid_item":
+                if key in _ITEM_SPECS:
+                    dropped += 1
+            elif kind == "item":
+                if key not in _ITEM_SPECS:
+                    continue
+                try:
+                    item = _ITEM_SPECS[key].model_validate(value).dict()
+                except ValidationError:
+                    dropped += 1
+                    continue
+                valid_items[key].append(item)
+                yield "item", key, item
+            elif key in _ITEM_SPECS:
+                fields_seen.add(key)
+                yield "field", key, valid_items[key]
+            elif key in _FIELD_ADAPTERS:
+                fields_seen.add(key)
+                value = _field_or_default(key, value) if kind == "field" else TeamConfig.model_fields[key].get_default()
+                yield "field", key, value
+
+    if parser.done:
+        if not valid_items["tasks"]:
+            JSON_PARSE_FAILURES.labels("team_stream").inc()
+            raise TeamGenerationError("AI response did not contain any usable tasks")
+        if dropped:
+            JSON_REPAIRS.labels("team_stream", "local").inc()
+        for key in _ITEM_SPECS:
+            if key not in fields_seen:
+                yield "field", key, valid_items[key]
+        for key in _FIELD_ADAPTERS:
+            if key not in fields_seen:
+                yield "field", key, TeamConfig.model_fields[key].get_default()
+    else:
+        # Cut off: finish with whatever a local repair recovers instead of failing
+        try:
+            team_config, _ = parse_llm_json("".join(chunks), TeamConfig)
+        except LLMJSONError:
+            JSON_PARSE_FAILURES.labels("team_stream").inc()
+            raise TeamGenerationError("AI response ended before the team configuration was complete")
+        JSON_REPAIRS.labels("team_stream", "local").inc()
+        team_config = team_config.dict()
+        # Invalid items are dropped by both, so the repaired lists start with the items already sent
+        for key in _ITEM_SPECS:
+            for item in team_config[key][len(valid_items[key]):]:
+                valid_items[key].append(item)
+                yield "item", key, item
+        for key, value in team_config.items():
+            if key not in fields_seen:
+                yield "field", key, value
+
+
+async def cached_team_parts(team_config: dict) -> AsyncIterator[tuple]:
+    """The same parser events replayed from a cached team configuration"""
+    for task_data in team_config["tasks"]:
+        yield ("item", "tasks", task_data)
+    for agent_data in team_config["agents"]:
+        yield ("item", "agents", agent_data)
+    for key in ("recommended_tools", "workflow_type", "explanation"):
+        yield ("field", key, team_config[key])
+
+
+async def generate_team(request: IntelligentTeamRequest, use_cache: bool = True) -> IntelligentTeamResponse:
+    """Generate a team for a mission (cached and coalesced like the API endpoint)"""
+    team_config, _ = await resolve_team_config(request, use_cache, use_cache)
+    return build_team_response(request, team_config)
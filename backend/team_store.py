@@ -0,0 +1,570 @@
+"""Storage backends for saved agent teams and their revision history.
+
+``server.py`` talks to a ``TeamStore`` rather than to Motor directly, so the
+API can run against:
+
+    mongo   - MongoDB through Motor (the default, needs MONGO_URL and DB_NAME)
+    memory  - a process-local dict, for tests and hermetic load tests
+    sqlite  - a single SQLite file via the stdlib sqlite3 module, with
+              blocking calls moved off the event loop with asyncio.to_thread
+
+The backend is picked with ``TEAM_STORE`` (see ``create_team_store``). All
+backends connect lazily on first use; ``connect`` just does it up front.
+Documents go in and come out as plain dicts shaped like the Mongo documents,
+and projections use Mongo's inclusion syntax (dotted paths reach into arrays
+of subdocuments) so callers do not care which backend they have.
+"""
+import asyncio
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+from metrics import STORE_OPERATION_DURATION
+from migrations import apply_migrations
+
+# Listing position: (created_at, id) of the last team seen, newest first
+ListingPosition = Tuple[datetime, str]
+
+
+class TeamStore(ABC):
+    """Repository for ``agent_teams`` and ``team_revisions``.
+
+    Listings are always newest first by (created_at, id). ``update_team``
+    applies ``$set``-style dotted paths (array entries by position) only if
+    the team is still at ``expected_revision``, and reports whether it did.
+    Backends must implement every abstract method; an incomplete one fails
+    when it is created.
+    """
+
+    name = "base"
+
+    async def connect(self):
+        pass
+
+    async def migrate(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def insert_team(self, team: dict):
+        ...
+
+    @abstractmethod
+    async def insert_teams(self, teams: List[dict]) -> Dict[int, str]:
+        """Insert unordered; returns {index: error} for the teams that failed"""
+
+    @abstractmethod
+    async def get_team(self, team_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def iter_teams(
+        self,
+        workflow_type: Optional[str] = None,
+        tools: Optional[Sequence[str]] = None,
+        after: Optional[ListingPosition] = None,
+        limit: Optional[int] = None,
+        projection: Optional[dict] = None,
+        batch_size: int = 100,
+    ) -> AsyncIterator[dict]:
+        ...
+
+    @abstractmethod
+    async def update_team(self, team_id: str, expected_revision: int, updates: dict) -> bool:
+        ...
+
+    @abstractmethod
+    async def add_revision(self, revision: dict):
+        ...
+
+    @abstractmethod
+    async def list_revisions(self, team_id: str, limit: int) -> List[dict]:
+        ...
+
+
+def utc_naive(value: datetime) -> datetime:
+    """Datetimes as Mongo stores them: UTC without tzinfo"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def clone(value):
+    """Copy of a JSON-like document; much cheaper than copy.deepcopy"""
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    # str, numbers, None and datetime are immutable
+    return value
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    """Apply a Mongo inclusion projection to a plain document (always a copy)"""
+    paths = [path for path, include in (projection or {}).items() if include and path != "_id"]
+    if not paths:
+        result = clone(doc)
+        result.pop("_id", None)
+        return result
+    result = {}
+    for path in paths:
+        _copy_path(doc, result, path.split("."))
+    return result
+
+
+def _copy_path(source: dict, target: dict, parts: List[str]):
+    key = parts[0]
+    if key not in source:
+        return
+    value = source[key]
+    if len(parts) == 1:
+        target[key] = clone(value)
+    elif isinstance(value, list):
+        items = target.setdefault(key, [{} if isinstance(item, dict) else None for item in value])
+        for item, projected in zip(value, items):
+            if isinstance(item, dict):
+                _copy_path(item, projected, parts[1:])
+        # Like Mongo, array entries that are not subdocuments are dropped
+        target[key] = [item for item in items if item is not None]
+    elif isinstance(value, dict):
+        _copy_path(value, target.setdefault(key, {}), parts[1:])
+
+
+def set_path(doc: dict, path: str, value):
+    """Assign a dotted path in place; numeric parts index into lists"""
+    *parents, last = path.split(".")
+    node = doc
+    for part in parents:
+        node = node[int(part)] if isinstance(node, list) else node.setdefault(part, {})
+    if isinstance(node, list):
+        node[int(last)] = value
+    else:
+        node[last] = value
+
+
+def matches(team: dict, workflow_type: Optional[str], tools: Optional[Sequence[str]]) -> bool:
+    if workflow_type and team.get("workflow_type") != workflow_type:
+        return False
+    return not tools or set(tools) <= set(team.get("selected_tools", []))
+
+
+class MotorTeamStore(TeamStore):
+    name = "mongo"
+
+    def __init__(self, mongo_url: Optional[str] = None, db_name: Optional[str] = None, database=None):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.client = None
+        self._db = database
+
+    @property
+    def db(self):
+        """The Motor database, creating the client on first use"""
+        if self._db is None:
+            self.client = AsyncIOMotorClient(self.mongo_url or os.environ['MONGO_URL'])
+            self._db = self.client[self.db_name or os.environ['DB_NAME']]
+        return self._db
+
+    async def connect(self):
+        await self.db.command("ping")
+
+    async def migrate(self):
+        await apply_migrations(self.db)
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    async def insert_team(self, team: dict):
+        # insert_one adds _id to the dict it is given
+        await self.db.agent_teams.insert_one(dict(team))
+
+    async def insert_teams(self, teams: List[dict]) -> Dict[int, str]:
+        try:
+            await self.db.agent_teams.insert_many([dict(team) for team in teams], ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        return {}
+
+    async def get_team(self, team_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.db.agent_teams.find_one({"id": team_id}, projection or {"_id": 0})
+
+    async def iter_teams(self, workflow_type=None, tools=None, after=None, limit=None, projection=None, batch_size=100):
+        query = {}
+        if workflow_type:
+            query["workflow_type"] = workflow_type
+        if tools:
+            query["selected_tools"] = {"$all": list(tools)}
+        if after:
+            created_at, team_id = after
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": team_id}},
+            ]
+        cursor = self.db.agent_teams.find(query, projection or {"_id": 0}).sort([("created_at", -1), ("id", -1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        async for team in cursor.batch_size(batch_size):
+            yield team
+
+    async def update_team(self, team_id: str, expected_revision: int, updates: dict) -> bool:
+        # Documents saved before revisions existed have no revision field
+        revision = expected_revision if expected_revision else {"$in": [0, None]}
+        result = await self.db.agent_teams.update_one({"id": team_id, "revision": revision}, {"$set": updates})
+        return result.matched_count == 1
+
+    async def add_revision(self, revision: dict):
+        await self.db.team_revisions.insert_one(dict(revision))
+
+    async def list_revisions(self, team_id: str, limit: int) -> List[dict]:
+        cursor = self.db.team_revisions.find({"team_id": team_id}, {"_id": 0}).sort("revision", -1).limit(limit)
+        return [revision async for revision in cursor]
+
+
+class MemoryTeamStore(TeamStore):
+    """Teams in a dict plus a sorted (created_at, id) index; nothing is persisted"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._teams: Dict[str, dict] = {}
+        self._order: List[ListingPosition] = []
+        self._revisions: Dict[str, List[dict]] = {}
+
+    def _insert(self, team: dict):
+        if team["id"] in self._teams:
+            raise ValueError(f"Duplicate team id: {team['id']}")
+        team = clone(team)
+        team.pop("_id", None)
+        self._teams[team["id"]] = team
+        bisect.insort(self._order, (utc_naive(team["created_at"]), team["id"]))
+
+    async def insert_team(self, team: dict):
+        self._insert(team)
+
+    async def insert_teams(self, teams: List[dict]) -> Dict[int, str]:
+        failed = {}
+        for index, team in enumerate(teams):
+            try:
+                self._insert(team)
+            except ValueError as e:
+                failed[index] = str(e)
+        return failed
+
+    async def get_team(self, team_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        team = self._teams.get(team_id)
+        return project(team, projection) if team is not None else None
+
+    async def iter_teams(self, workflow_type=None, tools=None, after=None, limit=None, projection=None, batch_size=100):
+        end = len(self._order)
+        if after:
+            end = bisect.bisect_left(self._order, (utc_naive(after[0]), after[1]))
+        # Snapshot the slice so concurrent inserts cannot shift positions mid-iteration
+        positions = self._order[:end]
+        count = 0
+        for index in range(len(positions) - 1, -1, -1):
+            team = self._teams.get(positions[index][1])
+            if team is None or not matches(team, workflow_type, tools):
+                continue
+            yield project(team, projection)
+            count += 1
+            if limit and count >= limit:
+                return
+            if count % batch_size == 0:
+                # Let other requests run during long listings
+                await asyncio.sleep(0)
+
+    async def update_team(self, team_id: str, expected_revision: int, updates: dict) -> bool:
+        team = self._teams.get(team_id)
+        if team is None or team.get("revision", 0) != expected_revision:
+            return False
+        for path, value in updates.items():
+            set_path(team, path, clone(value))
+        return True
+
+    async def add_revision(self, revision: dict):
+        revisions = self._revisions.setdefault(revision["team_id"], [])
+        if any(existing["revision"] == revision["revision"] for existing in revisions):
+            raise ValueError(f"Duplicate revision {revision['revision']} for team {revision['team_id']}")
+        revisions.append(clone(revision))
+
+    async def list_revisions(self, team_id: str, limit: int) -> List[dict]:
+        revisions = sorted(self._revisions.get(team_id, []), key=lambda revision: revision["revision"], reverse=True)
+        return clone(revisions[:limit])
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode_object(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(doc: dict) -> str:
+    return json.dumps(doc, default=_encode_value, separators=(",", ":"))
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_decode_object)
+
+
+def _sort_time(value: datetime) -> str:
+    # Fixed-width so the column sorts lexicographically in time order
+    return utc_naive(value).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_teams (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    workflow_type TEXT,
+    revision INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agent_teams_listing ON agent_teams (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS agent_teams_workflow_listing ON agent_teams (workflow_type, created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS team_revisions (
+    team_id TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (team_id, revision)
+);
+"""
+
+
+class SQLiteTeamStore(TeamStore):
+    """Teams as JSON documents in one SQLite file.
+
+    One connection is shared and guarded by a lock; every call runs in a
+    worker thread so the event loop never blocks on disk I/O. The listing
+    columns (created_at, workflow_type, revision) are kept next to the JSON
+    so pagination and filters use indexes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            return fn(self._connection(), *args)
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    async def connect(self):
+        await self._run(lambda conn: None)
+
+    async def close(self):
+        def close(conn):
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            await self._run(close)
+
+    @staticmethod
+    def _row(team: dict) -> tuple:
+        team = {key: value for key, value in team.items() if key != "_id"}
+        return (team["id"], _sort_time(team["created_at"]), team.get("workflow_type"), team.get("revision", 0), _dumps(team))
+
+    async def insert_team(self, team: dict):
+        def insert(conn, row):
+            with conn:
+                conn.execute("INSERT INTO agent_teams (id, created_at, workflow_type, revision, doc) VALUES (?, ?, ?, ?, ?)", row)
+        await self._run(insert, self._row(team))
+
+    async def insert_teams(self, teams: List[dict]) -> Dict[int, str]:
+        def insert_many(conn, rows):
+            failed = {}
+            with conn:
+                for index, row in enumerate(rows):
+                    try:
+                        conn.execute("INSERT INTO agent_teams (id, created_at, workflow_type, revision, doc) VALUES (?, ?, ?, ?, ?)", row)
+                    except sqlite3.IntegrityError as e:
+                        failed[index] = str(e)
+            return failed
+        return await self._run(insert_many, [self._row(team) for team in teams])
+
+    async def get_team(self, team_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        def get(conn):
+            return conn.execute("SELECT doc FROM agent_teams WHERE id = ?", (team_id,)).fetchone()
+        row = await self._run(get)
+        return project(_loads(row[0]), projection) if row else None
+
+    @staticmethod
+    def _listing_query(workflow_type, tools, after, limit) -> Tuple[str, list]:
+        clauses, params = [], []
+        if workflow_type:
+            clauses.append("workflow_type = ?")
+            params.append(workflow_type)
+        for tool in tools or ():
+            clauses.append("EXISTS (SELECT 1 FROM json_each(doc, '$.selected_tools') WHERE value = ?)")
+            params.append(tool)
+        if after:
+            clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            created_at = _sort_time(after[0])
+            params += [created_at, created_at, after[1]]
+        sql = "SELECT created_at, id, doc FROM agent_teams"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return sql, params
+
+    async def iter_teams(self, workflow_type=None, tools=None, after=None, limit=None, projection=None, batch_size=100):
+        # Page through with keyset queries so the lock is never held for a whole listing
+        remaining = limit
+        position = after
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+            sql, params = self._listing_query(workflow_type, tools, position, page_size)
+            rows = await self._run(lambda conn: conn.execute(sql, params).fetchall())
+            for _, _, doc in rows:
+                yield project(_loads(doc), projection)
+            if len(rows) < page_size:
+                return
+            if remaining is not None:
+                remaining -= len(rows)
+            created_at, team_id, _ = rows[-1]
+            position = (datetime.fromisoformat(created_at), team_id)
+
+    async def update_team(self, team_id: str, expected_revision: int, updates: dict) -> bool:
+        def update(conn):
+            with conn:
+                row = conn.execute("SELECT doc FROM agent_teams WHERE id = ? AND revision = ?", (team_id, expected_revision)).fetchone()
+                if row is None:
+                    return False
+                team = _loads(row[0])
+                for path, value in updates.items():
+                    set_path(team, path, value)
+                conn.execute(
+                    "UPDATE agent_teams SET workflow_type = ?, revision = ?, doc = ? WHERE id = ?",
+                    (team.get("workflow_type"), team.get("revision", 0), _dumps(team), team_id),
+                )
+                return True
+        return await self._run(update)
+
+    async def add_revision(self, revision: dict):
+        def insert(conn):
+            with conn:
+                conn.execute(
+                    "INSERT INTO team_revisions (team_id, revision, doc) VALUES (?, ?, ?)",
+                    (revision["team_id"], revision["revision"], _dumps(revision)),
+                )
+        await self._run(insert)
+
+    async def list_revisions(self, team_id: str, limit: int) -> List[dict]:
+        def select(conn):
+            return conn.execute(
+                "SELECT doc FROM team_revisions WHERE team_id = ? ORDER BY revision DESC LIMIT ?", (team_id, limit)
+            ).fetchall()
+        return [_loads(row[0]) for row in await self._run(select)]
+
+
+class MeteredTeamStore(TeamStore):
+    """Wraps another store and records the latency of each operation.
+
+    Listings are timed across the whole iteration, counting only time spent
+    waiting on the store (not on the consumer).
+    """
+
+    def __init__(self, inner: TeamStore):
+        self.inner = inner
+        self.name = inner.name
+
+    async def _timed(self, operation: str, call):
+        start = time.perf_counter()
+        try:
+            return await call
+        finally:
+            STORE_OPERATION_DURATION.labels(self.name, operation).observe(time.perf_counter() - start)
+
+    async def connect(self):
+        await self.inner.connect()
+
+    async def migrate(self):
+        await self.inner.migrate()
+
+    async def close(self):
+        await self.inner.close()
+
+    async def insert_team(self, team: dict):
+        return await self._timed("insert_team", self.inner.insert_team(team))
+
+    async def insert_teams(self, teams: List[dict]) -> Dict[int, str]:
+        return await self._timed("insert_teams", self.inner.insert_teams(teams))
+
+    async def get_team(self, team_id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self._timed("get_team", self.inner.get_team(team_id, projection))
+
+    async def iter_teams(self, workflow_type=None, tools=None, after=None, limit=None, projection=None, batch_size=100):
+        teams = self.inner.iter_teams(workflow_type=workflow_type, tools=tools, after=after, limit=limit, projection=projection, batch_size=batch_size)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    team = await teams.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield team
+        finally:
+            await teams.aclose()
+            STORE_OPERATION_DURATION.labels(self.name, "iter_teams").observe(elapsed)
+
+    async def update_team(self, team_id: str, expected_revision: int, updates: dict) -> bool:
+        return await self._timed("update_team", self.inner.update_team(team_id, expected_revision, updates))
+
+    async def add_revision(self, revision: dict):
+        return await self._timed("add_revision", self.inner.add_revision(revision))
+
+    async def list_revisions(self, team_id: str, limit: int) -> List[dict]:
+        return await self._timed("list_revisions", self.inner.list_revisions(team_id, limit))
+
+
+TEAM_STORES = ("mongo", "memory", "sqlite")
+
+
+def create_team_store(backend: Optional[str] = None) -> TeamStore:
+    """Build the configured store (not yet connected, not metered).
+
+    ``backend`` defaults to env TEAM_STORE (``mongo``). The SQLite file is
+    env SQLITE_PATH (``agent_teams.db``).
+    """
+    backend = (backend or os.environ.get('TEAM_STORE', 'mongo')).lower()
+    if backend == "mongo":
+        return MotorTeamStore()
+    if backend == "memory":
+        return MemoryTeamStore()
+    if backend == "sqlite":
+        return SQLiteTeamStore(os.environ.get('SQLITE_PATH', 'agent_teams.db'))
+    raise ValueError(f"Unknown TEAM_STORE {backend!r}; expected one of {', '.join(TEAM_STORES)}")
@@ -2,23 +2,130 @@ import asyncio
 import json
 import logging
 import os
-from typing import Dict, Optional, List
+import re
+from collections import deque
+from contextlib import aclosing
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
 from livekit import agents, rtc
 from livekit.agents import JobContext, WorkerOptions, cli
 from livekit.agents.voice import Agent as VoiceAgent
 from livekit.plugins import deepgram, openai, silero
 import aiohttp
-import openai
 from dotenv import load_dotenv
+import llm_client
+import team_service
+from mission_classifier import load_mission_classifier
+from models import IntelligentTeamRequest
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger("crewai-voice-agent")
 
+# "inprocess" (default) generates teams with team_service in this worker;
+# "http" calls API_BASE_URL, e.g. when the worker runs apart from the API
+TEAM_GENERATION_MODE = os.getenv("VOICE_TEAM_GENERATION", "inprocess")
+
+# Speak replies sentence by sentence as the LLM streams them (set to "false"
+# to wait for the whole reply, as before)
+STREAM_RESPONSES = os.getenv("VOICE_STREAM_RESPONSES", "true").lower() != "false"
+# Shorter pieces are held back and spoken with the next one, so TTS is not
+# fed fragments like "Great!" on their own
+SENTENCE_MIN_CHARS = int(os.getenv("VOICE_SENTENCE_MIN_CHARS", "20"))
+
+READY_SENTINEL = "READY_TO_GENERATE"
+# Spoken instead of an LLM reply when the keyword classifier says a team can be built
+READY_REPLY = "Great, I have a clear picture of what you need. Give me a moment while I put your AI team together."
+SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+# A period after one of these (or a single letter) does not end a sentence
+ABBREVIATION_RE = re.compile(r"(?<![\w.])(?:mr|mrs|ms|dr|prof|st|jr|sr|vs|etc|inc|ltd|corp|approx|e\.g|i\.e|[a-z])$", re.IGNORECASE)
+
+_http_session: Optional[aiohttp.ClientSession] = None
+# Jobs running in this process; the last one to shut down closes the session
+_active_jobs = 0
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Keep-alive session shared by every job in this worker process, created on first use"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=int(os.getenv("VOICE_API_MAX_CONNECTIONS", "16")),
+                keepalive_timeout=60,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=float(os.getenv("VOICE_API_TIMEOUT_SECONDS", "120")),
+                connect=5,
+            ),
+        )
+    return _http_session
+
+def track_job(ctx: JobContext):
+    """Count a job as using the shared session until its shutdown"""
+    global _active_jobs
+    _active_jobs += 1
+    ctx.add_shutdown_callback(_release_http_session)
+
+async def _release_http_session():
+    global _active_jobs, _http_session
+    _active_jobs -= 1
+    if _active_jobs == 0 and _http_session is not None:
+        session, _http_session = _http_session, None
+        await session.close()
+
+# Per-session memory bounds for the conversation context
+HISTORY_TURNS = int(os.getenv("VOICE_HISTORY_TURNS", "20"))
+SUMMARY_CHARS = int(os.getenv("VOICE_SUMMARY_CHARS", "2000"))
+DESCRIPTION_CHARS = 300
+
+mission_classifier = load_mission_classifier()
+
+async def speakable_sentences(deltas: AsyncIterator[str], min_chars: int = SENTENCE_MIN_CHARS) -> AsyncIterator[str]:
+    """Regroup streamed text deltas into sentences for TTS.
+
+    A sentence is yielded as soon as its end (punctuation followed by
+    whitespace, or a line break) has arrived; the period of an abbreviation
+    such as "Dr." or "e.g." is not an end. READY_SENTINEL contains neither,
+    so it always arrives whole within one sentence.
+    """
+    buffer = ""
+    async for delta in deltas:
+        buffer += delta
+        start = 0
+        for match in SENTENCE_END_RE.finditer(buffer):
+            if buffer[match.start()] == "." and ABBREVIATION_RE.search(buffer, start, match.start()):
+                continue
+            if match.end() - start >= min_chars:
+                sentence = buffer[start:match.end()].strip()
+                if sentence:
+                    yield sentence
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+class ConversationTurn:
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: float):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
 class CrewAIConversationContext:
+    """Conversation state kept up to date turn by turn.
+
+    Only the last HISTORY_TURNS turns are kept. What the team request needs
+    from the user's side of the conversation is accumulated as messages
+    arrive: keyword hits, the opening of the description and a rolling
+    summary (the first user message plus the most recent ones, up to
+    SUMMARY_CHARS). Adding a message costs time proportional to its length
+    and memory per session is bounded.
+    """
+
     def __init__(self):
-        self.conversation_history: List[Dict[str, str]] = []
+        self.conversation_history: Deque[ConversationTurn] = deque(maxlen=HISTORY_TURNS)
         self.extracted_requirements = {
             "mission_name": "",
             "mission_objective": "",
@@ -29,76 +136,96 @@ class CrewAIConversationContext:
         }
         self.state = "greeting"  # greeting -> collecting -> analyzing -> generating -> reviewing
         self.generated_team = None
+        self.user_turns = 0
+        self.keyword_hits: Set[str] = set()
+        self.keyword_scores: Dict[str, float] = {}
+        self._opening = ""
+        self._recent_user: Deque[str] = deque()
+        self._recent_chars = 0
+        self._description = ""
 
     def add_message(self, role: str, content: str):
         """Add a message to conversation history"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content,
-            "timestamp": str(asyncio.get_event_loop().time())
-        })
+        self.conversation_history.append(ConversationTurn(role, content, asyncio.get_event_loop().time()))
+        if role == "user":
+            self._observe_user_message(content)
         logger.info(f"Added message - Role: {role}, Content: {content[:100]}...")
 
-    def extract_requirements_from_history(self) -> Dict:
-        """Extract structured requirements from conversation history"""
-        user_messages = [msg["content"] for msg in self.conversation_history if msg["role"] == "user"]
-        combined_text = " ".join(user_messages).lower()
+    def _observe_user_message(self, content: str):
+        text = content.lower()
+        # Each keyword scores once per conversation, however often it is repeated
+        new_keywords = mission_classifier.match(text) - self.keyword_hits
+        if new_keywords:
+            self.keyword_hits |= new_keywords
+            mission_classifier.add_scores(self.keyword_scores, new_keywords)
         
-        requirements = self.extracted_requirements.copy()
-        
-        # Extract mission type from keywords
-        mission_keywords = {
-            "marketing": "Marketing Campaign",
-            "sales": "Sales Growth Initiative", 
-            "website": "Website Optimization Project",
-            "ecommerce": "E-commerce Growth Strategy",
-            "customer": "Customer Experience Enhancement",
-            "content": "Content Strategy Development"
-        }
+        if len(self._description) < DESCRIPTION_CHARS:
+            separator = " " if self.user_turns else ""
+            self._description = (self._description + separator + text)[:DESCRIPTION_CHARS]
         
-        for keyword, mission_type in mission_keywords.items():
-            if keyword in combined_text:
-                requirements["mission_name"] = mission_type
-                break
+        if self.user_turns == 0:
+            self._opening = content[:SUMMARY_CHARS // 2]
+        else:
+            self._recent_user.append(content)
+            self._recent_chars += len(content) + 1
+            budget = SUMMARY_CHARS - len(self._opening)
+            # Always keep the latest message, even if it alone is over budget
+            while self._recent_chars > budget and len(self._recent_user) > 1:
+                self._recent_chars -= len(self._recent_user.popleft()) + 1
+        self.user_turns += 1
+
+    def summary(self) -> str:
+        """The user's side of the conversation: opening message and the latest ones"""
+        return " ".join([self._opening, *self._recent_user]).strip()
+
+    def extract_requirements_from_history(self) -> Dict:
+        """Extract structured requirements from the accumulated conversation state"""
+        requirements = self.extracted_requirements.copy()
         
-        if not requirements["mission_name"]:
-            requirements["mission_name"] = "Business Growth Project"
+        requirements["mission_name"] = mission_classifier.mission_name(self.keyword_scores)
         
-        requirements["mission_objective"] = " ".join(user_messages)
-        requirements["mission_description"] = f"Project requirements: {combined_text[:300]}..."
+        requirements["mission_objective"] = self.summary()
+        requirements["mission_description"] = f"Project requirements: {self._description}..."
         
         logger.info(f"Extracted requirements: {requirements}")
         return requirements
 
     def should_generate_team(self) -> bool:
         """Determine if we have enough information to generate AI team"""
-        user_messages = [msg for msg in self.conversation_history if msg["role"] == "user"]
-        
-        if len(user_messages) < 2:
+        if self.user_turns < mission_classifier.min_user_turns:
             logger.info("Not enough user messages yet")
             return False
-            
-        combined_text = " ".join([msg["content"].lower() for msg in user_messages])
-        
-        has_business_goal = any(keyword in combined_text for keyword in [
-            "increase", "improve", "grow", "boost", "optimize", "enhance", 
-            "marketing", "sales", "business", "website", "customers"
-        ])
         
-        has_specific_context = any(keyword in combined_text for keyword in [
-            "company", "store", "website", "product", "service", "online",
-            "conversion", "traffic", "revenue", "customers"
-        ])
-        
-        result = has_business_goal and has_specific_context
-        logger.info(f"Should generate team: {result} (goal: {has_business_goal}, context: {has_specific_context})")
+        readiness = mission_classifier.readiness(self.keyword_scores)
+        result = all(readiness.values())
+        logger.info(f"Should generate team: {result} ({readiness})")
         return result
 
 class CrewAIVoiceAgent:
-    def __init__(self):
+    def __init__(self, on_team_generated: Optional[Callable[[Dict, str], Awaitable[None]]] = None):
         self.api_base_url = os.getenv("API_BASE_URL", "http://localhost:8001/api")
         self.context = CrewAIConversationContext()
+        # Called with (team, summary) when a team generated in the background is ready
+        self.on_team_generated = on_team_generated
+        self._team_task: Optional[asyncio.Task] = None
         logger.info("CrewAI Voice Agent initialized")
+    
+    def _response_messages(self, user_input: str) -> list:
+        conversation_context = self._build_conversation_context()
+        
+        prompt = f"""
+Context: {conversation_context}
+User just said: "{user_input}"
+Current conversation state: {self.context.state}
+
+Respond naturally and conversationally. Ask ONE follow-up question to gather more information about their business needs. Keep responses to 2-3 sentences maximum.
+
+If you have enough information to create their AI team (they've mentioned business goals and some context), end your response with "{READY_SENTINEL}" on a new line.
+"""
+        return [
+            {"role": "system", "content": self._get_system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
         
     async def generate_conversational_response(self, user_input: str) -> str:
         """Generate contextual response using LLM"""
@@ -112,37 +239,26 @@ class CrewAIVoiceAgent:
                 logger.error("OpenAI API key not found")
                 return "I apologize, but I'm having trouble connecting to my AI services. Please try again later."
             
-            openai.api_key = api_key
-            
-            conversation_context = self._build_conversation_context()
-            
-            prompt = f"""
-Context: {conversation_context}
-User just said: "{user_input}"
-Current conversation state: {self.context.state}
-
-Respond naturally and conversationally. Ask ONE follow-up question to gather more information about their business needs. Keep responses to 2-3 sentences maximum.
-
-If you have enough information to create their AI team (they've mentioned business goals and some context), end your response with "READY_TO_GENERATE" on a new line.
-"""
-            
-            # Call OpenAI API
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=300
-            )
-            
-            response_text = response.choices[0].message.content
-            logger.info(f"LLM response: {response_text}")
+            ready = self._ready_for_team()
+            if ready:
+                # No LLM turn needed to decide; go straight to generation
+                response_text = READY_REPLY
+            else:
+                # Call OpenAI API
+                response_text = await llm_client.chat_completion(
+                    api_key,
+                    messages=self._response_messages(user_input),
+                    temperature=0.7,
+                    max_tokens=300
+                )
+                logger.info(f"LLM response: {response_text}")
+                
+                # The model may still spot readiness the keywords missed
+                if READY_SENTINEL in response_text:
+                    response_text = response_text.replace(READY_SENTINEL, "").strip()
+                    ready = True
             
-            # Check if ready to generate team
-            if "READY_TO_GENERATE" in response_text:
-                response_text = response_text.replace("READY_TO_GENERATE", "").strip()
+            if ready:
                 self.context.state = "generating"
                 logger.info("Triggering team generation")
                 
@@ -157,10 +273,96 @@ If you have enough information to create their AI team (they've mentioned busine
             self.context.add_message("assistant", response_text)
             return response_text
             
+        except llm_client.LLMUnavailableError as e:
+            # Retries already happened in llm_client; ask the user to pause rather than fail
+            logger.warning(f"AI service unavailable: {str(e)}")
+            return "Sorry, I'm a little overloaded right now. Give me a moment and then say that again."
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             return "I apologize, but I encountered an issue. Could you please repeat that?"
     
+    async def stream_conversational_response(self, user_input: str) -> AsyncIterator[str]:
+        """Yield the reply sentence by sentence while the LLM is still writing it.
+        
+        Team generation starts in the background, without an LLM turn, once
+        the keyword classifier finds the conversation ready, or when the
+        model signals READY_SENTINEL, in which case the rest of the reply is
+        spoken meanwhile. The team and its summary are delivered through
+        on_team_generated.
+        """
+        logger.info(f"Processing user input: {user_input}")
+        self.context.add_message("user", user_input)
+        
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            logger.error("OpenAI API key not found")
+            yield "I apologize, but I'm having trouble connecting to my AI services. Please try again later."
+            return
+        
+        if self._ready_for_team():
+            self.start_team_generation()
+            self.context.add_message("assistant", READY_REPLY)
+            yield READY_REPLY
+            return
+        
+        spoken = []
+        try:
+            # Closed explicitly so a barge-in (the consumer stopping early)
+            # releases the upstream stream and its concurrency slot at once
+            async with aclosing(llm_client.stream_chat_completion(
+                api_key,
+                messages=self._response_messages(user_input),
+                temperature=0.7,
+                max_tokens=300
+            )) as deltas, aclosing(speakable_sentences(deltas)) as sentences:
+                async for sentence in sentences:
+                    if READY_SENTINEL in sentence:
+                        sentence = sentence.replace(READY_SENTINEL, "").strip()
+                        self.start_team_generation()
+                    if sentence:
+                        spoken.append(sentence)
+                        yield sentence
+            logger.info(f"LLM response: {' '.join(spoken)}")
+            
+        except llm_client.LLMUnavailableError as e:
+            logger.warning(f"AI service unavailable: {str(e)}")
+            yield "Sorry, I'm a little overloaded right now. Give me a moment and then say that again."
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            yield "I apologize, but I encountered an issue. Could you please repeat that?"
+        finally:
+            if spoken:
+                self.context.add_message("assistant", " ".join(spoken))
+    
+    def _ready_for_team(self) -> bool:
+        """Whether to build the team now instead of asking for more details"""
+        if self.context.state in ("generating", "reviewing"):
+            return False
+        return self.context.should_generate_team()
+    
+    def start_team_generation(self):
+        """Generate the team in a background task, unless one is already running"""
+        if self._team_task is not None and not self._team_task.done():
+            return
+        self.context.state = "generating"
+        logger.info("Triggering team generation")
+        self._team_task = asyncio.create_task(self._generate_team_in_background())
+    
+    async def _generate_team_in_background(self):
+        await self._generate_ai_team()
+        if not self.context.generated_team:
+            self.context.state = "collecting"
+            return
+        
+        team_summary = self._create_team_summary()
+        self.context.state = "reviewing"
+        self.context.add_message("assistant", team_summary)
+        if self.on_team_generated is not None:
+            try:
+                await self.on_team_generated(self.context.generated_team, team_summary)
+            except Exception as e:
+                logger.error(f"Error delivering generated team: {str(e)}")
+    
     def _get_system_prompt(self) -> str:
         return """You are a friendly, expert AI assistant specialized in creating AI agent teams for business automation. 
 
@@ -183,47 +385,58 @@ Once you have this basic information, you can help them create their AI team."""
 
     def _build_conversation_context(self) -> str:
         """Build conversation context for LLM"""
-        if not self.context.conversation_history:
+        history = self.context.conversation_history
+        if not history:
             return "New conversation starting."
         
-        recent_messages = self.context.conversation_history[-4:]
+        recent_messages = islice(history, max(0, len(history) - 4), None)
         context_parts = []
         
         for msg in recent_messages:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            content = msg["content"][:150] + ("..." if len(msg["content"]) > 150 else "")
+            role = "User" if msg.role == "user" else "Assistant"
+            content = msg.content[:150] + ("..." if len(msg.content) > 150 else "")
             context_parts.append(f"{role}: {content}")
         
         return " | ".join(context_parts)
     
     async def _generate_ai_team(self):
-        """Generate AI team using the intelligent team generation API"""
+        """Generate AI team in-process with team_service (or over HTTP, see TEAM_GENERATION_MODE)"""
         try:
             requirements = self.context.extract_requirements_from_history()
+            request = IntelligentTeamRequest(
+                mission_name=requirements["mission_name"],
+                mission_objective=requirements["mission_objective"],
+                mission_description=requirements["mission_description"],
+                use_emergent_key=True  # This will now use OpenAI key from environment
+            )
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "mission_name": requirements["mission_name"],
-                    "mission_objective": requirements["mission_objective"],
-                    "mission_description": requirements["mission_description"],
-                    "use_emergent_key": True  # This will now use OpenAI key from environment
-                }
-                
-                logger.info(f"Calling team generation API with payload: {payload}")
-                
-                async with session.post(
-                    f"{self.api_base_url}/generate-intelligent-team",
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        self.context.generated_team = await response.json()
-                        logger.info("AI team generated successfully")
-                    else:
-                        logger.error(f"Failed to generate team: {response.status}")
+            if TEAM_GENERATION_MODE == "http":
+                self.context.generated_team = await self._generate_ai_team_over_http(request)
+            else:
+                logger.info(f"Generating team for mission: {request.mission_name}")
+                team = await team_service.generate_team(request)
+                # Plain JSON types: the team is published to the room as JSON
+                self.context.generated_team = team.model_dump(mode="json")
+            
+            if self.context.generated_team:
+                logger.info("AI team generated successfully")
                         
         except Exception as e:
             logger.error(f"Error generating AI team: {str(e)}")
     
+    async def _generate_ai_team_over_http(self, request: IntelligentTeamRequest) -> Optional[Dict]:
+        payload = request.dict()
+        logger.info(f"Calling team generation API with payload: {payload}")
+        
+        async with get_http_session().post(
+            f"{self.api_base_url}/generate-intelligent-team",
+            json=payload
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            logger.error(f"Failed to generate team: {response.status}")
+            return None
+    
     def _create_team_summary(self) -> str:
         """Create a conversational summary of the generated team"""
         if not self.context.generated_team:
@@ -255,9 +468,26 @@ Once you have this basic information, you can help them create their AI team."""
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the LiveKit voice agent"""
     logger.info(f"Voice agent starting for room: {ctx.room.name}")
+    track_job(ctx)
+    
+    async def publish_team(team: Dict):
+        data_message = {
+            "type": "team_generated",
+            "team": team
+        }
+        # Send data to frontend
+        await ctx.room.local_participant.publish_data(
+            json.dumps(data_message).encode(),
+            reliable=True
+        )
+        logger.info("Sent generated team data to frontend")
+    
+    async def on_team_generated(team: Dict, summary: str):
+        await publish_team(team)
+        await assistant.say(summary)
     
     # Initialize our CrewAI voice agent
-    crewai_agent = CrewAIVoiceAgent()
+    crewai_agent = CrewAIVoiceAgent(on_team_generated=on_team_generated)
     
     # Connect to the room
     await ctx.connect(auto_subscribe=agents.AutoSubscribe.AUDIO_ONLY)
@@ -278,22 +508,19 @@ async def entrypoint(ctx: JobContext):
         try:
             logger.info(f"User said: {user_msg}")
             
+            if STREAM_RESPONSES:
+                # TTS starts on the first sentence; a team, if triggered, is
+                # built meanwhile and announced by on_team_generated
+                await assistant.say(crewai_agent.stream_conversational_response(user_msg))
+                return
+            
             # Generate response using our CrewAI agent
             response = await crewai_agent.generate_conversational_response(user_msg)
             logger.info(f"Assistant responding: {response}")
             
             # Send team data if generated
             if crewai_agent.context.generated_team:
-                data_message = {
-                    "type": "team_generated",
-                    "team": crewai_agent.context.generated_team
-                }
-                # Send data to frontend
-                await ctx.room.local_participant.publish_data(
-                    json.dumps(data_message).encode(),
-                    reliable=True
-                )
-                logger.info("Sent generated team data to frontend")
+                await publish_team(crewai_agent.context.generated_team)
             
             # Have the assistant speak the response
             await assistant.say(response)
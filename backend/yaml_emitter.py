@@ -0,0 +1,144 @@
+"""Streaming emitter for CrewAI YAML configurations.
+
+The document is produced as a generator of small chunks, so it can be joined
+once into a string or sent as-is in a StreamingResponse for very large crews.
+User-provided text is emitted as a plain scalar only when that is
+unambiguous; anything else (``: ``, ``#``, leading indicators, newlines,
+values YAML would read as booleans/numbers/null, ...) is double-quoted.
+"""
+import json
+import re
+from operator import itemgetter
+from typing import Callable, Iterator, List, Optional
+
+# Characters that may not start or end a plain scalar
+_LEADING_UNSAFE = frozenset("-?:,[]{}#&*!|>'\"%@` ")
+_TRAILING_UNSAFE = frozenset(": ")
+
+# Only short words and number/date-like text can collide with reserved scalars
+_RESERVED_MAX_WORD = 5
+_NUMERIC_START = frozenset("0123456789+-.")
+_PLAIN_UNSAFE_START = _LEADING_UNSAFE | _NUMERIC_START
+_PLAIN_SAFE_BYTES = bytes(c for c in range(0x20, 0x7F) if chr(c) not in ":#")
+
+# Plain scalars YAML 1.1/1.2 resolvers would read as something other than a string
+_RESERVED = re.compile(
+    r"""^(?:~|null|true|false|yes|no|on|off|y|n|=|<<
+        |[-+]?(?:\d[\d_]*)?\.?\d[\d_]*(?:[eE][-+]?\d+)?
+        |[-+]?\d[\d_]*\.[\d_]*(?:[eE][-+]?\d+)?
+        |[-+]?0[xob][0-9a-fA-F_]+
+        |[-+]?\d[\d_]*(?::[0-5]?\d)+(?:\.[\d_]*)?
+        |[-+]?\.(?:inf|nan)
+        |\d{4}-\d\d?-\d\d?.*)$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def quote_scalar(value) -> str:
+    """Render a value as a YAML scalar, quoting it only when needed"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+
+    text = str(value)
+    if not text:
+        return '""'
+    # isprintable() is False for newlines, tabs and every other control/format
+    # character; those are escaped as \uXXXX so YAML cannot fold them
+    printable = text.isprintable()
+    if (
+        not printable
+        or text[0] in _LEADING_UNSAFE
+        or text[-1] in _TRAILING_UNSAFE
+        or ": " in text
+        or " #" in text
+        or ((len(text) <= _RESERVED_MAX_WORD or text[0] in _NUMERIC_START) and _RESERVED.match(text))
+    ):
+        # A JSON string is a valid YAML double-quoted scalar
+        return json.dumps(text, ensure_ascii=not printable)
+    return text
+
+
+def _all_plain(texts: List[str]) -> bool:
+    """Whether ``quote_scalar`` would leave every one of ``texts`` unquoted.
+
+    A conservative check over all of them at once, done with a few C-level
+    passes instead of one Python-level scan per scalar: printable ASCII only,
+    no ':' or '#' anywhere, more than _RESERVED_MAX_WORD characters, a safe
+    first character and no trailing space. Anything else, including
+    non-string values, is left to ``quote_scalar``.
+    """
+    try:
+        if not texts or min(map(len, texts)) <= _RESERVED_MAX_WORD:
+            return False
+        raw = "\n".join(texts).encode("ascii")
+    except (TypeError, UnicodeEncodeError):
+        return False
+    # Only the separators may survive deleting the bytes that are safe anywhere
+    if raw.translate(None, _PLAIN_SAFE_BYTES) != b"\n" * (len(texts) - 1):
+        return False
+    return _PLAIN_UNSAFE_START.isdisjoint(map(itemgetter(0), texts)) and " " not in set(map(itemgetter(-1), texts))
+
+
+def _comment(text) -> str:
+    """Collapse text onto one line so it stays inside a YAML comment"""
+    return " ".join(str(text).split())
+
+
+def iter_crewai_yaml(team_data: dict, tool_class: Optional[Callable[[str], str]] = None) -> Iterator[str]:
+    """Yield the CrewAI YAML document for a team in chunks.
+
+    ``tool_class`` maps a selected tool id to its CrewAI class name; ids are
+    emitted unchanged when it is not given.
+    """
+    mission = team_data["mission"]
+    agents = team_data["agents"]
+    tasks = team_data["tasks"]
+    tools = team_data["selected_tools"]
+
+    yield f"# {_comment(mission['name'])} - AI Agent Team Configuration\n"
+    yield "# Generated by AI Agent Team Configuration Wizard\n\n"
+
+    # Typical crews need no quoting at all; then the text is emitted as-is
+    texts = [agent[key] for agent in agents for key in ("role", "goal", "backstory")]
+    texts += [task["description"] for task in tasks]
+    quote = str if _all_plain(texts) else quote_scalar
+
+    yield "agents:" if agents else "agents: []"
+    for agent in agents:
+        yield (
+            f"\n  - role: {quote(agent['role'])}"
+            f"\n    goal: {quote(agent['goal'])}"
+            f"\n    backstory: {quote(agent['backstory'])}"
+        )
+
+    yield "\n\ntasks:" if tasks else "\n\ntasks: []"
+    for i, task in enumerate(tasks):
+        yield f"\n  - description: {quote(task['description'])}"
+        if agents:
+            # Tasks are paired with agents by position, falling back to the first agent
+            corresponding_agent = agents[i] if i < len(agents) else agents[0]
+            yield f"\n    agent: {quote(corresponding_agent['role'])}"
+        yield "\n    expected_output: Complete and accurate results for the task"
+
+    yield "\n\ntools:" if tools else "\n\ntools: []"
+    for tool_id in tools:
+        yield f"\n  - {quote_scalar(tool_class(tool_id) if tool_class else tool_id)}"
+
+    yield f"\n\nprocess: {quote_scalar(team_data['workflow_type'])}\n\n"
+    yield f"# Mission: {_comment(mission['objective'])}\n"
+    yield f"# Description: {_comment(mission.get('description') or 'No description provided')}\n"
+
+
+def render_crewai_yaml(team_data: dict, tool_class: Optional[Callable[[str], str]] = None) -> str:
+    """The complete CrewAI YAML document for a team as one string"""
+    return "".join(iter_crewai_yaml(team_data, tool_class))
+
+
+def yaml_filename(mission_name: str) -> str:
+    """Download filename for a mission, safe to use in a Content-Disposition header"""
+    stem = re.sub(r"[^a-z0-9_.-]", "", mission_name.replace(" ", "_").lower()) or "team"
+    return f"{stem}_crew.yaml"
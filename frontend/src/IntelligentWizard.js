@@ -75,21 +75,18 @@ const IntelligentWizardContainer = () => {
     
     setIsGenerating(true);
     try {
-      // First create the team
-      const createResponse = await axios.post(`${API}/teams`, {
-        mission: generatedTeam.mission,
-        tasks: generatedTeam.tasks,
-        agents: generatedTeam.agents,
-        selected_tools: generatedTeam.recommended_tools,
-        workflow_type: generatedTeam.workflow_type
+      // Save the team and render its YAML in one request
+      const pipelineResponse = await axios.post(`${API}/team-pipeline`, {
+        team: {
+          mission: generatedTeam.mission,
+          tasks: generatedTeam.tasks,
+          agents: generatedTeam.agents,
+          selected_tools: generatedTeam.recommended_tools,
+          workflow_type: generatedTeam.workflow_type
+        }
       });
 
-      // Then generate YAML
-      const yamlResponse = await axios.post(`${API}/generate-yaml`, {
-        team_id: createResponse.data.team_id
-      });
-
-      setGeneratedYaml(yamlResponse.data.yaml);
+      setGeneratedYaml(pipelineResponse.data.yaml);
       setCurrentStep(3);
     } catch (error) {
       console.error("Error generating YAML:", error);
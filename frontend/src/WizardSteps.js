@@ -371,24 +371,19 @@ export const Step6ReviewGeneration = ({
   const generateYaml = async () => {
     setIsLoading(true);
     try {
-      // First, create the team
-      const createResponse = await axios.post(`${API}/teams`, {
-        mission: wizardData.mission,
-        tasks: wizardData.tasks,
-        agents: wizardData.agents,
-        selected_tools: wizardData.selectedTools,
-        workflow_type: wizardData.workflowType
+      // Save the team and render its YAML in one request
+      const pipelineResponse = await axios.post(`${API}/team-pipeline`, {
+        team: {
+          mission: wizardData.mission,
+          tasks: wizardData.tasks,
+          agents: wizardData.agents,
+          selected_tools: wizardData.selectedTools,
+          workflow_type: wizardData.workflowType
+        }
       });
 
-      const newTeamId = createResponse.data.team_id;
-      setTeamId(newTeamId);
-
-      // Then generate YAML
-      const yamlResponse = await axios.post(`${API}/generate-yaml`, {
-        team_id: newTeamId
-      });
-
-      setGeneratedYaml(yamlResponse.data.yaml);
+      setTeamId(pipelineResponse.data.team_id);
+      setGeneratedYaml(pipelineResponse.data.yaml);
     } catch (error) {
       console.error("Error generating YAML:", error);
       alert("Error generating YAML. Please try again.");
@@ -0,0 +1,169 @@
+import asyncio
+
+import httpx
+import pytest
+
+import artifacts
+import server
+import team_store
+from artifacts import ArtifactCache, RenderedArtifact, etag_matches
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(artifacts.time, "monotonic", clock)
+    return clock
+
+
+def artifact(body: str = "body") -> RenderedArtifact:
+    return RenderedArtifact(body, "text/plain", "team.txt")
+
+
+def test_etag_names_revision_and_content():
+    first, second = artifact("a"), artifact("b")
+    first.revision = second.revision = 3
+    assert first.etag.startswith('"3-')
+    assert first.etag != second.etag
+    assert etag_matches(f'W/{first.etag}, "other"', first.etag)
+    assert etag_matches("*", first.etag)
+    assert not etag_matches(None, first.etag)
+    assert not etag_matches('"other"', first.etag)
+
+
+def test_cache_keeps_only_the_newest_revision(clock):
+    cache = ArtifactCache(ttl_seconds=0)
+    cache.put("t", 1, "yaml", artifact("one"))
+    cache.put("t", 1, "json", artifact("json"))
+    assert cache.get("t", "yaml").body == "one"
+    cache.put("t", 2, "yaml", artifact("two"))
+    assert cache.get("t", "yaml").body == "two"
+    assert cache.get("t", "json") is None
+    # A render from a read the update overtook is not cached
+    cache.put("t", 1, "yaml", artifact("stale"))
+    assert cache.get("t", "yaml").body == "two"
+
+
+def test_invalidate_with_revision_rejects_in_flight_renders(clock):
+    cache = ArtifactCache(ttl_seconds=0)
+    cache.put("t", 0, "yaml", artifact("zero"))
+    cache.invalidate("t", 1)
+    assert cache.get("t", "yaml") is None
+    cache.put("t", 0, "yaml", artifact("zero"))
+    assert cache.get("t", "yaml") is None
+    cache.put("t", 1, "yaml", artifact("one"))
+    assert cache.get("t", "yaml").body == "one"
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ArtifactCache(ttl_seconds=30)
+    cache.put("t", 0, "yaml", artifact())
+    clock.now += 29
+    assert cache.get("t", "yaml") is not None
+    clock.now += 1
+    assert cache.get("t", "yaml") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "teams": 0}
+
+
+def test_least_recently_used_team_is_evicted():
+    cache = ArtifactCache(max_teams=2, ttl_seconds=0)
+    cache.put("a", 0, "yaml", artifact())
+    cache.put("b", 0, "yaml", artifact())
+    cache.get("a", "yaml")
+    cache.put("c", 0, "yaml", artifact())
+    assert cache.get("b", "yaml") is None
+    assert cache.get("a", "yaml") is not None
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Swap in a memory store and a fresh artifact cache; returns the list of get_team calls"""
+    store = team_store.MemoryTeamStore()
+    calls = []
+    get_team = store.get_team
+
+    async def counting_get_team(team_id, projection=None):
+        calls.append(team_id)
+        return await get_team(team_id, projection)
+    monkeypatch.setattr(store, "get_team", counting_get_team)
+    monkeypatch.setattr(server, "team_store", team_store.MeteredTeamStore(store))
+    monkeypatch.setattr(server, "artifact_cache", ArtifactCache(ttl_seconds=0))
+    return calls
+
+
+def run_against_server(scenario):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await scenario(client)
+    asyncio.run(run())
+
+
+async def create_team(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/teams", json={
+        "mission": {"name": "Launch", "objective": "Sell more"},
+        "tasks": [{"title": "Research", "description": "Find the market", "order": 1}],
+        "agents": [],
+        "selected_tools": [],
+        "workflow_type": "sequential",
+    })
+    return response.json()["team_id"]
+
+
+@pytest.mark.parametrize("url", ["/api/teams/{}/yaml", "/api/teams/{}/export/json"])
+def test_repeat_downloads_and_304s_do_not_read_the_store(reads, url):
+    async def scenario(client):
+        url_for_team = url.format(await create_team(client))
+        first = await client.get(url_for_team)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert etag.startswith('"0-')
+        assert len(reads) == 1
+
+        assert (await client.get(url_for_team)).content == first.content
+        not_modified = await client.get(url_for_team, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert len(reads) == 1
+    run_against_server(scenario)
+
+
+def test_revision_bump_changes_the_etag(reads):
+    async def scenario(client):
+        team_id = await create_team(client)
+        url = f"/api/teams/{team_id}/yaml"
+        etag = (await client.get(url)).headers["etag"]
+
+        patch = await client.patch(f"/api/teams/{team_id}", json={"revision": 0, "mission": {"name": "Relaunch"}})
+        assert patch.json()["revision"] == 1
+
+        response = await client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"1-')
+        assert "Relaunch" in response.text
+    run_against_server(scenario)
+
+
+def test_generate_yaml_revalidates_with_etag(reads):
+    async def scenario(client):
+        team_id = await create_team(client)
+        first = await client.post("/api/generate-yaml", json={"team_id": team_id})
+        assert first.status_code == 200
+        again = await client.post("/api/generate-yaml", json={"team_id": team_id}, headers={"If-None-Match": first.headers["etag"]})
+        assert again.status_code == 304
+    run_against_server(scenario)
+
+
+def test_missing_team_is_404(reads):
+    async def scenario(client):
+        assert (await client.get("/api/teams/missing/yaml")).status_code == 404
+        assert (await client.get("/api/teams/missing/export/json")).status_code == 404
+    run_against_server(scenario)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import server
+import team_store
+
+TEAM = {
+    "mission": {"name": "Launch", "objective": "Sell more"},
+    "tasks": [{"title": "Research", "description": "Find the market", "order": 1}],
+    "agents": [],
+    "selected_tools": ["serper_search"],
+    "workflow_type": "sequential",
+}
+
+
+@pytest.fixture
+def use_memory_store(monkeypatch):
+    def swap():
+        monkeypatch.setattr(server, "team_store", team_store.MeteredTeamStore(team_store.MemoryTeamStore()))
+    swap()
+    return swap
+
+
+def run_against_server(scenario):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+    return asyncio.run(run())
+
+
+def ndjson(*lines) -> bytes:
+    return "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines).encode()
+
+
+def test_mixed_body_reports_each_line(use_memory_store):
+    async def scenario(client):
+        body = ndjson(
+            dict(TEAM, id="team-1"),
+            "",
+            dict(TEAM, id="team-1"),
+            '{"mission": ',
+            {"tasks": "not a list"},
+            dict(TEAM, id="team-2", workflow_type="hierarchical"),
+        )
+        return (await client.post("/api/teams/bulk", content=body)).json()
+    result = run_against_server(scenario)
+
+    assert result["inserted"] == 2
+    assert result["failed"] == 3
+    outcomes = {entry["line"]: entry for entry in result["results"]}
+    assert sorted(outcomes) == [1, 3, 4, 5, 6]
+    assert outcomes[1] == {"line": 1, "success": True, "team_id": "team-1"}
+    assert outcomes[6]["success"]
+    assert "team-1" in outcomes[3]["error"]
+    assert outcomes[4]["error"].startswith("Expecting value")
+    assert outcomes[5]["error"] == "mission: Field required"
+    assert all("\n" not in entry.get("error", "") for entry in result["results"])
+
+
+def test_line_split_across_chunks_is_joined(use_memory_store):
+    async def scenario(client):
+        body = ndjson(dict(TEAM, id="team-1"), dict(TEAM, id="team-2"))
+
+        async def chunks():
+            for start in range(0, len(body), 7):
+                yield body[start:start + 7]
+        return (await client.post("/api/teams/bulk", content=chunks())).json()
+    assert run_against_server(scenario)["inserted"] == 2
+
+
+def test_oversized_line_is_rejected(use_memory_store, monkeypatch):
+    monkeypatch.setattr(server, "BULK_IMPORT_MAX_LINE_BYTES", 100)
+
+    async def scenario(client):
+        return await client.post("/api/teams/bulk", content=ndjson(TEAM))
+    assert run_against_server(scenario).status_code == 413
+
+
+def test_export_round_trips_through_import(use_memory_store):
+    async def export(client) -> str:
+        return (await client.get("/api/teams/export")).text
+
+    async def seed(client):
+        for index in range(3):
+            team_id = (await client.post("/api/teams", json=dict(TEAM, mission={"name": f"Team {index}", "objective": "o"}))).json()["team_id"]
+        await client.patch(f"/api/teams/{team_id}", json={"revision": 0, "workflow_type": "hierarchical"})
+        return await export(client)
+    exported = run_against_server(seed)
+    assert len(exported.splitlines()) == 3
+
+    use_memory_store()
+
+    async def restore(client):
+        result = (await client.post("/api/teams/bulk", content=exported.encode())).json()
+        assert result == {
+            "inserted": 3,
+            "failed": 0,
+            "results": [
+                {"line": line, "success": True, "team_id": json.loads(team)["id"]}
+                for line, team in enumerate(exported.splitlines(), start=1)
+            ],
+        }
+        return await export(client)
+    restored = run_against_server(restore)
+
+    assert [json.loads(line) for line in restored.splitlines()] == [json.loads(line) for line in exported.splitlines()]
+    assert json.loads(restored.splitlines()[0])["revision"] == 1
@@ -0,0 +1,62 @@
+import ast
+
+import pytest
+
+from exporters import CREWAI_TOOLS, get_exporter
+from tools import AVAILABLE_TOOLS, tool_catalog
+
+
+def make_team(selected_tools):
+    return {
+        "id": "team-1",
+        "mission": {"name": "Launch Plan", "objective": "Sell more"},
+        "tasks": [{"id": "t1", "title": "Research", "description": "Find the market", "order": 1}],
+        "agents": [{"id": "a1", "task_id": "t1", "role": "Analyst", "goal": "g", "backstory": "b"}],
+        "selected_tools": selected_tools,
+        "workflow_type": "sequential",
+    }
+
+
+def crew_py(selected_tools) -> str:
+    return get_exporter("crew-py").render(make_team(selected_tools), tool_catalog.class_name).body
+
+
+def imported_tools(source: str) -> list:
+    names = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.ImportFrom) and node.module == "crewai_tools":
+            names += [alias.name for alias in node.names]
+    return names
+
+
+def test_crew_py_imports_only_real_crewai_tools():
+    source = crew_py([tool["id"] for tool in AVAILABLE_TOOLS])
+    compile(source, "crew.py", "exec")
+    names = imported_tools(source)
+    assert names
+    assert set(names) <= CREWAI_TOOLS
+    assert len(names) == len(set(names))
+
+
+@pytest.mark.parametrize("tool_id, imported", [
+    ("file_write", "FileWriterTool"),
+    ("dalle_tool", "DallETool"),
+    ("serper_search", "SerperDevTool"),
+])
+def test_catalog_names_map_to_crewai_classes(tool_id, imported):
+    assert imported_tools(crew_py([tool_id])) == [imported]
+
+
+def test_tools_without_a_crewai_class_are_only_listed():
+    source = crew_py(["slack_tool", "file_write", "jira_tool"])
+    compile(source, "crew.py", "exec")
+    assert imported_tools(source) == ["FileWriterTool"]
+    assert "# Selected tools without a crewai_tools class, not imported: SlackTool, JiraTool" in source
+    assert "tools=self._tools()" in source
+
+
+def test_crew_py_without_tools():
+    source = crew_py(["slack_tool"])
+    compile(source, "crew.py", "exec")
+    assert imported_tools(source) == []
+    assert "tools=" not in source
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from json_stream import IncrementalJSONParser
+
+TEAM = {
+    "tasks": [
+        {"title": "Research", "description": "Look for \"quotes\" and {braces}", "order": 1},
+        {"title": "Write", "description": "Draft, then [review]", "order": 2},
+    ],
+    "agents": [{"task_index": 0, "role": "Analyst", "goal": "g", "backstory": "b"}],
+    "recommended_tools": ["serper_search", "file_read"],
+    "workflow_type": "sequential",
+    "explanation": "Done",
+}
+
+
+def feed_all(text: str, chunk_size: int):
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(text), chunk_size):
+        events += parser.feed(text[start:start + chunk_size])
+    return parser, events
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_events_do_not_depend_on_chunking(chunk_size):
+    parser, events = feed_all(json.dumps(TEAM, indent=2), chunk_size)
+    assert parser.done
+    items = [(key, value) for kind, key, value in events if kind == "item"]
+    fields = {key: value for kind, key, value in events if kind == "field"}
+    assert items == [("tasks", task) for task in TEAM["tasks"]] + [("agents", agent) for agent in TEAM["agents"]]
+    assert fields == TEAM
+
+
+def test_items_arrive_before_the_array_closes():
+    text = json.dumps(TEAM)
+    cut = text.index('{"title": "Write"')
+    parser = IncrementalJSONParser()
+    events = parser.feed(text[:cut])
+    assert events == [("item", "tasks", TEAM["tasks"][0])]
+    assert not parser.done
+
+
+def test_skips_fence_and_tolerates_trailing_commas():
+    text = '```json\n{"tasks": [{"title": "A", "description": "d", "order": 1,},], "explanation": "x",}\n```'
+    parser, events = feed_all(text, 4)
+    assert parser.done
+    assert ("item", "tasks", {"title": "A", "description": "d", "order": 1}) in events
+    assert ("field", "explanation", "x") in events
+
+
+def test_ignores_input_after_the_object():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"a": 1} trailing chatter {"b": 2}')
+    assert events == [("field", "a", 1)]
+    assert parser.done
+    assert parser.feed('{"c": 3}') == []
+
+
+def test_truncated_stream_is_not_done():
+    parser, events = feed_all(json.dumps(TEAM)[:-20], 5)
+    assert not parser.done
+    assert ("field", "explanation", "Done") not in events
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_malformed_item_is_reported_and_parsing_continues(chunk_size):
+    text = '{"tasks": [{"title": "a", oops}, {"title": "b"}], "explanation": "x"}'
+    parser, events = feed_all(text, chunk_size)
+    assert parser.done
+    assert events == [
+        ("invalid_item", "tasks", '{"title": "a", oops}'),
+        ("item", "tasks", {"title": "b"}),
+        ("invalid_field", "tasks", '[{"title": "a", oops}, {"title": "b"}]'),
+        ("field", "explanation", "x"),
+    ]
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from llm_json import (
+    LLMJSONError,
+    PersonaConfig,
+    TeamConfig,
+    extract_json_object,
+    loads_tolerant,
+    parse_llm_json,
+    repair_json,
+    strip_code_fences,
+    strip_trailing_commas,
+)
+
+TEAM = {
+    "tasks": [
+        {"title": "Research", "description": "Find the market", "order": 1},
+        {"title": "Write", "description": "Draft the plan", "order": 2},
+    ],
+    "agents": [
+        {"task_index": 0, "role": "Analyst", "goal": "Understand", "backstory": "Years of research"},
+        {"task_index": 1, "role": "Writer", "goal": "Explain", "backstory": "Former journalist"},
+    ],
+    "recommended_tools": ["serper_search"],
+    "workflow_type": "sequential",
+    "explanation": "Research first, then write",
+}
+
+
+def test_strip_code_fences():
+    assert strip_code_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert strip_code_fences('```\n{"a": 1}') == '{"a": 1}'
+    assert strip_code_fences('{"a": 1}') == '{"a": 1}'
+
+
+def test_extract_json_object_drops_chatter():
+    text = 'Sure! Here it is: {"a": {"b": "}"}} Hope that helps.'
+    assert extract_json_object(text) == '{"a": {"b": "}"}}'
+
+
+def test_extract_json_object_without_object():
+    with pytest.raises(LLMJSONError):
+        extract_json_object("no json here")
+
+
+def test_strip_trailing_commas_outside_strings_only():
+    assert json.loads(strip_trailing_commas('{"a": [1, 2, ], "b": "x, ]",}')) == {"a": [1, 2], "b": "x, ]"}
+
+
+# A member is only kept once a comma or closing bracket shows it is complete
+# ("2" could have been the start of "25")
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2', {"a": [1]}),
+    ('{"a": [1, 2,', {"a": [1, 2]}),
+    ('{"a": "unfinished', {}),
+    ('{"a": 1, "b": {"c": "d"', {"a": 1, "b": {}}),
+    ('{"a": 1, "b": {"c": ', {"a": 1, "b": {}}),
+    ('{"a": [{"x": 1}, {"x": 2', {"a": [{"x": 1}, {}]}),
+    ('{"a": "brace } in string", "b": [', {"a": "brace } in string", "b": []}),
+])
+def test_repair_json_closes_truncated_objects(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_loads_tolerant_reports_repairs():
+    assert loads_tolerant('{"a": 1}') == ({"a": 1}, False)
+    assert loads_tolerant('{"a": [1,]}') == ({"a": [1]}, True)
+
+
+def test_parse_llm_json_clean_output():
+    team, repaired = parse_llm_json(json.dumps(TEAM), TeamConfig)
+    assert not repaired
+    assert team.model_dump() == TEAM
+
+
+def test_parse_llm_json_fenced_with_chatter():
+    text = "Here is your team:\n```json\n" + json.dumps(TEAM, indent=2) + "\n```\nLet me know!"
+    team, _ = parse_llm_json(text, TeamConfig)
+    assert [task.title for task in team.tasks] == ["Research", "Write"]
+
+
+def test_parse_llm_json_truncated_drops_unfinished_agent():
+    text = json.dumps(TEAM)
+    cut = text.index('"role": "Writer"') + len('"role": "Writer"')
+    team, repaired = parse_llm_json(text[:cut], TeamConfig)
+    assert repaired
+    assert [agent.role for agent in team.agents] == ["Analyst"]
+    # Fields never reached take the schema defaults
+    assert team.recommended_tools == []
+    assert team.workflow_type == "sequential"
+
+
+def test_parse_llm_json_drops_invalid_items():
+    data = dict(TEAM, tasks=TEAM["tasks"] + [{"title": "No description"}])
+    team, repaired = parse_llm_json(json.dumps(data), TeamConfig)
+    assert repaired
+    assert len(team.tasks) == 2
+
+
+def test_parse_llm_json_rejects_unusable_output():
+    with pytest.raises(LLMJSONError):
+        parse_llm_json('{"goal": "only a goal"}', PersonaConfig)
+    with pytest.raises(LLMJSONError):
+        parse_llm_json('["not", "an", "object"]', PersonaConfig)
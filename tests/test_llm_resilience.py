@@ -0,0 +1,142 @@
+import pytest
+
+import llm_resilience
+from llm_resilience import CircuitBreaker, RateLimiter, RetryPolicy, TokenBucket, is_outage, is_transient, retry_after_seconds
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock)
+    return clock
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, transient, outage", [
+    (StatusError(429), True, False),
+    (StatusError(503), True, True),
+    (StatusError(500), True, True),
+    (StatusError(400), False, False),
+    (StatusError(401), False, False),
+    (StatusError(409), False, False),
+    (APIConnectionError(), True, True),
+    (ValueError(), False, False),
+])
+def test_error_classification(error, transient, outage):
+    assert is_transient(error) is transient
+    assert is_outage(error) is outage
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(StatusError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(StatusError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(StatusError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(StatusError(429)) is None
+
+
+def test_retry_policy_backoff_is_capped_and_bounded():
+    policy = RetryPolicy(max_retries=3, base_delay=0.5, max_delay=1.0)
+    for attempt in range(3):
+        delay = policy.delay(attempt, StatusError(503))
+        assert 0 <= delay <= min(1.0, 0.5 * 2 ** attempt)
+    assert policy.delay(3, StatusError(503)) is None
+    assert policy.delay(0, StatusError(400)) is None
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(max_retries=2, base_delay=0.01, max_retry_after=10)
+    assert policy.delay(0, StatusError(429, {"retry-after": "5"})) == 5.0
+    assert policy.delay(0, StatusError(429, {"retry-after": "60"})) is None
+
+
+def test_token_bucket_allows_burst_then_queues():
+    bucket = TokenBucket(rate=2.0, capacity=2, now=0.0)
+    assert bucket.reserve(0.0, max_wait=1.0) == 0.0
+    assert bucket.reserve(0.0, max_wait=1.0) == 0.0
+    # Each further caller reserves the next free slot
+    assert bucket.reserve(0.0, max_wait=1.0) == pytest.approx(0.5)
+    assert bucket.reserve(0.0, max_wait=1.0) == pytest.approx(1.0)
+    assert bucket.reserve(0.0, max_wait=1.0) is None
+    assert bucket.reserve(2.0, max_wait=1.0) == pytest.approx(0.0)
+
+
+def test_rate_limiter_keys_are_independent_and_evicted(clock):
+    limiter = RateLimiter(rate=1.0, burst=1, max_wait=0.0, max_keys=2)
+    assert limiter.reserve("a") == 0.0
+    assert limiter.reserve("a") is None
+    assert limiter.reserve("b") == 0.0
+    limiter.reserve("c")
+    # "a" was least recently used and starts over with a full bucket
+    assert limiter.reserve("a") == 0.0
+
+
+def test_disabled_rate_limiter_never_waits():
+    limiter = RateLimiter(rate=0, burst=1, max_wait=0.0)
+    assert not limiter.enabled
+    assert all(limiter.reserve("a") == 0.0 for _ in range(10))
+
+
+def test_circuit_breaker_opens_probes_and_closes(clock):
+    states = []
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=10, on_state_change=states.append)
+    assert breaker.check() is None
+    breaker.record_failure()
+    assert breaker.check() is None
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.check() == pytest.approx(10)
+
+    clock.now += 10
+    assert breaker.check() is None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert breaker.check() == pytest.approx(10)
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert states == ["open", "half_open", "closed"]
+
+
+def test_circuit_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.check() is None
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.check() == pytest.approx(5)
+
+
+def test_circuit_breaker_replaces_a_lost_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.check() is None
+    # The probe never reports back
+    clock.now += 5
+    assert breaker.check() is None
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=5)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+import metrics
+import server
+from metrics import CallbackMetric, Counter, Gauge, Histogram, Metric, Registry
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = Counter("errors_total", "Errors by reason", ("reason",), registry=registry)
+    counter.labels('bad "quote"\\path\nnext').inc()
+    assert 'errors_total{reason="bad \\"quote\\"\\\\path\\nnext"} 1' in registry.render().splitlines()
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels("/a").observe(value)
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_gauges_and_callback_metrics():
+    registry = Registry()
+    gauge = Gauge("in_flight", "In flight", registry=registry)
+    gauge.inc(3)
+    gauge.dec()
+    CallbackMetric("entries", "Entries", "gauge", ("cache",), lambda: [(("teams",), 2.5)], registry=registry)
+    lines = registry.render().splitlines()
+    assert "in_flight 2" in lines
+    assert "# TYPE entries gauge" in lines
+    assert 'entries{cache="teams"} 2.5' in lines
+
+
+def test_registry_rejects_duplicates_and_wrong_label_counts():
+    registry = Registry()
+    counter = Counter("calls_total", "Calls", ("kind",), registry=registry)
+    with pytest.raises(ValueError):
+        Counter("calls_total", "Calls", registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels("a", "b")
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("base", "Base", registry=Registry())
+
+
+def test_metrics_endpoint_exposition(monkeypatch):
+    monkeypatch.setattr(metrics.REGISTRY, "metrics", list(metrics.REGISTRY.metrics))
+    Counter("test_escaped_total", "Escaping check", ("value",)).labels('say "hi"\n').inc(2)
+    Histogram("test_duration_seconds", "Histogram check", buckets=(1.0,)).observe(0.5)
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/api/")
+            return await client.get("/metrics")
+    response = asyncio.run(run())
+
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert 'test_escaped_total{value="say \\"hi\\"\\n"} 2' in lines
+    assert 'test_duration_seconds_bucket{le="1"} 1' in lines
+    assert 'test_duration_seconds_bucket{le="+Inf"} 1' in lines
+    assert "test_duration_seconds_sum 0.5" in lines
+    assert "test_duration_seconds_count 1" in lines
+    assert any(line.startswith('http_requests_total{method="GET",route="/api/",status="200"}') for line in lines)
+    assert any(line.startswith('http_request_duration_seconds_count{method="GET",route="/api/"}') for line in lines)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from mission_classifier import KeywordMatcher, MissionClassifier, load_mission_classifier
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher({
+        "content": {"content": 2, "blog*": 1},
+        "customers": {"customer": 2, "customer service": 2, "landing page*": 1},
+        "growth": {"optimi*": 1, "e-commerce": 2},
+    })
+
+
+def test_keywords_match_whole_words_only(matcher):
+    assert matcher.match("Our customers are discontent") == set()
+    assert matcher.match("Content, mostly.") == {"content"}
+
+
+def test_prefix_keywords(matcher):
+    assert matcher.match("Blogging and optimization") == {"blog*", "optimi*"}
+    assert matcher.match("we optimise") == {"optimi*"}
+    assert matcher.match("the opt") == set()
+
+
+def test_phrases_and_overlapping_keywords(matcher):
+    assert matcher.match("Customer   service is slow") == {"customer", "customer service"}
+    assert matcher.match("customer, service") == {"customer", "customer service"}
+    assert matcher.match("our landing pages convert") == {"landing page*"}
+    assert matcher.match("a landing strip") == set()
+
+
+def test_hyphenated_words_stay_whole(matcher):
+    assert matcher.match("Our E-Commerce store") == {"e-commerce"}
+    assert matcher.match("e commerce") == set()
+
+
+def test_empty_keyword_is_rejected():
+    with pytest.raises(ValueError):
+        KeywordMatcher({"broken": {"*": 1}})
+
+
+def test_same_keyword_scores_every_category():
+    classifier = MissionClassifier({
+        "missions": {"Website": {"website*": 2}},
+        "readiness": {"context": {"threshold": 1, "keywords": {"website*": 1}}},
+    })
+    scores = {}
+    classifier.add_scores(scores, classifier.match("our websites"))
+    assert scores == {"Website": 2.0, "context": 1.0}
+
+
+def test_mission_ties_go_to_the_first_listed():
+    classifier = MissionClassifier({"missions": {"First": {"alpha": 1}, "Second": {"beta": 1}}, "default_mission": "Fallback"})
+    assert classifier.mission_name({}) == "Fallback"
+    assert classifier.mission_name({"First": 1.0, "Second": 1.0}) == "First"
+    assert classifier.mission_name({"First": 1.0, "Second": 2.0}) == "Second"
+
+
+def test_classifier_requires_missions():
+    with pytest.raises(ValueError):
+        MissionClassifier({"readiness": {}})
+
+
+def test_default_keywords_classify_an_utterance():
+    classifier = load_mission_classifier()
+    scores = {}
+    classifier.add_scores(scores, classifier.match("We want to boost sales for our company's new product line"))
+    assert classifier.mission_name(scores) == "Sales Growth Initiative"
+    assert classifier.readiness(scores) == {"business_goal": True, "specific_context": True}
+
+    scores = {}
+    classifier.add_scores(scores, classifier.match("hello there"))
+    assert classifier.mission_name(scores) == classifier.default_mission
+    assert not any(classifier.readiness(scores).values())
+
+
+def test_keywords_file_can_be_overridden(tmp_path, monkeypatch):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({"missions": {"Only": {"thing": 1}}, "min_user_turns": 3}))
+    monkeypatch.setenv("VOICE_KEYWORDS_FILE", str(path))
+    classifier = load_mission_classifier()
+    assert classifier.missions == ["Only"]
+    assert classifier.min_user_turns == 3
@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+
+import server
+from models import PersonaResponse
+
+
+def test_duplicate_batch_items_do_not_hold_concurrency_slots(monkeypatch):
+    calls = []
+    running = []
+
+    async def request_persona(request, api_key):
+        calls.append(request.role)
+        running.append(request.role)
+        assert len(running) <= 2
+        await asyncio.sleep(0.02)
+        running.remove(request.role)
+        return PersonaResponse(goal=f"{request.role} goal", backstory="b")
+    monkeypatch.setattr(server, "request_persona", request_persona)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def run():
+        # Waiting duplicates holding slots would start Writer again once the first call ends
+        monkeypatch.setattr(server, "persona_batch_semaphore", asyncio.Semaphore(2))
+        items = [{"role": "Writer", "task_description": "t"}] * 5 + [{"role": "Analyst", "task_description": "t"}]
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/generate-personas", json={"items": items})
+        return response.json()["results"]
+    results = asyncio.run(run())
+
+    assert sorted(calls) == ["Analyst", "Writer"]
+    assert [result["index"] for result in results] == list(range(6))
+    assert [result["persona"]["goal"] for result in results] == ["Writer goal"] * 5 + ["Analyst goal"]
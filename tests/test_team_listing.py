@@ -0,0 +1,92 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import server
+import team_store
+
+BASE = datetime(2024, 1, 1, 12, 0, 0, 123000)
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        inner = team_store.MemoryTeamStore()
+    elif request.param == "sqlite":
+        inner = team_store.SQLiteTeamStore(str(tmp_path / "teams.db"))
+    else:
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        inner = team_store.MotorTeamStore(database=mongomock_motor.AsyncMongoMockClient()["test"])
+    store = team_store.MeteredTeamStore(inner)
+    monkeypatch.setattr(server, "team_store", store)
+    return store
+
+
+def make_team(index: int) -> dict:
+    # Groups of three share a created_at, so pages split inside ties
+    return {
+        "id": f"team-{index:02d}",
+        "created_at": BASE + timedelta(seconds=index // 3),
+        "mission": {"name": f"Team {index}", "objective": "o"},
+        "tasks": [],
+        "agents": [],
+        "selected_tools": ["serper_search"] if index % 2 else [],
+        "workflow_type": "sequential",
+        "revision": 0,
+    }
+
+
+def run_against_server(store, scenario):
+    async def run():
+        await store.insert_teams([make_team(index) for index in range(11)])
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+    return asyncio.run(run())
+
+
+async def walk(client: httpx.AsyncClient, **params) -> list:
+    pages, cursor = [], None
+    while True:
+        response = await client.get("/api/teams", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([team["id"] for team in body["teams"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4, 11, 100])
+def test_pages_cover_every_team_once_newest_first(store, limit):
+    pages = run_against_server(store, lambda client: walk(client, limit=limit, fields="mission"))
+    expected = [team["id"] for team in sorted(map(make_team, range(11)), key=lambda team: (team["created_at"], team["id"]), reverse=True)]
+    assert [team_id for page in pages for team_id in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+
+def test_pages_with_a_filter(store):
+    pages = run_against_server(store, lambda client: walk(client, limit=2, tools="serper_search"))
+    assert [team_id for page in pages for team_id in page] == [f"team-{index:02d}" for index in (9, 7, 5, 3, 1)]
+
+
+def test_fields_limit_the_projection(store):
+    async def scenario(client):
+        return (await client.get("/api/teams", params={"limit": 1, "fields": "workflow_type"})).json()["teams"][0]
+    assert set(run_against_server(store, scenario)) == {"id", "created_at", "workflow_type"}
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"cursor": base64.urlsafe_b64encode(b'{"id": "team-01"}').decode()},
+    {"cursor": base64.urlsafe_b64encode(b'{"created_at": "yesterday", "id": "x"}').decode()},
+    {"fields": "mission,secret"},
+])
+def test_bad_cursor_or_fields_is_400(store, params):
+    async def scenario(client):
+        return await client.get("/api/teams", params=params)
+    assert run_against_server(store, scenario).status_code == 400
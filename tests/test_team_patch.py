@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import server
+import team_store
+from server import build_team_patch, team_patch_projection
+
+TEAM = {
+    "revision": 0,
+    "mission": {"name": "Launch", "objective": "Sell more", "description": None},
+    "tasks": [
+        {"id": "t1", "title": "Research", "description": "Find the market", "order": 1},
+        {"id": "t2", "title": "Write", "description": "Draft the plan", "order": 2},
+    ],
+    "agents": [{"id": "a1", "task_id": "t1", "role": "Analyst", "goal": "g", "backstory": "b"}],
+    "selected_tools": ["serper_search"],
+    "workflow_type": "sequential",
+}
+
+
+def test_patch_sets_changed_fields_by_position_and_diffs_by_id():
+    updates, changes = build_team_patch(TEAM, {
+        "mission": {"name": "Launch", "objective": "Sell much more"},
+        "tasks": [{"id": "t2", "title": "Write up", "order": 2}],
+        "agents": [{"id": "a1", "task_id": "t2"}],
+        "workflow_type": "hierarchical",
+    })
+    assert updates == {
+        "mission.objective": "Sell much more",
+        "tasks.1.title": "Write up",
+        "agents.0.task_id": "t2",
+        "workflow_type": "hierarchical",
+    }
+    assert changes == [
+        {"path": ["mission", "objective"], "old": "Sell more", "new": "Sell much more"},
+        {"path": ["tasks", "t2", "title"], "old": "Write", "new": "Write up"},
+        {"path": ["agents", "a1", "task_id"], "old": "t1", "new": "t2"},
+        {"path": ["workflow_type"], "old": "sequential", "new": "hierarchical"},
+    ]
+
+
+def test_patch_without_differences_changes_nothing():
+    assert build_team_patch(TEAM, {"tasks": [{"id": "t1", "title": "Research"}], "selected_tools": ["serper_search"]}) == ({}, [])
+
+
+@pytest.mark.parametrize("patch, detail", [
+    ({"tasks": [{"id": "t9", "title": "x"}]}, "Unknown task id: t9"),
+    ({"agents": [{"id": "a9", "role": "x"}]}, "Unknown agent id: a9"),
+    ({"agents": [{"id": "a1", "task_id": "t9"}]}, "Unknown task id: t9"),
+    ({"mission": {"name": None}}, "mission.name cannot be null"),
+])
+def test_invalid_patches_are_rejected(patch, detail):
+    with pytest.raises(HTTPException) as excinfo:
+        build_team_patch(TEAM, patch)
+    assert excinfo.value.status_code == 422
+    assert excinfo.value.detail == detail
+
+
+def test_mission_description_may_be_cleared():
+    team = dict(TEAM, mission=dict(TEAM["mission"], description="Old"))
+    assert build_team_patch(team, {"mission": {"description": None}})[0] == {"mission.description": None}
+
+
+def test_projection_reads_task_ids_for_agent_moves():
+    projection = team_patch_projection({"agents": [{"id": "a1", "task_id": "t2"}]})
+    assert projection == {"_id": 0, "revision": 1, "agents.id": 1, "agents.task_id": 1, "tasks.id": 1}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = team_store.MeteredTeamStore(team_store.MemoryTeamStore())
+    monkeypatch.setattr(server, "team_store", store)
+    return store
+
+
+async def create_team(client: httpx.AsyncClient) -> dict:
+    response = await client.post("/api/teams", json={
+        "mission": {"name": "Launch", "objective": "Sell more"},
+        "tasks": [{"title": "Research", "description": "Find the market", "order": 1}],
+        "agents": [],
+        "selected_tools": [],
+        "workflow_type": "sequential",
+    })
+    team_id = response.json()["team_id"]
+    return (await client.get(f"/api/teams/{team_id}")).json()
+
+
+def run_against_server(scenario):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await scenario(client)
+    asyncio.run(run())
+
+
+def test_stale_revision_is_rejected_with_the_current_one(store):
+    async def scenario(client):
+        team = await create_team(client)
+        url = f"/api/teams/{team['id']}"
+        task_id = team["tasks"][0]["id"]
+
+        response = await client.patch(url, json={"revision": 0, "tasks": [{"id": task_id, "title": "Survey"}]})
+        assert response.status_code == 200
+        assert response.json()["revision"] == 1
+        assert response.json()["changes"] == [{"path": ["tasks", task_id, "title"], "old": "Research", "new": "Survey"}]
+
+        response = await client.patch(url, json={"revision": 0, "tasks": [{"id": task_id, "title": "Lost update"}]})
+        assert response.status_code == 409
+        assert response.json()["detail"] == {"message": "Team was modified", "revision": 1}
+
+        team = (await client.get(url)).json()
+        assert team["tasks"][0]["title"] == "Survey"
+        revisions = (await client.get(f"{url}/revisions")).json()["revisions"]
+        assert [revision["revision"] for revision in revisions] == [1]
+    run_against_server(scenario)
+
+
+def test_no_op_patch_keeps_the_revision(store):
+    async def scenario(client):
+        team = await create_team(client)
+        response = await client.patch(f"/api/teams/{team['id']}", json={"revision": 0, "workflow_type": "sequential"})
+        assert response.json() == {"success": True, "team_id": team["id"], "revision": 0, "changes": []}
+        assert (await client.get(f"/api/teams/{team['id']}/revisions")).json()["revisions"] == []
+    run_against_server(scenario)
+
+
+def test_failed_history_write_still_reports_the_update(store, monkeypatch):
+    async def add_revision(revision):
+        raise RuntimeError("history unavailable")
+    monkeypatch.setattr(store.inner, "add_revision", add_revision)
+
+    async def scenario(client):
+        team = await create_team(client)
+        response = await client.patch(f"/api/teams/{team['id']}", json={"revision": 0, "workflow_type": "hierarchical"})
+        assert response.status_code == 200
+        assert response.json()["revision"] == 1
+    run_against_server(scenario)
+
+
+def test_patch_of_missing_team_is_404(store):
+    async def scenario(client):
+        response = await client.patch("/api/teams/missing", json={"revision": 0, "workflow_type": "hierarchical"})
+        assert response.status_code == 404
+    run_against_server(scenario)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+
+import httpx
+import pytest
+
+import llm_client
+import server
+import team_store
+from artifacts import ArtifactCache
+
+TEAM = {
+    "mission": {"name": "Launch", "objective": "Sell more"},
+    "tasks": [{"title": "Research", "description": "Find the market", "order": 1}],
+    "agents": [],
+    "selected_tools": [],
+    "workflow_type": "sequential",
+}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = team_store.MemoryTeamStore()
+    monkeypatch.setattr(server, "team_store", team_store.MeteredTeamStore(store))
+    monkeypatch.setattr(server, "artifact_cache", ArtifactCache(ttl_seconds=0))
+    return store
+
+
+def run_pipeline(body: dict, after=None):
+    """POST /api/team-pipeline, then let background writes finish and call ``after``"""
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/team-pipeline", json=body)
+            pending = len(server.pending_team_writes)
+            await asyncio.gather(*server.pending_team_writes, return_exceptions=True)
+            return response, pending, await after(client, response.json()["team_id"]) if after else None
+    return asyncio.run(run())
+
+
+async def read_back(client, team_id):
+    team = await client.get(f"/api/teams/{team_id}")
+    yaml = await client.get(f"/api/teams/{team_id}/yaml")
+    return team.status_code, yaml.status_code
+
+
+def test_sync_durability_writes_before_responding(store):
+    response, pending, read = run_pipeline({"team": TEAM}, read_back)
+    body = response.json()
+    assert response.status_code == 200
+    assert body["persisted"] is True
+    assert "Launch" in body["yaml"]
+    assert response.headers["etag"].startswith('"0-')
+    assert pending == 0
+    assert read == (200, 200)
+
+
+def test_async_durability_writes_in_the_background(store):
+    response, pending, read = run_pipeline({"team": TEAM, "durability": "async"}, read_back)
+    assert response.status_code == 200
+    assert response.json()["persisted"] is False
+    assert pending == 1
+    assert read == (200, 200)
+    assert not server.pending_team_writes
+
+
+def test_failed_background_write_is_logged_and_not_served(store, monkeypatch, caplog):
+    async def insert_team(team):
+        raise RuntimeError("store down")
+    monkeypatch.setattr(store, "insert_team", insert_team)
+
+    with caplog.at_level(logging.ERROR, logger=server.logger.name):
+        response, _, read = run_pipeline({"team": TEAM, "durability": "async"}, read_back)
+    team_id = response.json()["team_id"]
+    assert response.json()["persisted"] is False
+    assert any(f"Error saving team {team_id} in background: store down" in record.getMessage() for record in caplog.records)
+    # The render cached for the unsaved team is dropped
+    assert read == (404, 404)
+
+
+def test_failed_sync_write_is_an_error(store, monkeypatch):
+    async def insert_team(team):
+        raise RuntimeError("store down")
+    monkeypatch.setattr(store, "insert_team", insert_team)
+    response, _, _ = run_pipeline({"team": TEAM})
+    assert response.status_code == 500
+
+
+def test_generated_team_is_saved(store, monkeypatch):
+    config = {
+        "tasks": [{"title": "Research", "description": "Find the market", "order": 1}],
+        "agents": [{"task_index": 0, "role": "Analyst", "goal": "g", "backstory": "b"}],
+        "recommended_tools": ["serper_search"],
+        "workflow_type": "sequential",
+        "explanation": "",
+    }
+
+    async def chat_completion(api_key, messages, **kwargs):
+        return json.dumps(config)
+    monkeypatch.setattr(llm_client, "chat_completion", chat_completion)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    generate = {"mission_name": "Pipeline test", "mission_objective": "o"}
+    response, _, read = run_pipeline({"generate": generate}, read_back)
+    body = response.json()
+    assert body["persisted"] is True
+    assert [agent["role"] for agent in body["team"]["agents"]] == ["Analyst"]
+    assert read == (200, 200)
+
+
+def test_team_and_generate_are_exclusive(store):
+    response, _, _ = run_pipeline({})
+    assert response.status_code == 422
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+import llm_client
+import team_service
+from models import IntelligentTeamRequest
+from team_service import TeamGenerationError, streamed_team_parts
+
+REQUEST = IntelligentTeamRequest(mission_name="Launch", mission_objective="Sell more")
+
+
+def stream_of(text: str, chunk_size: int = 7):
+    async def stream_chat_completion(api_key, messages, **kwargs):
+        for start in range(0, len(text), chunk_size):
+            yield text[start:start + chunk_size]
+    return stream_chat_completion
+
+
+def collect(monkeypatch, config) -> list:
+    text = config if isinstance(config, str) else json.dumps(config)
+    monkeypatch.setattr(llm_client, "stream_chat_completion", stream_of(text))
+
+    async def run():
+        return [part async for part in streamed_team_parts(REQUEST, "sk-test")]
+    return asyncio.run(run())
+
+
+def test_invalid_items_are_dropped_and_missing_fields_defaulted(monkeypatch):
+    parts = collect(monkeypatch, {
+        "tasks": [{"title": "A", "description": "a", "order": 1}, {"title": "no description"}],
+        "agents": [{"role": "R", "goal": "g", "backstory": "b"}, {"role": "no goal"}],
+    })
+    items = [(key, value) for kind, key, value in parts if kind == "item"]
+    fields = {key: value for kind, key, value in parts if kind == "field"}
+    assert items == [
+        ("tasks", {"title": "A", "description": "a", "order": 1}),
+        ("agents", {"task_index": 0, "role": "R", "goal": "g", "backstory": "b"}),
+    ]
+    assert fields == {
+        "tasks": [{"title": "A", "description": "a", "order": 1}],
+        "agents": [{"task_index": 0, "role": "R", "goal": "g", "backstory": "b"}],
+        "recommended_tools": [],
+        "workflow_type": "sequential",
+        "explanation": "",
+    }
+
+
+def test_invalid_fields_take_defaults(monkeypatch):
+    parts = collect(monkeypatch, {
+        "tasks": [{"title": "A", "description": "a", "order": 1}],
+        "agents": [],
+        "recommended_tools": "serper_search",
+        "workflow_type": "parallel",
+        "explanation": "why",
+    })
+    fields = {key: value for kind, key, value in parts if kind == "field"}
+    assert fields["recommended_tools"] == []
+    assert fields["workflow_type"] == "sequential"
+    assert fields["explanation"] == "why"
+
+
+def test_cut_off_stream_is_completed_from_a_local_repair(monkeypatch):
+    text = json.dumps({
+        "tasks": [{"title": "A", "description": "a", "order": 1}, {"title": "B", "description": "b", "order": 2}],
+        "agents": [{"task_index": 0, "role": "R", "goal": "g", "backstory": "b"}],
+        "explanation": "cut here",
+    })
+    parts = collect(monkeypatch, text[:text.index('"explanation"')])
+    tasks = [value for kind, key, value in parts if kind == "item" and key == "tasks"]
+    fields = {key: value for kind, key, value in parts if kind == "field"}
+    assert [task["title"] for task in tasks] == ["A", "B"]
+    assert fields["workflow_type"] == "sequential"
+
+
+def test_stream_without_usable_tasks_fails(monkeypatch):
+    with pytest.raises(TeamGenerationError):
+        collect(monkeypatch, {"tasks": [{"title": "only a title"}], "agents": []})
+
+
+def test_flights_are_not_shared_across_api_keys(monkeypatch):
+    calls = []
+
+    async def request_team_config(request, api_key):
+        calls.append(api_key)
+        await asyncio.sleep(0.01)
+        return {
+            "tasks": [{"title": "A", "description": "a", "order": 1}],
+            "agents": [{"task_index": 0, "role": "R", "goal": "g", "backstory": "b"}],
+            "recommended_tools": [],
+            "workflow_type": "sequential",
+            "explanation": "",
+        }
+    monkeypatch.setattr(team_service, "request_team_config", request_team_config)
+
+    def request(api_key):
+        return IntelligentTeamRequest(mission_name="Shared", mission_objective="o", use_emergent_key=False, openai_api_key=api_key)
+
+    async def run():
+        await asyncio.gather(*[
+            team_service.resolve_team_config(request(key), may_read=False, may_store=False)
+            for key in ("sk-a", "sk-b", "sk-a")
+        ])
+    asyncio.run(run())
+    assert sorted(calls) == ["sk-a", "sk-b"]
+
+
+def test_malformed_item_mid_stream_is_dropped(monkeypatch):
+    text = (
+        '{"tasks": [{"title": "A", "description": "a", "order": 1}, {"title": "broken", oops},'
+        ' {"title": "B", "description": "b", "order": 2}],'
+        ' "agents": [], "workflow_type": "hierarchical", "explanation": "why"}'
+    )
+    parts = collect(monkeypatch, text)
+    tasks = [value["title"] for kind, key, value in parts if kind == "item" and key == "tasks"]
+    fields = {key: value for kind, key, value in parts if kind == "field"}
+    assert tasks == ["A", "B"]
+    assert [task["title"] for task in fields["tasks"]] == ["A", "B"]
+    assert fields["workflow_type"] == "hierarchical"
+    assert fields["explanation"] == "why"
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import team_store
+from team_store import MemoryTeamStore, SQLiteTeamStore, TeamStore
+
+BASE = datetime(2024, 1, 1)
+
+
+def make_team(index: int, created_at: datetime, **fields) -> dict:
+    team = {
+        "id": f"team-{index:02d}",
+        "created_at": created_at,
+        "workflow_type": "sequential",
+        "selected_tools": [],
+        "revision": 0,
+    }
+    team.update(fields)
+    return team
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryTeamStore()
+    if request.param == "sqlite":
+        return SQLiteTeamStore(str(tmp_path / "teams.db"))
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return team_store.MotorTeamStore(database=mongomock_motor.AsyncMongoMockClient()["test"])
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def listing(store: TeamStore, **kwargs) -> list:
+    return [team["id"] async for team in store.iter_teams(**kwargs)]
+
+
+async def seed(store: TeamStore) -> list:
+    # Pairs of teams share a created_at so ties are broken by id
+    teams = [make_team(index, BASE + timedelta(minutes=index // 2)) for index in range(10)]
+    assert await store.insert_teams(teams) == {}
+    return sorted(teams, key=lambda team: (team["created_at"], team["id"]), reverse=True)
+
+
+def test_listing_is_newest_first_with_ties_by_id(store):
+    async def scenario():
+        expected = await seed(store)
+        assert await listing(store) == [team["id"] for team in expected]
+    run(scenario())
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 100])
+def test_keyset_pages_cover_every_team_once(store, batch_size):
+    async def scenario():
+        expected = [team["id"] for team in await seed(store)]
+        seen, after = [], None
+        while True:
+            page = [team async for team in store.iter_teams(after=after, limit=4, batch_size=batch_size)]
+            seen += [team["id"] for team in page]
+            if len(page) < 4:
+                break
+            after = (page[-1]["created_at"], page[-1]["id"])
+        assert seen == expected
+    run(scenario())
+
+
+def test_after_cursor_inside_a_tie(store):
+    async def scenario():
+        expected = await seed(store)
+        cursor = expected[2]
+        assert cursor["created_at"] == expected[3]["created_at"]
+        after = (cursor["created_at"], cursor["id"])
+        assert await listing(store, after=after, limit=2) == [team["id"] for team in expected[3:5]]
+    run(scenario())
+
+
+def test_listing_filters(store):
+    async def scenario():
+        await store.insert_teams([
+            make_team(1, BASE, selected_tools=["serper_search", "file_read"]),
+            make_team(2, BASE + timedelta(minutes=1), selected_tools=["serper_search"], workflow_type="hierarchical"),
+            make_team(3, BASE + timedelta(minutes=2)),
+        ])
+        assert await listing(store, tools=["serper_search"]) == ["team-02", "team-01"]
+        assert await listing(store, tools=["serper_search", "file_read"]) == ["team-01"]
+        assert await listing(store, workflow_type="hierarchical") == ["team-02"]
+    run(scenario())
+
+
+def test_duplicate_ids_are_reported_per_index(store):
+    async def scenario():
+        # Mongo enforces unique ids through the index its migrations create
+        await store.migrate()
+        failed = await store.insert_teams([make_team(1, BASE), make_team(2, BASE), make_team(1, BASE)])
+        assert list(failed) == [2]
+        assert await listing(store) == ["team-02", "team-01"]
+    run(scenario())
+
+
+def test_update_team_checks_the_revision(store):
+    async def scenario():
+        await store.insert_team(make_team(1, BASE, name="Old"))
+        assert not await store.update_team("team-01", 1, {"name": "Stale", "revision": 2})
+        assert await store.update_team("team-01", 0, {"name": "New", "revision": 1})
+        assert not await store.update_team("team-01", 0, {"name": "Lost", "revision": 1})
+        assert not await store.update_team("missing", 0, {"revision": 1})
+        team = await store.get_team("team-01", {"_id": 0, "name": 1, "revision": 1})
+        assert team == {"name": "New", "revision": 1}
+    run(scenario())
+
+
+def test_revisions_are_listed_newest_first(store):
+    async def scenario():
+        for revision in (1, 2, 3):
+            await store.add_revision({"team_id": "team-01", "revision": revision, "created_at": BASE})
+        await store.add_revision({"team_id": "team-02", "revision": 1, "created_at": BASE})
+        revisions = await store.list_revisions("team-01", limit=2)
+        assert [revision["revision"] for revision in revisions] == [3, 2]
+    run(scenario())
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        TeamStore()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        team_store.create_team_store("redis")
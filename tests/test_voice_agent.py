@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("livekit.agents")
+pytest.importorskip("livekit.plugins.deepgram")
+
+import voice_agent  # noqa: E402
+
+
+class FakeJobContext:
+    def __init__(self):
+        self.shutdown_callbacks = []
+
+    def add_shutdown_callback(self, callback):
+        self.shutdown_callbacks.append(callback)
+
+    async def shutdown(self):
+        for callback in self.shutdown_callbacks:
+            await callback()
+
+
+def test_shared_http_session_is_closed_by_the_last_job(monkeypatch):
+    monkeypatch.setattr(voice_agent, "_http_session", None)
+    monkeypatch.setattr(voice_agent, "_active_jobs", 0)
+
+    async def run():
+        first, second = FakeJobContext(), FakeJobContext()
+        voice_agent.track_job(first)
+        voice_agent.track_job(second)
+        session = voice_agent.get_http_session()
+        assert voice_agent.get_http_session() is session
+
+        await first.shutdown()
+        assert not session.closed
+        await second.shutdown()
+        assert session.closed
+        assert voice_agent._http_session is None
+    asyncio.run(run())
+
+
+def deltas_of(*pieces):
+    async def deltas():
+        for piece in pieces:
+            yield piece
+    return deltas()
+
+
+def sentences(*pieces, min_chars=20) -> list:
+    async def run():
+        return [sentence async for sentence in voice_agent.speakable_sentences(deltas_of(*pieces), min_chars)]
+    return asyncio.run(run())
+
+
+def test_sentences_are_yielded_as_they_end():
+    assert sentences("Thanks for sharing that with me! What does your ", "team sell today?\nTell me more") == [
+        "Thanks for sharing that with me!",
+        "What does your team sell today?",
+        "Tell me more",
+    ]
+
+
+def test_short_sentences_are_held_back():
+    assert sentences("Great! ", "Tell me about your customers. ", "Ok.") == [
+        "Great! Tell me about your customers.",
+        "Ok.",
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "I recommend asking Mr. Jones about the budget first.",
+    "Revenue grew 3.5 percent over the last quarter alone.",
+    "Try channels, e.g. newsletters and social media posts.",
+    "We can work with J. Smith on the campaign design here.",
+])
+def test_abbreviations_and_decimals_do_not_end_sentences(text):
+    assert sentences(text[:10], text[10:] + " Next one follows here.") == [text, "Next one follows here."]
+
+
+def test_final_partial_sentence_is_flushed():
+    assert sentences("What is the main goal of", " the project") == ["What is the main goal of the project"]
+    assert sentences("   ") == []
+
+
+def test_ready_sentinel_split_across_deltas_starts_generation(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def stream_chat_completion(api_key, messages, **kwargs):
+        for piece in ("That gives me enough to build your team. ", "Here we go!\nREADY_TO", "_GENE", "RATE"):
+            yield piece
+    monkeypatch.setattr(voice_agent.llm_client, "stream_chat_completion", stream_chat_completion)
+
+    agent = voice_agent.CrewAIVoiceAgent()
+    started = []
+    monkeypatch.setattr(agent, "start_team_generation", lambda: started.append(True))
+
+    async def run():
+        return [sentence async for sentence in agent.stream_conversational_response("We sell shoes online")]
+    spoken = asyncio.run(run())
+
+    assert spoken == ["That gives me enough to build your team.", "Here we go!"]
+    assert started == [True]
+    assert agent.context.conversation_history[-1].content == "That gives me enough to build your team. Here we go!"
+
+
+def test_reply_without_sentinel_does_not_start_generation(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    async def stream_chat_completion(api_key, messages, **kwargs):
+        yield "What kind of customers do you serve most often?"
+    monkeypatch.setattr(voice_agent.llm_client, "stream_chat_completion", stream_chat_completion)
+
+    agent = voice_agent.CrewAIVoiceAgent()
+    started = []
+    monkeypatch.setattr(agent, "start_team_generation", lambda: started.append(True))
+
+    async def run():
+        return [sentence async for sentence in agent.stream_conversational_response("Hi")]
+    assert asyncio.run(run()) == ["What kind of customers do you serve most often?"]
+    assert started == []
@@ -0,0 +1,73 @@
+import pytest
+
+from yaml_emitter import _all_plain, quote_scalar, render_crewai_yaml
+
+yaml = pytest.importorskip("yaml")
+
+EDGE_STRINGS = [
+    "1.", "3.", "0.", "-2.", "1._", "4._0", "1:30._", "1.5", ".5", "1e5", "1_000", "0x1F", "0o17", "1:30",
+    "=", "<<", "~", "null", "Null", "true", "yes", "No", "on", "off", "y", "n", ".inf", "-.nan",
+    "2024-01-05", "2024-1-5 10:00:00",
+    "a: b", "a #b", "- item", "? key", ": x", "trailing:", "trailing ", " leading",
+    "&anchor", "*alias", "!tag", "|", ">", "'quoted'", '"quoted"', "%percent", "@at", "`tick",
+    "[list]", "{map}", "line\nbreak", "tab\there", " ", "naïve café",
+    "Senior Data Analyst", "Improve conversion: a 3-step plan",
+]
+
+
+@pytest.mark.parametrize("text", EDGE_STRINGS)
+def test_quote_scalar_round_trips(text):
+    assert yaml.safe_load(f"key: {quote_scalar(text)}")["key"] == text
+
+
+@pytest.mark.parametrize("value", [None, True, False, 0, 42, 1.5])
+def test_quote_scalar_keeps_plain_values_typed(value):
+    assert yaml.safe_load(f"key: {quote_scalar(value)}")["key"] == value
+
+
+def test_plain_words_stay_unquoted():
+    assert quote_scalar("Senior Data Analyst") == "Senior Data Analyst"
+
+
+def test_rendered_document_round_trips():
+    team = {
+        "mission": {"name": "Launch # 1", "objective": "Grow\nsales", "description": ""},
+        "agents": [{"role": "1.", "goal": "=", "backstory": "<<"}],
+        "tasks": [{"description": "yes"}, {"description": "3."}],
+        "selected_tools": ["0."],
+        "workflow_type": "sequential",
+    }
+    document = yaml.safe_load(render_crewai_yaml(team))
+    assert document["agents"] == [{"role": "1.", "goal": "=", "backstory": "<<"}]
+    assert [task["description"] for task in document["tasks"]] == ["yes", "3."]
+    assert [task["agent"] for task in document["tasks"]] == ["1.", "1."]
+    assert document["tools"] == ["0."]
+    assert document["process"] == "sequential"
+
+
+PLAIN_TEXT = ["Senior Data Analyst", "Deliver the report, on time.", "It's 3 weeks of work (roughly)"]
+
+
+def test_all_plain_agrees_with_quote_scalar():
+    assert _all_plain(PLAIN_TEXT)
+    assert all(quote_scalar(text) == text for text in PLAIN_TEXT)
+    for text in EDGE_STRINGS:
+        if _all_plain(PLAIN_TEXT + [text]):
+            assert quote_scalar(text) == text
+    assert not _all_plain([])
+    assert not _all_plain(PLAIN_TEXT + [None])
+
+
+@pytest.mark.parametrize("text", EDGE_STRINGS)
+def test_rendered_document_round_trips_next_to_plain_text(text):
+    # One scalar that needs quoting sends the whole document down the slow path
+    team = {
+        "mission": {"name": "Launch", "objective": "Grow sales"},
+        "agents": [{"role": "Senior Data Analyst", "goal": text, "backstory": PLAIN_TEXT[2]}],
+        "tasks": [{"description": PLAIN_TEXT[1]}],
+        "selected_tools": [],
+        "workflow_type": "sequential",
+    }
+    document = yaml.safe_load(render_crewai_yaml(team))
+    assert document["agents"] == [{"role": "Senior Data Analyst", "goal": text, "backstory": PLAIN_TEXT[2]}]
+    assert document["tasks"][0]["description"] == PLAIN_TEXT[1]